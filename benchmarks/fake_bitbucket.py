@@ -0,0 +1,414 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+class FakeBitbucketState:  # pylint: disable=too-many-instance-attributes
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.projects = {}
+        self.repositories = {}
+        self.restrictions = {}
+        self.groups = {}
+        self.users = {}
+        self.invitations = []
+        self.permissions = {}
+        self.next_restriction_id = 1
+
+    def seed(self, workspace, repositories=0, groups=(), users=(), restrictions=()):
+        for index in range(repositories):
+            self.add_repository(workspace, f"repository{index}")
+            for kind in restrictions:
+                self.add_restriction(workspace, f"repository{index}", kind, "master")
+        for account_id in users:
+            self.user(account_id)
+        for group in groups:
+            self.groups.setdefault(workspace, {})[group] = set(
+                self.user(account_id) for account_id in users
+            )
+
+    def user(self, account_id):
+        return self.users.setdefault(
+            account_id, f"{{{uuid.uuid5(uuid.NAMESPACE_URL, account_id)}}}"
+        )
+
+    def add_repository(self, workspace, slug, project_key="PROJ"):
+        repository = {
+            "type": "repository",
+            "uuid": f"{{{uuid.uuid4()}}}",
+            "slug": slug,
+            "name": slug,
+            "full_name": f"{workspace}/{slug}",
+            "is_private": True,
+            "project": {"key": project_key},
+            "mainbranch": {"type": "branch", "name": "master"},
+            "updated_on": time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()),
+        }
+        self.repositories.setdefault(workspace, {})[slug] = repository
+        return repository
+
+    def touch(self, workspace, slug, updated_on):
+        self.repositories[workspace][slug]["updated_on"] = updated_on
+
+    def grant(self, workspace, slug, account_id, permission="write"):
+        self.permissions.setdefault(workspace, {})[(slug, account_id)] = permission
+
+    def add_restriction(self, workspace, slug, kind, pattern, **fields):
+        restriction = {
+            "type": "branchrestriction",
+            "id": self.next_restriction_id,
+            "kind": kind,
+            "branch_match_kind": fields.get("branch_match_kind", "glob"),
+            "pattern": pattern,
+            "users": fields.get("users", []),
+            "groups": fields.get("groups", []),
+        }
+        if "value" in fields:
+            restriction["value"] = fields["value"]
+        self.next_restriction_id += 1
+        self.restrictions.setdefault((workspace, slug), {})[
+            restriction["id"]
+        ] = restriction
+        return restriction
+
+
+class FakeBitbucketHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    routes = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.__dispatch("GET")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.__dispatch("POST")
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        self.__dispatch("PUT")
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        self.__dispatch("DELETE")
+
+    def __dispatch(self, method):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if server.latency:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+        server.count(method)
+
+        roll = random.random()
+        if roll < server.throttle_rate:
+            return self.send_json(429, {"error": "rate limited"}, {"Retry-After": "0"})
+        if roll < server.throttle_rate + server.error_rate:
+            return self.send_json(500, {"error": "injected failure"})
+
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(unquote(parts.path))
+            if route_method == method and match:
+                with server.state.lock:
+                    status, payload = handler(self, query, body, *match.groups())
+                if method == "GET" and status == 200:
+                    if "fields" in query:
+                        payload = select_fields(payload, query["fields"].split(","))
+                    return self.send_cacheable(payload)
+                return self.send_json(status, payload)
+        return self.send_json(404, {"error": "not found"})
+
+    def send_json(self, status, payload=None, headers=None):
+        data = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_cacheable(self, payload):
+        etag = f'"{hashlib.sha256(json.dumps(payload).encode()).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        return self.send_json(200, payload, {"ETag": etag})
+
+    def page(self, values, query):
+        pagelen = int(query.get("pagelen", 10))
+        number = int(query.get("page", 1))
+        start = (number - 1) * pagelen
+        payload = {
+            "size": len(values),
+            "page": number,
+            "pagelen": pagelen,
+            "values": values[start : start + pagelen],
+        }
+        if start + pagelen < len(values):
+            next_query = {**query, "page": number + 1, "pagelen": pagelen}
+            next_query_string = "&".join(f"{k}={v}" for k, v in next_query.items())
+            payload["next"] = (
+                f"{self.server.url}{urlsplit(self.path).path}?{next_query_string}"
+            )
+        return 200, payload
+
+
+def select_fields(value, fields):
+    if isinstance(value, list):
+        return [select_fields(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    nested = {}
+    for field in fields:
+        head, _, rest = field.partition(".")
+        nested.setdefault(head, []).append(rest)
+    return {
+        key: value[key] if "" in rests else select_fields(value[key], rests)
+        for key, rests in nested.items()
+        if key in value
+    }
+
+
+def route(method, pattern):
+    def decorator(handler):
+        FakeBitbucketHandler.routes.append((method, re.compile(pattern), handler))
+        return handler
+
+    return decorator
+
+
+@route("POST", r"/site/oauth2/access_token")
+def access_token(_handler, _query, _body):
+    return (
+        200,
+        {
+            "access_token": uuid.uuid4().hex,
+            "token_type": "bearer",
+            "expires_in": 7200,
+            "scopes": "repository project account",
+        },
+    )
+
+
+@route("POST", r"/2.0/workspaces/([^/]+)/projects")
+def create_project(handler, _query, body, workspace):
+    project = json.loads(body)
+    handler.server.state.projects.setdefault(workspace, {})[project["key"]] = project
+    return (201, project)
+
+
+@route("GET", r"/2.0/workspaces/([^/]+)/projects")
+def list_projects(handler, query, _body, workspace):
+    projects = handler.server.state.projects.get(workspace, {})
+    return handler.page(list(projects.values()), query)
+
+
+def repository_permissions(state, workspace):
+    return [
+        {
+            "type": "repository_permission",
+            "permission": permission,
+            "user": {"account_id": account_id, "uuid": state.user(account_id)},
+            "repository": {"full_name": f"{workspace}/{slug}", "name": slug},
+        }
+        for (slug, account_id), permission in sorted(
+            state.permissions.get(workspace, {}).items()
+        )
+    ]
+
+
+@route("GET", r"/2.0/workspaces/([^/]+)/permissions/repositories")
+def list_repository_permissions(handler, query, _body, workspace):
+    return handler.page(repository_permissions(handler.server.state, workspace), query)
+
+
+@route("GET", r"/2.0/workspaces/([^/]+)/permissions/repositories/([^/]+)")
+def list_permissions_of_repository(handler, query, _body, workspace, slug):
+    return handler.page(
+        [
+            grant
+            for grant in repository_permissions(handler.server.state, workspace)
+            if grant["repository"]["name"] == slug
+        ],
+        query,
+    )
+
+
+@route("GET", r"/2.0/repositories/([^/]+)")
+def list_repositories(handler, query, _body, workspace):
+    repositories = list(handler.server.state.repositories.get(workspace, {}).values())
+    match = re.fullmatch(r"updated_on\s*(>=|>)\s*(\S+)", query.get("q", ""))
+    if match:
+        operator, since = match.groups()
+        repositories = [
+            repository
+            for repository in repositories
+            if repository["updated_on"] > since
+            or (operator == ">=" and repository["updated_on"] == since)
+        ]
+    return handler.page(repositories, query)
+
+
+@route("GET", r"/2.0/repositories/([^/]+)/([^/]+)")
+def get_repository(handler, _query, _body, workspace, slug):
+    repository = handler.server.state.repositories.get(workspace, {}).get(slug)
+    if repository is None:
+        return (404, {"error": "not found"})
+    return (200, repository)
+
+
+@route("POST", r"/2.0/repositories/([^/]+)/([^/]+)")
+def create_repository(handler, _query, body, workspace, slug):
+    payload = json.loads(body)
+    repository = handler.server.state.add_repository(
+        workspace, slug, payload.get("project", {}).get("key", "PROJ")
+    )
+    return (200, repository)
+
+
+@route("GET", r"/2.0/repositories/([^/]+)/([^/]+)/branch-restrictions")
+def list_restrictions(handler, query, _body, workspace, slug):
+    restrictions = [
+        restriction
+        for restriction in handler.server.state.restrictions.get(
+            (workspace, slug), {}
+        ).values()
+        if query.get("kind", restriction["kind"]) == restriction["kind"]
+        and query.get("pattern", restriction["pattern"]) == restriction["pattern"]
+    ]
+    return handler.page(restrictions, query)
+
+
+@route("POST", r"/2.0/repositories/([^/]+)/([^/]+)/branch-restrictions")
+def create_restriction(handler, _query, body, workspace, slug):
+    payload = json.loads(body)
+    fields = {
+        key: payload[key]
+        for key in ("branch_match_kind", "users", "groups", "value")
+        if key in payload
+    }
+    restriction = handler.server.state.add_restriction(
+        workspace, slug, payload["kind"], payload["pattern"], **fields
+    )
+    return (201, restriction)
+
+
+@route("DELETE", r"/2.0/repositories/([^/]+)/([^/]+)/branch-restrictions/(\d+)")
+def delete_restriction(handler, _query, _body, workspace, slug, restriction_id):
+    restrictions = handler.server.state.restrictions.get((workspace, slug), {})
+    if restrictions.pop(int(restriction_id), None) is None:
+        return (404, {"error": "not found"})
+    return 204, None
+
+
+@route("GET", r"/2.0/users/([^/]+)")
+def get_user(handler, _query, _body, account_id):
+    user_uuid = handler.server.state.users.get(account_id)
+    if user_uuid is None:
+        return (404, {"error": "not found"})
+    return (200, {"account_id": account_id, "uuid": user_uuid})
+
+
+@route("GET", r"/1.0/groups/([^/]+)")
+def list_groups(handler, _query, _body, workspace):
+    groups = handler.server.state.groups.get(workspace, {})
+    return (
+        200,
+        [
+            {
+                "slug": slug,
+                "name": slug,
+                "members": [{"uuid": member} for member in members],
+            }
+            for slug, members in groups.items()
+        ],
+    )
+
+
+@route("DELETE", r"/1.0/groups/([^/]+)/([^/]+)/members/([^/]+)")
+def remove_group_member(handler, _query, _body, workspace, group, user_uuid):
+    members = handler.server.state.groups.get(workspace, {}).get(group)
+    if members is None or user_uuid not in members:
+        return (404, {"error": "not found"})
+    members.discard(user_uuid)
+    return 204, None
+
+
+@route("POST", r"/!api/internal/invitations/repositories/([^/]+)/([^/]+)")
+def invite(handler, _query, body, workspace, slug):
+    payload = json.loads(body)
+    handler.server.state.invitations.append(
+        (workspace, slug, tuple(payload["emails"]), payload["permission"])
+    )
+    return (200, {"emails": payload["emails"]})
+
+
+@route("DELETE", r"/!api/internal/privileges/([^/]+)/([^/]+)/([^/]+)")
+def remove_privilege(_handler, _query, _body, _workspace, _slug, _user_uuid):
+    return 204, None
+
+
+class FakeBitbucketServer(  # pylint: disable=too-many-instance-attributes
+    ThreadingHTTPServer
+):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        throttle_rate=0.0,
+    ):
+        super().__init__(address, FakeBitbucketHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.state = FakeBitbucketState()
+        self.requests = {}
+        self.__counter_lock = threading.Lock()
+        self.__thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, method):
+        with self.__counter_lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def environment(self):
+        return {
+            "BITBUCKET_API_URL": self.url,
+            "BITBUCKET_INTERNAL_API_URL": self.url,
+            "BITBUCKET_TOKEN_URL": f"{self.url}/site/oauth2/access_token",
+            "BITBUCKET_OAUTH_CONSUMER_KEY": "benchmark",
+            "BITBUCKET_OAUTH_CONSUMER_SECRET": "benchmark",
+            "OAUTHLIB_INSECURE_TRANSPORT": "1",
+        }
@@ -0,0 +1,41 @@
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+def measure(module, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stderr
+        for line in output.splitlines():
+            _, cumulative, name = line.removeprefix("import time:").split("|")
+            if name.strip() == module:
+                samples.append(int(cumulative) / 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the CLI import time.")
+    parser.add_argument("--module", default="bitbucketcli.bitbucket.cli")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    samples = measure(args.module, args.runs)
+    median = statistics.median(samples)
+    print(
+        f"{args.module}: median {median:.1f}ms, min {min(samples):.1f}ms, max {max(samples):.1f}ms over {len(samples)} runs"
+    )
+    if args.budget_ms is not None and median > args.budget_ms:
+        print(f"Import time budget of {args.budget_ms:.1f}ms exceeded", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import json
+import math
+import os
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_bitbucket import FakeBitbucketServer, FakeBitbucketState
+from bitbucketcli.bitbucket.branch import BranchCommand
+from bitbucketcli.bitbucket.bulk import BulkInviteCommand, Invite
+from bitbucketcli.bitbucket.cli import prepare_oauth_client
+from bitbucketcli.bitbucket.project import ProjectCommand
+from bitbucketcli.bitbucket.repository import RepositoryCommand
+from bitbucketcli.bitbucket.workspace import WorkspaceCommand
+
+WORKSPACE = "benchmark"
+ACCOUNT_ID = "557058:benchmark-user"
+
+Scenario = namedtuple("Scenario", ["name", "seed", "operation"])
+Result = namedtuple(
+    "Result", ["scenario", "mode", "operations", "failures", "seconds", "latencies"]
+)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def scenarios():
+    def bulk_invites(oauth, index):
+        invites = [
+            Invite(f"user{index}-{n}@example.com", f"repository{n % 5}", "read")
+            for n in range(50)
+        ]
+        results = list(BulkInviteCommand(WORKSPACE, oauth, workers=5).run(invites))
+        return all(result.success for result in results)
+
+    return [
+        Scenario(
+            "ProjectCommand.create",
+            lambda state, operations: None,
+            lambda oauth, i: ProjectCommand(WORKSPACE, oauth).create(
+                f"project{i}", f"KEY{i}"
+            ),
+        ),
+        Scenario(
+            "RepositoryCommand.create",
+            lambda state, operations: None,
+            lambda oauth, i: RepositoryCommand(WORKSPACE, oauth).create(
+                f"new-repository{i}", "PROJ"
+            ),
+        ),
+        Scenario(
+            "RepositoryCommand.add_user_to_repository",
+            lambda state, operations: state.seed(WORKSPACE, repositories=10),
+            lambda oauth, i: RepositoryCommand(WORKSPACE, oauth).add_user_to_repository(
+                f"user{i}@example.com", f"repository{i % 10}"
+            ),
+        ),
+        Scenario(
+            "RepositoryCommand.remove_user_from_repository",
+            lambda state, operations: state.seed(
+                WORKSPACE, repositories=10, users=[ACCOUNT_ID]
+            ),
+            lambda oauth, i: RepositoryCommand(
+                WORKSPACE, oauth
+            ).remove_user_from_repository(f"repository{i % 10}", ACCOUNT_ID),
+        ),
+        Scenario(
+            "BranchCommand.bypass_push_with_pull_request",
+            lambda state, operations: state.seed(
+                WORKSPACE, repositories=operations, restrictions=["push"]
+            ),
+            lambda oauth, i: BranchCommand(
+                WORKSPACE, f"repository{i}", oauth
+            ).bypass_push_with_pull_request(),
+        ),
+        Scenario(
+            "WorkspaceCommand.remove_user_from_group",
+            lambda state, operations: state.seed(
+                WORKSPACE,
+                groups=[f"group{i}" for i in range(operations)],
+                users=[ACCOUNT_ID],
+            ),
+            lambda oauth, i: WorkspaceCommand(oauth).remove_user_from_group(
+                WORKSPACE, ACCOUNT_ID, f"group{i}"
+            ),
+        ),
+        Scenario(
+            "BulkInviteCommand.run (50 invites)",
+            lambda state, operations: state.seed(WORKSPACE, repositories=5),
+            bulk_invites,
+        ),
+    ]
+
+
+def run_scenario(server, scenario, mode, operations, workers):
+    server.state = FakeBitbucketState()
+    scenario.seed(server.state, operations)
+    oauth = prepare_oauth_client(pool_size=workers)
+
+    def timed(index):
+        started = time.perf_counter()
+        try:
+            success = scenario.operation(oauth, index)
+        except Exception:  # pylint: disable=broad-exception-caught
+            success = False
+        return success, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(timed, range(operations)))
+    seconds = time.perf_counter() - started
+    return Result(
+        scenario.name,
+        mode,
+        operations,
+        sum(1 for success, _ in outcomes if not success),
+        seconds,
+        [latency for _, latency in outcomes],
+    )
+
+
+def summary(result):
+    return {
+        "scenario": result.scenario,
+        "mode": result.mode,
+        "operations": result.operations,
+        "failures": result.failures,
+        "ops_per_second": result.operations / result.seconds,
+        "p50_ms": percentile(result.latencies, 0.5) * 1000,
+        "p99_ms": percentile(result.latencies, 0.99) * 1000,
+    }
+
+
+def run(operations=50, workers=16, latency=0.0, error_rate=0.0, throttle_rate=0.0):
+    server = FakeBitbucketServer(
+        latency=latency, error_rate=error_rate, throttle_rate=throttle_rate
+    ).start()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        environment = {
+            **server.environment(),
+            "BITBUCKET_TOKEN_CACHE_PATH": os.path.join(cache_dir, "tokens.json"),
+        }
+        previous = {name: os.environ.get(name) for name in environment}
+        os.environ.update(environment)
+        try:
+            return [
+                summary(run_scenario(server, scenario, mode, operations, pool))
+                for scenario in scenarios()
+                for mode, pool in (("single", 1), ("bulk", workers))
+            ]
+        finally:
+            for name, value in previous.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure command throughput against a local fake Bitbucket."
+    )
+    parser.add_argument("--operations", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="Server latency in seconds"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true", help="Print NDJSON results")
+    args = parser.parse_args()
+
+    results = run(
+        args.operations,
+        args.workers,
+        args.latency,
+        args.error_rate,
+        args.throttle_rate,
+    )
+    for result in results:
+        if args.json:
+            print(json.dumps(result))
+        else:
+            print(
+                f"{result['scenario']:<48} {result['mode']:<6} "
+                f"{result['ops_per_second']:>9.1f} ops/s "
+                f"p50 {result['p50_ms']:>8.1f}ms p99 {result['p99_ms']:>8.1f}ms "
+                f"failures {result['failures']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
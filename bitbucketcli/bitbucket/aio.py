@@ -0,0 +1,167 @@
+import asyncio
+import atexit
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from os import getenv
+
+from bitbucketcli.bitbucket.bitbucket import BitbucketClient
+from bitbucketcli.bitbucket.branch import BranchCommand
+from bitbucketcli.bitbucket.project import ProjectCommand
+from bitbucketcli.bitbucket.repository import RepositoryCommand
+from bitbucketcli.bitbucket.transport import ensure_pool_size
+from bitbucketcli.bitbucket.workspace import WorkspaceCommand
+
+DEFAULT_CONCURRENCY = 32
+
+
+# Not an asyncio-native HTTP client: the HTTP stack is requests/requests_oauthlib,
+# so every call is offloaded to a worker thread and the event loop only awaits
+# it. Concurrency is bounded by the thread count. The semaphore keeps queued
+# calls on the event loop, where cancelling them means they are never sent.
+class ThreadOffloader:
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY):
+        self.concurrency = concurrency
+        self.__executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="bitbucket-async"
+        )
+        self.__semaphores = weakref.WeakKeyDictionary()
+        self.__lock = threading.Lock()
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with self.__semaphore(loop):
+            return await loop.run_in_executor(
+                self.__executor, partial(func, *args, **kwargs)
+            )
+
+    def size_pool(self, session):
+        # Without enough pooled connections the extra threads would open and
+        # discard a connection per request.
+        return ensure_pool_size(
+            session,
+            [getenv("BITBUCKET_API_URL"), getenv("BITBUCKET_INTERNAL_API_URL")],
+            self.concurrency,
+        )
+
+    def close(self):
+        self.__executor.shutdown(wait=True)
+
+    def __semaphore(self, loop):
+        # asyncio primitives belong to one event loop, the offloader may be
+        # shared by several.
+        with self.__lock:
+            if loop not in self.__semaphores:
+                self.__semaphores[loop] = asyncio.Semaphore(self.concurrency)
+            return self.__semaphores[loop]
+
+
+class AsyncBitbucketClient:
+    def __init__(self, oauth_client, offloader=None, client=None):
+        self.offloader = offloader or default_offloader()
+        self.client = client or BitbucketClient(oauth_client)
+
+    async def post(self, path, data, headers=None, is_internal_api=False):
+        return await self.offloader.run(
+            self.client.post,
+            path,
+            data,
+            headers=headers,
+            is_internal_api=is_internal_api,
+        )
+
+    async def get(self, path, params=None, headers=None, is_internal_api=False):
+        return await self.offloader.run(
+            self.client.get,
+            path,
+            params=params,
+            headers=headers,
+            is_internal_api=is_internal_api,
+        )
+
+    async def delete(self, path, params=None, headers=None, is_internal_api=False):
+        return await self.offloader.run(
+            self.client.delete,
+            path,
+            params=params,
+            headers=headers,
+            is_internal_api=is_internal_api,
+        )
+
+    async def get_user_uuid(self, account_id):
+        return await self.offloader.run(self.client.get_user_uuid, account_id)
+
+
+class AsyncRepositoryCommand(AsyncBitbucketClient):
+    def __init__(self, workspace, oauth_client, offloader=None):
+        super().__init__(
+            oauth_client, offloader, RepositoryCommand(workspace, oauth_client)
+        )
+
+    async def create(self, name, project_key, is_private=True):
+        return await self.offloader.run(
+            self.client.create, name, project_key, is_private
+        )
+
+    async def add_user_to_repository(self, email, repository_name, permission="read"):
+        return await self.offloader.run(
+            self.client.add_user_to_repository, email, repository_name, permission
+        )
+
+    async def add_users_to_repository(self, emails, repository_name, permission="read"):
+        return await self.offloader.run(
+            self.client.add_users_to_repository, emails, repository_name, permission
+        )
+
+    async def remove_user_from_repository(self, repository_name, account_id):
+        return await self.offloader.run(
+            self.client.remove_user_from_repository, repository_name, account_id
+        )
+
+
+class AsyncProjectCommand(AsyncBitbucketClient):
+    def __init__(self, workspace, oauth_client, offloader=None):
+        super().__init__(
+            oauth_client, offloader, ProjectCommand(workspace, oauth_client)
+        )
+
+    async def create(self, name, key, is_private=True, description=""):
+        return await self.offloader.run(
+            self.client.create, name, key, is_private, description
+        )
+
+
+class AsyncBranchCommand(AsyncBitbucketClient):
+    def __init__(self, workspace, repository, oauth_client, offloader=None):
+        super().__init__(
+            oauth_client, offloader, BranchCommand(workspace, repository, oauth_client)
+        )
+
+    async def bypass_push_with_pull_request(self, branch_name=None):
+        return await self.offloader.run(
+            self.client.bypass_push_with_pull_request, branch_name
+        )
+
+
+class AsyncWorkspaceCommand(AsyncBitbucketClient):
+    def __init__(self, oauth_client, offloader=None):
+        super().__init__(oauth_client, offloader, WorkspaceCommand(oauth_client))
+
+    async def remove_user_from_group(self, workspace, account_id, group_name):
+        return await self.offloader.run(
+            self.client.remove_user_from_group, workspace, account_id, group_name
+        )
+
+
+_default_offloader = None  # pylint: disable=invalid-name
+_default_offloader_lock = threading.Lock()
+
+
+def default_offloader():
+    global _default_offloader  # pylint: disable=global-statement
+    with _default_offloader_lock:
+        if _default_offloader is None:
+            _default_offloader = ThreadOffloader()
+            atexit.register(_default_offloader.close)
+        return _default_offloader
@@ -0,0 +1,284 @@
+import io
+import json
+import shlex
+import sys
+import threading
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+
+from bitbucketcli.bitbucket.bootstrap import SKIPPED, DagExecutor, Node
+from bitbucketcli.bitbucket.daemon import run_command
+
+BatchLine = namedtuple("BatchLine", ["number", "args"])
+BatchResult = namedtuple(
+    "BatchResult",
+    ["number", "args", "status", "exit_code", "stdout", "stderr", "elapsed", "detail"],
+)
+CommandOutput = namedtuple("CommandOutput", ["exit_code", "stdout", "stderr"])
+
+PROGRAM_NAMES = ("bitbucket-cli", "./bitbucket-cli")
+UNSUPPORTED_COMMANDS = ("batch", "daemon")
+
+
+class BatchScriptException(Exception):
+    pass
+
+
+def parse_script(lines):
+    parsed = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        args = parse_line(line, number)
+        if args and args[0] in PROGRAM_NAMES:
+            args = args[1:]
+        if not args:
+            raise BatchScriptException(f"Line {number} has no command")
+        if args[0] in UNSUPPORTED_COMMANDS:
+            raise BatchScriptException(
+                f"Line {number}: {args[0]} cannot be run from a batch"
+            )
+        parsed.append(BatchLine(number, args))
+    return parsed
+
+
+def parse_line(line, number):
+    if not line.startswith("{"):
+        try:
+            return shlex.split(line)
+        except ValueError as e:
+            raise BatchScriptException(f"Line {number}: {e}") from e
+    try:
+        message = json.loads(line)
+    except ValueError as e:
+        raise BatchScriptException(f"Line {number} is not valid JSON: {e}") from e
+    if "args" in message:
+        if not isinstance(message["args"], list):
+            raise BatchScriptException(f"Line {number}: args must be a list")
+        return [str(arg) for arg in message["args"]]
+    if "command" not in message:
+        raise BatchScriptException(f"Line {number} needs a command or args")
+    return [str(message.pop("command"))] + json_options(message)
+
+
+def json_options(message):
+    args = []
+    for name, value in message.items():
+        option = f"--{name.replace('_', '-')}"
+        values = value if isinstance(value, list) else [value]
+        for value in values:
+            if value is True:
+                args.append(option)
+            elif value is False:
+                args.append(f"--no-{option[2:]}")
+            elif value is not None:
+                args.extend([option, str(value)])
+    return args
+
+
+def flag_options(command, name):
+    subcommand = getattr(command, "commands", {}).get(name)
+    if subcommand is None:
+        return set()
+    flags = set()
+    for param in subcommand.params:
+        if getattr(param, "is_flag", False) or getattr(param, "count", False):
+            flags.update(param.opts)
+            flags.update(param.secondary_opts)
+    return flags
+
+
+def option_values(args, flags=()):
+    values = defaultdict(list)
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg.startswith("--") and "=" in arg:
+            name, value = arg[2:].split("=", 1)
+            values[name].append(value)
+        elif (
+            arg.startswith("--")
+            and arg not in flags
+            and index + 1 < len(args)
+            and not args[index + 1].startswith("--")
+        ):
+            values[arg[2:]].append(args[index + 1])
+            index += 1
+        index += 1
+    return values
+
+
+def resources(args, command=None):
+    # Returns the workspace, the resources the command writes and the ones it
+    # only needs to exist. A command without resources owns its whole workspace.
+    values = option_values(args, flag_options(command, args[0]))
+    workspace = values.get("workspace", [None])[-1]
+    if workspace is None:
+        return None, (), ()
+    if args[0] == "create-project":
+        return workspace, [("project", key) for key in values.get("key", [])], ()
+    if args[0] == "create-repository":
+        return (
+            workspace,
+            [("repository", name) for name in values.get("name", [])],
+            [("project", key) for key in values.get("project-key", [])],
+        )
+    return (
+        workspace,
+        [("repository", slug) for slug in values.get("repository", [])],
+        (),
+    )
+
+
+def plan_dependencies(lines, command=None):
+    # A line without a workspace may touch any of them, so it waits for every
+    # line before it and every line after it waits for it.
+    writers = {}
+    barriers = {}
+    since_barrier = defaultdict(list)
+    barrier = None
+    since_global_barrier = []
+    dependencies = {}
+    for line in lines:
+        workspace, writes, reads = resources(line.args, command)
+        depends_on = set() if barrier is None else {barrier}
+        if workspace is None:
+            depends_on.update(since_global_barrier)
+            barrier = line.number
+            since_global_barrier = []
+            writers.clear()
+            barriers.clear()
+            since_barrier.clear()
+            dependencies[line.number] = sorted(depends_on)
+            continue
+        since_global_barrier.append(line.number)
+        if workspace in barriers:
+            depends_on.add(barriers[workspace])
+        if not writes:
+            depends_on.update(since_barrier.pop(workspace, []))
+            barriers[workspace] = line.number
+        for resource in reads:
+            if (workspace, resource) in writers:
+                depends_on.add(writers[workspace, resource])
+        for resource in writes:
+            if (workspace, resource) in writers:
+                depends_on.add(writers[workspace, resource])
+            writers[workspace, resource] = line.number
+        if writes:
+            since_barrier[workspace].append(line.number)
+        dependencies[line.number] = sorted(depends_on)
+    return dependencies
+
+
+def node_id(number):
+    return f"line {number}"
+
+
+class ThreadLocalStream:
+    encoding = "utf-8"
+    errors = "strict"
+
+    def __init__(self, stream):
+        self.__stream = stream
+        self.__local = threading.local()
+
+    @contextmanager
+    def capture(self):
+        self.__local.buffer = io.StringIO()
+        try:
+            yield self.__local.buffer
+        finally:
+            self.__local.buffer = None
+
+    def write(self, text):
+        return (getattr(self.__local, "buffer", None) or self.__stream).write(text)
+
+    def flush(self):
+        if getattr(self.__local, "buffer", None) is None:
+            self.__stream.flush()
+
+    def isatty(self):
+        return False
+
+
+class BatchCommand:  # pylint: disable=too-few-public-methods
+    def __init__(self, command, workers=8):
+        self.__command = command
+        self.__workers = workers
+
+    def run(self, lines):
+        dependencies = plan_dependencies(lines, self.__command)
+        by_id = {node_id(line.number): line for line in lines}
+        with captured_streams() as streams:
+            nodes = [
+                Node(
+                    node_id(line.number),
+                    self.__action(line, *streams),
+                    [node_id(number) for number in dependencies[line.number]],
+                )
+                for line in lines
+            ]
+            results = DagExecutor(self.__workers).run(nodes)
+            yield from in_order(results, by_id, lines)
+
+    def __action(self, line, stdout, stderr):
+        def action():
+            with stdout.capture() as out, stderr.capture() as err:
+                exit_code = run_command(
+                    lambda args: self.__command.main(args, prog_name="bitbucket-cli"),
+                    line.args,
+                )
+            output = CommandOutput(exit_code, out.getvalue(), err.getvalue())
+            return succeeded(output), output
+
+        return action
+
+
+def succeeded(output):
+    # The commands report API failures with ClickException.show() and exit 0.
+    return output.exit_code == 0 and not any(
+        line.startswith("Error: ") for line in output.stderr.splitlines()
+    )
+
+
+def in_order(results, by_id, lines):
+    pending = {}
+    position = 0
+    for result in results:
+        pending[result.id] = result
+        while position < len(lines) and node_id(lines[position].number) in pending:
+            yield batch_result(by_id, pending.pop(node_id(lines[position].number)))
+            position += 1
+
+
+def batch_result(by_id, result):
+    line = by_id[result.id]
+    if result.status == SKIPPED:
+        return BatchResult(
+            line.number, line.args, result.status, None, "", "", 0.0, result.detail
+        )
+    output = result.detail
+    return BatchResult(
+        line.number,
+        line.args,
+        result.status,
+        output.exit_code,
+        output.stdout,
+        output.stderr,
+        result.elapsed,
+        None,
+    )
+
+
+@contextmanager
+def captured_streams():
+    previous = sys.stdin, sys.stdout, sys.stderr
+    # Commands must not prompt: stdin already holds the batch itself.
+    sys.stdin = io.StringIO()
+    sys.stdout = ThreadLocalStream(previous[1])
+    sys.stderr = ThreadLocalStream(previous[2])
+    try:
+        yield sys.stdout, sys.stderr
+    finally:
+        sys.stdin, sys.stdout, sys.stderr = previous
@@ -1,7 +1,21 @@
 import logging
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
 from os import getenv
+from urllib.parse import urlsplit
 
 import requests
+from bitbucketcli.bitbucket.http_cache import HttpCache, default_http_cache
+from bitbucketcli.bitbucket.query import Query
+from bitbucketcli.bitbucket.ratelimit import default_scheduler
+from bitbucketcli.bitbucket.token_manager import TokenManager
+from bitbucketcli.bitbucket.tracing import RequestTimer
+from bitbucketcli.bitbucket.transport import connection_stats
+from bitbucketcli.bitbucket.user_cache import MISSING, default_user_cache
 
 
 class BitbucketApiException(Exception):
@@ -13,15 +27,38 @@ class BitbucketApiException(Exception):
         return f"{self.status_code} - Request failed from Bitbucket Api"
 
 
+# Hooks belong to the command that registered them: a client takes the hooks of
+# the context it is created in, so concurrent commands in batch or the daemon do
+# not see each other's requests.
+_request_hooks = ContextVar("request_hooks", default=())
+
+
+@contextmanager
+def request_hook(hook):
+    token = _request_hooks.set(_request_hooks.get() + (hook,))
+    try:
+        yield hook
+    finally:
+        _request_hooks.reset(token)
+
+
+def current_request_hooks():
+    return _request_hooks.get()
+
+
 class BitbucketClient:
-    def __init__(self, oauth_client):
+    def __init__(self, oauth_client, scheduler=None, user_cache=None, http_cache=None):
+        self.__request_hooks = current_request_hooks()
         self.__api_url = getenv("BITBUCKET_API_URL")
         self.__internal_api_url = getenv("BITBUCKET_INTERNAL_API_URL")
         self.__oauth = oauth_client
+        self.__scheduler = scheduler or default_scheduler()
+        self.__user_cache = user_cache or default_user_cache()
+        self.__http_cache = http_cache or default_http_cache()
 
     def post(self, path, data, headers=None, is_internal_api=False):
         return self.__request(
-            self.__oauth.post,
+            "POST",
             path=path,
             data=data,
             headers=headers
@@ -29,9 +66,11 @@ class BitbucketClient:
             is_internal_api=is_internal_api,
         )
 
-    def get(self, path, params=None, headers=None, is_internal_api=False):
+    def get(self, path, params=None, headers=None, is_internal_api=False, query=None):
+        if query is not None:
+            params = {**(params or {}), **query.params()}
         return self.__request(
-            self.__oauth.get,
+            "GET",
             path=path,
             params=params,
             headers=headers
@@ -43,7 +82,7 @@ class BitbucketClient:
 
     def delete(self, path, params=None, headers=None, is_internal_api=False):
         return self.__request(
-            self.__oauth.delete,
+            "DELETE",
             path=path,
             params=params,
             headers=headers
@@ -53,9 +92,64 @@ class BitbucketClient:
             is_internal_api=is_internal_api,
         )
 
+    def paginate(
+        self,
+        path,
+        params=None,
+        pagelen=None,
+        prefetch=0,
+        is_internal_api=False,
+        query=None,
+    ):
+        if query is not None:
+            params = {**(params or {}), **query.params(paginated=True)}
+        if pagelen:
+            params = {**(params or {}), "pagelen": pagelen}
+        page = self.__get_page(path, params, is_internal_api)
+        yield from page.get("values", [])
+        if prefetch and {"size", "pagelen", "page"} <= page.keys():
+            yield from self.__prefetch_pages(
+                path, params, page, prefetch, is_internal_api
+            )
+            return
+        while page.get("next"):
+            page = self.__get_page(page["next"], None, is_internal_api)
+            yield from page.get("values", [])
+
+    def __prefetch_pages(self, path, params, first_page, prefetch, is_internal_api):
+        last_page = math.ceil(first_page["size"] / first_page["pagelen"])
+        page_numbers = iter(range(first_page["page"] + 1, last_page + 1))
+        executor = ThreadPoolExecutor(max_workers=prefetch)
+
+        def submit(page_number):
+            page_params = {
+                **(params or {}),
+                "pagelen": first_page["pagelen"],
+                "page": page_number,
+            }
+            return executor.submit(self.__get_page, path, page_params, is_internal_api)
+
+        try:
+            window = deque(submit(number) for number in islice(page_numbers, prefetch))
+            while window:
+                page = window.popleft().result()
+                for number in islice(page_numbers, 1):
+                    window.append(submit(number))
+                yield from page.get("values", [])
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __get_page(self, path, params, is_internal_api):
+        response = self.get(path, params=params, is_internal_api=is_internal_api)
+        if not response.ok:
+            raise BitbucketApiException(
+                f"Failed to list {path}", status_code=response.status_code
+            )
+        return response.json()
+
     def __request(
         self,
-        requests_func,
+        method,
         path,
         data=None,
         params=None,
@@ -64,23 +158,102 @@ class BitbucketClient:
     ):
         if headers is None:
             headers = {"Accept": "application/json"}
+        requests_func = getattr(self.__oauth, method.lower())
+        url = self.__build_url(path, is_internal_api)
+        cache_key = HttpCache.key(url, params) if method == "GET" else None
+        if cache_key:
+            validators = self.__http_cache.validators(cache_key)
+            if validators:
+                headers = {**headers, **validators}
+        timer = RequestTimer(method, path, is_internal_api)
+
+        def send():
+            return self.__scheduler.execute(
+                method,
+                url,
+                lambda: requests_func(
+                    url=url, data=data, params=params, headers=headers
+                ),
+            )
+
         try:
-            url = f"{self.__get_url(is_internal_api)}/{path}"
-            response = requests_func(url=url, data=data, params=params, headers=headers)
-            return response
+            response = self.__send_authorized(send)
         except requests.exceptions.RequestException as e:
-            logging.error("Failed to process request, error=%{e.response.text}")
+            logging.error("Failed to process request %s %s, error=%s", method, url, e)
+            self.__notify(timer)
             raise e
+        self.__notify(timer, response)
+        if cache_key:
+            return self.__http_cache.update(cache_key, response)
+        return response
+
+    def __send_authorized(self, send):
+        token_manager = getattr(self.__oauth, "token_manager", None)
+        if not isinstance(token_manager, TokenManager):
+            return send()
+        token = token_manager.token
+        response = send()
+        # The token was revoked or expired early: refresh it once and retry.
+        if response.status_code == 401 and self.__refresh_token(token_manager, token):
+            response = send()
+        return response
+
+    @staticmethod
+    def __refresh_token(token_manager, rejected):
+        try:
+            token_manager.refresh(rejected=rejected)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.error("Failed to refresh the OAuth token, error=%s", e)
+            return False
+        return True
+
+    def __notify(self, timer, response=None):
+        if not self.__request_hooks:
+            return
+        event = timer.event(response)
+        for hook in self.__request_hooks:
+            hook(event)
+
+    def throttle_stats(self):
+        return self.__scheduler.stats()
+
+    def connection_stats(self):
+        return connection_stats(self.__oauth, [self.__api_url, self.__internal_api_url])
+
+    def __build_url(self, path, is_internal_api):
+        if urlsplit(path).scheme:
+            return path
+        return f"{self.__get_url(is_internal_api)}/{path}"
 
     def __get_url(self, is_internal_api):
         return self.__internal_api_url if is_internal_api else self.__api_url
 
     def get_user_uuid(self, account_id):
-        user_response = self.get(f"2.0/users/{account_id}")
-        if user_response.status_code == 200:
-            return user_response.json()["uuid"]
+        uuid = self.__user_cache.get(account_id)
+        if uuid is MISSING:
+            user_response = self.get(
+                f"2.0/users/{account_id}", query=Query().fields("uuid")
+            )
+            if user_response.status_code == 200:
+                uuid = user_response.json()["uuid"]
+                self.__user_cache.put(account_id, uuid)
+            elif user_response.status_code == 404:
+                uuid = None
+                self.__user_cache.put(account_id, uuid)
+            else:
+                raise BitbucketApiException(
+                    f"Failed to fetch user with account id {account_id}",
+                    status_code=user_response.status_code,
+                )
+        if uuid is None:
+            raise BitbucketApiException(
+                f"Failed to fetch user with account id {account_id}",
+                status_code=404,
+            )
+        return uuid
 
-        raise BitbucketApiException(
-            f"Failed to fetch user with account id {account_id}",
-            status_code=user_response.status_code,
-        )
+    def user_cache_stats(self):
+        return self.__user_cache.stats()
+
+    def http_cache_stats(self):
+        return self.__http_cache.stats()
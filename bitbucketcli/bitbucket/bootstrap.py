@@ -0,0 +1,235 @@
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from functools import partial
+
+import requests
+from bitbucketcli.bitbucket.bulk import DEFAULT_BATCH_SIZE, batch_invites, parse_invite
+from bitbucketcli.bitbucket.project import ProjectCommand
+from bitbucketcli.bitbucket.repository import RepositoryCommand
+
+Node = namedtuple("Node", ["id", "action", "dependencies"])
+NodeResult = namedtuple("NodeResult", ["id", "status", "elapsed", "detail"])
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class BootstrapManifestException(Exception):
+    pass
+
+
+class DagExecutor:  # pylint: disable=too-few-public-methods
+    def __init__(self, workers=8):
+        self.__workers = workers
+
+    def run(self, nodes):
+        graph = {}
+        for node in nodes:
+            if node.id in graph:
+                raise BootstrapManifestException(f"{node.id} is declared twice")
+            graph[node.id] = node
+        dependents = {node_id: [] for node_id in graph}
+        waiting = {}
+        for node in graph.values():
+            missing = [dep for dep in node.dependencies if dep not in graph]
+            if missing:
+                raise BootstrapManifestException(
+                    f"{node.id} depends on unknown {', '.join(missing)}"
+                )
+            waiting[node.id] = len(set(node.dependencies))
+            for dependency in set(node.dependencies):
+                dependents[dependency].append(node.id)
+        check_acyclic(graph, dependents, waiting)
+        return self.__run(graph, dependents, waiting)
+
+    def __run(self, graph, dependents, waiting):
+        ready = [node_id for node_id, count in waiting.items() if count == 0]
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            running = {}
+            while ready or running:
+                for node_id in ready:
+                    # Actions create their clients on the workers, with the
+                    # request hooks of the command running the plan.
+                    future = executor.submit(
+                        copy_context().run, self.__execute, graph[node_id]
+                    )
+                    running[future] = node_id
+                    del waiting[node_id]
+                ready = []
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_id = running.pop(future)
+                    result = future.result()
+                    yield result
+                    if result.status == SUCCEEDED:
+                        for dependent in dependents[node_id]:
+                            if dependent not in waiting:
+                                continue
+                            waiting[dependent] -= 1
+                            if waiting[dependent] == 0:
+                                ready.append(dependent)
+                    else:
+                        yield from skip_dependents(node_id, dependents, waiting)
+
+    def __execute(self, node):
+        started = time.perf_counter()
+        try:
+            success, detail = node.action()
+        except requests.exceptions.RequestException as e:
+            success, detail = False, str(e)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Any other error fails this node only, the rest of the plan goes on.
+            success, detail = False, repr(e)
+        return NodeResult(
+            node.id,
+            SUCCEEDED if success else FAILED,
+            time.perf_counter() - started,
+            detail,
+        )
+
+
+def check_acyclic(nodes, dependents, waiting):
+    remaining = dict(waiting)
+    queue = [node_id for node_id, count in remaining.items() if count == 0]
+    visited = 0
+    while queue:
+        node_id = queue.pop()
+        visited += 1
+        for dependent in dependents[node_id]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                queue.append(dependent)
+    if visited != len(nodes):
+        cycle = sorted(node_id for node_id, count in remaining.items() if count)
+        raise BootstrapManifestException(f"Dependency cycle between {', '.join(cycle)}")
+
+
+def skip_dependents(node_id, dependents, waiting):
+    stack = list(dependents[node_id])
+    while stack:
+        dependent = stack.pop()
+        if waiting.pop(dependent, None) is None:
+            continue
+        yield NodeResult(dependent, SKIPPED, 0.0, f"{node_id} did not succeed")
+        stack.extend(dependents[dependent])
+
+
+def build_plan(manifest, batch_size=DEFAULT_BATCH_SIZE):
+    try:
+        nodes = list(plan_nodes(manifest, batch_size))
+    except (KeyError, TypeError, AttributeError) as e:
+        raise BootstrapManifestException(f"Invalid manifest: {e!r}") from e
+    declared = set()
+    for node in nodes:
+        if node.id in declared:
+            raise BootstrapManifestException(f"{node.id} is declared twice")
+        declared.add(node.id)
+    return nodes
+
+
+def plan_nodes(manifest, batch_size):
+    workspace = manifest["workspace"]
+    restrictions = manifest.get("restrictions")
+
+    project_keys = set()
+    for project in manifest.get("projects", []):
+        project_keys.add(project["key"])
+        yield Node(
+            f"project:{project['key']}",
+            create_project(workspace, project),
+            [],
+        )
+
+    repository_names = set()
+    for repository in manifest.get("repositories", []):
+        repository_names.add(repository["name"])
+        project_key = repository["project_key"]
+        yield Node(
+            f"repository:{repository['name']}",
+            create_repository(workspace, repository, restrictions),
+            [f"project:{project_key}"] if project_key in project_keys else [],
+        )
+
+    invites = [
+        parse_invite(invite, index)
+        for index, invite in enumerate(manifest.get("invites", []), start=1)
+    ]
+    batches = {}
+    for batch in batch_invites(invites, batch_size):
+        repository, permission = batch[0].repository, batch[0].permission
+        number = batches[(repository, permission)] = (
+            batches.get((repository, permission), 0) + 1
+        )
+        yield Node(
+            f"invite:{repository}:{permission}:{number}",
+            invite_users(workspace, batch),
+            [f"repository:{repository}"] if repository in repository_names else [],
+        )
+
+
+def create_project(workspace, project):
+    def action(oauth_client):
+        created = ProjectCommand(workspace, oauth_client).create(
+            project.get("name", project["key"]),
+            project["key"],
+            project.get("private", True),
+            project.get("description", ""),
+        )
+        return created, None
+
+    return action
+
+
+def create_repository(workspace, repository, default_restrictions):
+    def action(oauth_client):
+        command = RepositoryCommand(
+            workspace,
+            oauth_client,
+            repository.get("restrictions", default_restrictions),
+        )
+        created = command.create(
+            repository["name"],
+            repository["project_key"],
+            repository.get("private", True),
+        )
+        failed = [
+            f"{result.kind} restriction failed ({result.status_code})"
+            for result in command.restriction_results
+            if result.status_code not in (200, 201)
+        ]
+        return created, "; ".join(failed) or None
+
+    return action
+
+
+def invite_users(workspace, batch):
+    def action(oauth_client):
+        invited = RepositoryCommand(workspace, oauth_client).add_users_to_repository(
+            [invite.email for invite in batch],
+            batch[0].repository,
+            batch[0].permission,
+        )
+        return all(invited.values()), ", ".join(invite.email for invite in batch)
+
+    return action
+
+
+class BootstrapCommand:  # pylint: disable=too-few-public-methods
+    def __init__(self, oauth_client, workers=8):
+        self.__oauth_client = oauth_client
+        self.__workers = workers
+
+    def run(self, nodes):
+        return DagExecutor(self.__workers).run(
+            [
+                Node(
+                    node.id,
+                    partial(node.action, self.__oauth_client),
+                    node.dependencies,
+                )
+                for node in nodes
+            ]
+        )
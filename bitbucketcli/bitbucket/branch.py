@@ -1,11 +1,17 @@
 from bitbucketcli.bitbucket.bitbucket import BitbucketClient
+from bitbucketcli.bitbucket.inventory import StaleInventoryException
+from bitbucketcli.bitbucket.query import Query
 
 
 class BranchCommand(BitbucketClient):
-    def __init__(self, workspace, repository, oauth_client):
+    def __init__(
+        self, workspace, repository, oauth_client, inventory=None, max_age=None
+    ):
         super().__init__(oauth_client)
         self.__workspace = workspace
         self.__repository = repository
+        self.__inventory = inventory
+        self.__max_age = max_age
 
     def bypass_push_with_pull_request(self, branch_name=None):
         branch = branch_name if branch_name else self.__get_default_branch()
@@ -16,21 +22,31 @@ class BranchCommand(BitbucketClient):
         return False
 
     def __get_default_branch(self):
+        if self.__inventory is not None:
+            try:
+                main_branch = self.__inventory.main_branch(
+                    self.__workspace, self.__repository, self.__max_age
+                )
+            except StaleInventoryException:
+                main_branch = None
+            if main_branch:
+                return main_branch
         repository_response = super().get(
-            f"2.0/repositories/{self.__workspace}/{self.__repository}"
+            f"2.0/repositories/{self.__workspace}/{self.__repository}",
+            query=Query().fields("mainbranch.name"),
         )
         repository = repository_response.json()
         return repository["mainbranch"]["name"]
 
     def __get_push_restriction_id(self, branch_name):
-        restrictions_response = super().get(
+        restrictions = super().paginate(
             f"2.0/repositories/{self.__workspace}/{self.__repository}/branch-restrictions",
-            params={"kind": "push", "pattern": branch_name},
+            query=Query()
+            .param("kind", "push")
+            .param("pattern", branch_name)
+            .fields("values.id"),
         )
-        values = restrictions_response.json()["values"]
-        if len(values) != 0:
-            return values[0]["id"]
-        return None
+        return next((restriction["id"] for restriction in restrictions), None)
 
     def __remove_restriction(self, restriction_id):
         return super().delete(
@@ -0,0 +1,144 @@
+import csv
+import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+
+import requests
+from bitbucketcli.bitbucket.repository import RepositoryCommand
+
+PERMISSIONS = ("read", "write", "admin")
+DEFAULT_BATCH_SIZE = 50
+
+Invite = namedtuple("Invite", ["email", "repository", "permission"])
+InviteResult = namedtuple(
+    "InviteResult", ["invite", "success", "error", "status_code"], defaults=(None,)
+)
+
+
+class ManifestException(Exception):
+    def __init__(self, message, line):
+        super().__init__(message)
+        self.line = line
+
+    def __str__(self):
+        return f"Invalid manifest entry at line {self.line}: {self.args[0]}"
+
+
+def manifest_format_from_name(name):
+    return "csv" if str(name).lower().endswith(".csv") else "ndjson"
+
+
+def read_manifest(stream, manifest_format="csv"):
+    if manifest_format == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield parse_invite(row, reader.line_num)
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ManifestException(e.msg, line_number) from e
+        yield parse_invite(row, line_number)
+
+
+def parse_invite(row, line_number):
+    email = (row.get("email") or "").strip()
+    repository = (row.get("repository") or "").strip()
+    permission = (row.get("permission") or "read").strip().lower()
+    if not email or not repository:
+        raise ManifestException("email and repository are required", line_number)
+    if permission not in PERMISSIONS:
+        raise ManifestException(f'permission "{permission}" is invalid', line_number)
+    return Invite(email, repository, permission)
+
+
+def batch_invites(invites, max_batch_size=DEFAULT_BATCH_SIZE):
+    groups = {}
+    for invite in invites:
+        groups.setdefault((invite.repository, invite.permission), {}).setdefault(
+            invite.email, invite
+        )
+    for group in groups.values():
+        batch = list(group.values())
+        for start in range(0, len(batch), max_batch_size):
+            yield batch[start : start + max_batch_size]
+
+
+def unique_invites(invites):
+    unique = list(dict.fromkeys(invites))
+    return unique, len(invites) - len(unique)
+
+
+def invite_id(workspace, invite):
+    return f"invite {workspace}/{invite.repository} {invite.permission} {invite.email}"
+
+
+class BulkInviteCommand:
+    def __init__(
+        self,
+        workspace,
+        oauth_client,
+        workers=8,
+        batch_size=DEFAULT_BATCH_SIZE,
+        journal=None,
+    ):
+        self.__workspace = workspace
+        self.__command = RepositoryCommand(workspace, oauth_client)
+        self.__workers = workers
+        self.__batch_size = batch_size
+        self.__journal = journal
+        self.duplicates = 0
+
+    def throttle_stats(self):
+        return self.__command.throttle_stats()
+
+    def connection_stats(self):
+        return self.__command.connection_stats()
+
+    def run(self, invites):
+        invites, self.duplicates = unique_invites(list(invites))
+        if self.__journal is not None:
+            invites = list(
+                self.__journal.pending(invites, partial(invite_id, self.__workspace))
+            )
+            self.__journal.plan(
+                invite_id(self.__workspace, invite) for invite in invites
+            )
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            futures = [
+                executor.submit(self.__invite, batch)
+                for batch in batch_invites(invites, self.__batch_size)
+            ]
+            for future in as_completed(futures):
+                for result in future.result():
+                    if self.__journal is not None:
+                        self.__journal.record(
+                            invite_id(self.__workspace, result.invite),
+                            result.success,
+                            result.status_code,
+                            result.error,
+                        )
+                    yield result
+
+    def __invite(self, batch):
+        repository, permission = batch[0].repository, batch[0].permission
+        try:
+            results = self.__command.invitation_results(
+                [invite.email for invite in batch], repository, permission
+            )
+            return [
+                InviteResult(
+                    invite,
+                    results[invite.email].invited,
+                    None,
+                    results[invite.email].status_code,
+                )
+                for invite in batch
+            ]
+        except requests.exceptions.RequestException as e:
+            return [InviteResult(invite, False, str(e)) for invite in batch]
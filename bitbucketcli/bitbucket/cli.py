@@ -1,13 +1,12 @@
+import json
 import re
 from os import getenv
 
 import click
-from bitbucketcli.bitbucket.branch import BranchCommand
-from bitbucketcli.bitbucket.project import ProjectCommand
-from bitbucketcli.bitbucket.repository import RepositoryCommand
-from bitbucketcli.bitbucket.workspace import WorkspaceCommand
-from oauthlib.oauth2 import BackendApplicationClient
-from requests_oauthlib import OAuth2Session
+
+# Only click is imported at module level so --help and shell completion stay
+# fast. Command modules, requests and the OAuth machinery are imported by the
+# commands that need them.
 
 
 def validate_email(ctx, param, value):
@@ -18,21 +17,134 @@ def validate_email(ctx, param, value):
     raise click.BadParameter(f'E-mail "{value}" format invalid.')
 
 
-def prepare_oauth_client():
+def load_restriction_template(ctx, param, value):
+    if value is None:
+        return None
+    try:
+        template = json.load(value)
+    except json.JSONDecodeError as e:
+        raise click.BadParameter(f"Invalid JSON: {e}") from e
+    if not isinstance(template, list) or not all(
+        isinstance(restriction, dict) and "kind" in restriction
+        for restriction in template
+    ):
+        raise click.BadParameter("Expected a list of restrictions with a kind.")
+    return template
+
+
+def open_journal(path, resume):
+    from bitbucketcli.bitbucket.journal import Journal
+
+    if path is None:
+        if resume:
+            raise click.BadParameter("requires --journal", param_hint="--resume")
+        return None
+    try:
+        return Journal(path, resume=resume)
+    except OSError as e:
+        raise click.BadParameter(str(e), param_hint="--journal") from e
+
+
+def close_journal(journal):
+    if journal is None:
+        return
+    journal.close()
+    if journal.skipped:
+        click.echo(
+            f"Skipped {journal.skipped} operations already completed in the journal.",
+            err=True,
+        )
+
+
+def echo_run_stats(command):
+    for origin, stats in command.connection_stats().items():
+        click.echo(
+            f"{origin}: {stats['requests']} requests over {stats['connections']} connections, {stats['reused']} reused",
+            err=True,
+        )
+    for host, stats in sorted(command.throttle_stats().items()):
+        click.echo(
+            f"{host}: throttled for {stats['throttled_seconds']:.1f}s, {stats['retries']} retries"
+            + (
+                f", concurrency limit {stats['concurrency_limit']}"
+                if "concurrency_limit" in stats
+                else ""
+            ),
+            err=True,
+        )
+
+
+# Set by the daemon and by batch so consecutive commands reuse warm sessions.
+session_cache = None
+
+
+def prepare_oauth_client(pool_size=None):
+    if session_cache is not None:
+        return session_cache.get(pool_size)
+    return create_oauth_client(pool_size)
+
+
+def create_oauth_client(pool_size=None):
+    from bitbucketcli.bitbucket.token_cache import TokenCache
+    from bitbucketcli.bitbucket.token_manager import TokenManager
+    from bitbucketcli.bitbucket.transport import configure_transport
+    from oauthlib.oauth2 import BackendApplicationClient
+    from requests_oauthlib import OAuth2Session
+
     client_id = getenv("BITBUCKET_OAUTH_CONSUMER_KEY")
     client_secret = getenv("BITBUCKET_OAUTH_CONSUMER_SECRET")
     token_url = getenv("BITBUCKET_TOKEN_URL")
     client = BackendApplicationClient(client_id=client_id)
     oauth = OAuth2Session(client=client)
-    oauth.fetch_token(
-        token_url=token_url, client_id=client_id, client_secret=client_secret
+    configure_transport(
+        oauth,
+        [
+            getenv("BITBUCKET_API_URL"),
+            getenv("BITBUCKET_INTERNAL_API_URL"),
+            token_url,
+        ],
+        pool_size=pool_size,
     )
+    token_cache = TokenCache()
+    TokenManager(
+        oauth,
+        lambda rejected: token_cache.fetch(
+            client_id,
+            token_url,
+            lambda: oauth.fetch_token(
+                token_url=token_url, client_id=client_id, client_secret=client_secret
+            ),
+            rejected,
+        ),
+    ).start()
     return oauth
 
 
 @click.group()
-def cli():
+@click.option(
+    "--trace",
+    type=click.File("w"),
+    default=None,
+    help="Write one NDJSON line per API request to this file and print a summary per endpoint at exit",
+)
+@click.pass_context
+def cli(ctx, trace):
     """A command line tool to access bitbucket cloud functionalities."""
+    if trace is not None:
+        start_trace(ctx, trace)
+
+
+def start_trace(ctx, stream):
+    from bitbucketcli.bitbucket.bitbucket import request_hook
+    from bitbucketcli.bitbucket.tracing import Tracer
+
+    tracer = ctx.with_resource(request_hook(Tracer(stream)))
+
+    def finish():
+        for line in tracer.summary():
+            click.echo(line, err=True)
+
+    ctx.call_on_close(finish)
 
 
 @cli.command(short_help="Create a new project in a specific workspace.")
@@ -53,6 +165,8 @@ def cli():
 )
 @click.option("--private/--public", is_flag=True, show_default=True, default=True)
 def create_project(workspace, name, key, description, private):
+    from bitbucketcli.bitbucket.project import ProjectCommand
+
     project = ProjectCommand(workspace, prepare_oauth_client())
     created = project.create(name, key, private, description)
     if created:
@@ -77,18 +191,145 @@ def create_project(workspace, name, key, description, private):
     "--project-key", prompt="Project key", type=click.STRING, help="Project key"
 )
 @click.option("--private/--public", is_flag=True, show_default=True, default=True)
-def create_repository(workspace, name, project_key, private):
+@click.option(
+    "--restrictions",
+    type=click.File("r"),
+    default=None,
+    callback=load_restriction_template,
+    help="JSON file with the list of branch restrictions applied to the main branch, by default push, force and delete",
+)
+def create_repository(workspace, name, project_key, private, restrictions):
     """Create a new repository in a specific project."""
-    repository = RepositoryCommand(workspace, prepare_oauth_client())
+    from bitbucketcli.bitbucket.repository import RepositoryCommand
+
+    repository = RepositoryCommand(workspace, prepare_oauth_client(), restrictions)
     created = repository.create(name, project_key, private)
     if created:
         click.echo(
             f"Repository created with success. You can access here: https://bitbucket.org/{workspace}/{name}/src"
         )
+        for result in repository.restriction_results:
+            if result.status_code not in (200, 201):
+                click.ClickException(
+                    f"Failed to apply {result.kind} restriction to branch {result.pattern} (status {result.status_code})."
+                ).show()
     else:
         click.ClickException("Repository failed to create.").show()
 
 
+@cli.command(
+    short_help="Make the branch restrictions of repositories match a template."
+)
+@click.option(
+    "--workspace",
+    prompt="Workspace name",
+    type=click.STRING,
+    help="Workspace name where the repositories belong",
+)
+@click.option(
+    "--repository",
+    "repositories",
+    multiple=True,
+    type=click.STRING,
+    help="Repository name, may be repeated, by default every repository of the workspace",
+)
+@click.option(
+    "--restrictions",
+    type=click.File("r"),
+    default=None,
+    callback=load_restriction_template,
+    help="JSON file with the desired branch restrictions, by default push, force and delete on the main branch",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Print the restrictions that would be created and deleted without changing them",
+)
+@click.option(
+    "--prune",
+    is_flag=True,
+    default=False,
+    help="Also delete the restrictions on kinds and branches the template does not mention",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of repositories listed and changed concurrently",
+)
+@click.option(
+    "--journal",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Append every planned and finished change to this NDJSON file",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Skip the changes the journal records as completed",
+)
+def sync_branch_restrictions(
+    workspace, repositories, restrictions, dry_run, prune, workers, journal, resume
+):
+    """Create and delete only the branch restrictions that differ from a template."""
+    from bitbucketcli.bitbucket.restrictions import RestrictionSyncCommand
+
+    journal = None if dry_run else open_journal(journal, resume)
+    command = RestrictionSyncCommand(
+        workspace,
+        prepare_oauth_client(pool_size=workers),
+        restrictions,
+        workers,
+        journal,
+        prune,
+    )
+    plans = []
+    for plan in command.plan(repositories):
+        if plan.error:
+            click.ClickException(
+                f"Failed to read the branch restrictions of {plan.repository}: {plan.error}"
+            ).show()
+            continue
+        plans.append(plan)
+        for restriction in plan.deletes:
+            click.echo(
+                f"{plan.repository}: delete {restriction['kind']} restriction on {restriction['pattern']} (id {restriction['id']})"
+            )
+        for restriction in plan.creates:
+            click.echo(
+                f"{plan.repository}: create {restriction['kind']} restriction on {restriction['pattern']}"
+            )
+
+    creates = sum(len(plan.creates) for plan in plans)
+    deletes = sum(len(plan.deletes) for plan in plans)
+    click.echo(
+        f"{creates} to create, {deletes} to delete, "
+        f"{sum(len(plan.unchanged) for plan in plans)} unchanged in {len(plans)} repositories."
+    )
+    if dry_run:
+        echo_run_stats(command)
+        return
+
+    failures = 0
+    try:
+        for result in command.apply(plans):
+            if result.status_code not in (200, 201, 204):
+                failures += 1
+                click.ClickException(
+                    f"Failed to {result.action} {result.kind} restriction on {result.pattern} of {result.repository} (status {result.status_code})."
+                ).show()
+    finally:
+        close_journal(journal)
+        echo_run_stats(command)
+    if failures:
+        click.ClickException(
+            f"{failures} of {creates + deletes} changes failed."
+        ).show()
+
+
 @cli.command(
     short_help="Add the user to a repository. An email with the invite will be sent to the user by default."
 )
@@ -116,6 +357,8 @@ def create_repository(workspace, name, project_key, private):
     help="Permission of the user inside of the repository",
 )
 def add_user_to_repository(workspace, email, repository, permission):
+    from bitbucketcli.bitbucket.repository import RepositoryCommand
+
     command = RepositoryCommand(workspace, prepare_oauth_client())
     if command.add_user_to_repository(email, repository, permission):
         click.echo(
@@ -127,6 +370,165 @@ def add_user_to_repository(workspace, email, repository, permission):
         ).show()
 
 
+@cli.command(short_help="Add users to repositories listed in a CSV or NDJSON manifest.")
+@click.option(
+    "--workspace",
+    prompt="Workspace name",
+    type=click.STRING,
+    help="Workspace name where the repositories belong",
+)
+@click.option(
+    "--manifest",
+    required=True,
+    type=click.File("r"),
+    help="CSV or NDJSON file with email, repository and permission fields",
+)
+@click.option(
+    "--format",
+    "manifest_format",
+    type=click.Choice(["csv", "ndjson"], case_sensitive=False),
+    default=None,
+    help="Manifest format, if not defined, it is inferred from the file extension",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of invite requests sent concurrently",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=50,
+    show_default=True,
+    help="Maximum number of emails sent in one invite request for the same repository and permission",
+)
+@click.option(
+    "--journal",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Append every planned and finished invite to this NDJSON file",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Skip the invites the journal records as completed",
+)
+def bulk_add_user_to_repository(
+    workspace, manifest, manifest_format, workers, batch_size, journal, resume
+):
+    from bitbucketcli.bitbucket.bulk import (
+        BulkInviteCommand,
+        ManifestException,
+        manifest_format_from_name,
+        read_manifest,
+    )
+
+    try:
+        invites = list(
+            read_manifest(
+                manifest, manifest_format or manifest_format_from_name(manifest.name)
+            )
+        )
+    except ManifestException as e:
+        raise click.BadParameter(str(e), param_hint="--manifest") from e
+
+    journal = open_journal(journal, resume)
+    command = BulkInviteCommand(
+        workspace,
+        prepare_oauth_client(pool_size=workers),
+        workers,
+        batch_size,
+        journal,
+    )
+    sent = 0
+    failures = 0
+    try:
+        for result in command.run(invites):
+            sent += 1
+            invite = result.invite
+            if result.success:
+                click.echo(
+                    f"Invite to access the repository {invite.repository} was created with success for user with email {invite.email}"
+                )
+            else:
+                failures += 1
+                click.echo(
+                    f"Failed to invite to access the repository {invite.repository} for user with email {invite.email}."
+                    + (f" {result.error}" if result.error else ""),
+                    err=True,
+                )
+    finally:
+        close_journal(journal)
+        if command.duplicates:
+            click.echo(
+                f"Skipped {command.duplicates} duplicate invites in the manifest.",
+                err=True,
+            )
+        echo_run_stats(command)
+    if failures:
+        click.ClickException(f"{failures} of {sent} invites failed.").show()
+
+
+@cli.command(
+    short_help="Create projects, repositories, restrictions and invites from a manifest."
+)
+@click.option(
+    "--manifest",
+    required=True,
+    type=click.File("r"),
+    help="JSON file with the workspace, projects, repositories, restrictions and invites",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of independent steps run concurrently",
+)
+def bootstrap(manifest, workers):
+    """Create everything declared in a manifest, in dependency order."""
+    import time
+
+    from bitbucketcli.bitbucket.bootstrap import (
+        SUCCEEDED,
+        BootstrapCommand,
+        BootstrapManifestException,
+        build_plan,
+    )
+    from bitbucketcli.bitbucket.bulk import ManifestException
+
+    try:
+        nodes = build_plan(json.load(manifest))
+    except json.JSONDecodeError as e:
+        raise click.BadParameter(f"Invalid JSON: {e}", param_hint="--manifest") from e
+    except (BootstrapManifestException, ManifestException) as e:
+        raise click.BadParameter(str(e), param_hint="--manifest") from e
+
+    started = time.perf_counter()
+    command = BootstrapCommand(prepare_oauth_client(pool_size=workers), workers)
+    failures = 0
+    for result in command.run(nodes):
+        line = f"{result.id} {result.status} in {result.elapsed * 1000:.0f}ms" + (
+            f": {result.detail}" if result.detail else ""
+        )
+        if result.status == SUCCEEDED:
+            click.echo(line)
+        else:
+            failures += 1
+            click.echo(line, err=True)
+    click.echo(
+        f"Bootstrap finished {len(nodes)} steps in {time.perf_counter() - started:.1f}s",
+        err=True,
+    )
+    if failures:
+        click.ClickException(
+            f"{failures} of {len(nodes)} steps did not succeed."
+        ).show()
+
+
 @cli.command(short_help="Remove a user from a repository.")
 @click.option(
     "--workspace",
@@ -144,6 +546,8 @@ def add_user_to_repository(workspace, email, repository, permission):
     "--repository", prompt="Repository name", type=click.STRING, help="Repository name"
 )
 def remove_user_from_repository(workspace, account_id, repository):
+    from bitbucketcli.bitbucket.repository import RepositoryCommand
+
     command = RepositoryCommand(workspace, prepare_oauth_client())
     if command.remove_user_from_repository(repository, account_id):
         click.echo(
@@ -176,8 +580,23 @@ def remove_user_from_repository(workspace, account_id, repository):
     type=click.STRING,
     help="Branch name, if not defined, the default branch will be used",
 )
-def enable_bypass_branch_pull_request(workspace, repository, branch):
-    command = BranchCommand(workspace, repository, prepare_oauth_client())
+@click.option(
+    "--inventory-max-age",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Read the default branch from the local inventory when it was synced less than this many seconds ago",
+)
+def enable_bypass_branch_pull_request(workspace, repository, branch, inventory_max_age):
+    from bitbucketcli.bitbucket.branch import BranchCommand
+
+    inventory = None
+    if inventory_max_age is not None and branch is None:
+        from bitbucketcli.bitbucket.inventory import Inventory
+
+        inventory = Inventory()
+    command = BranchCommand(
+        workspace, repository, prepare_oauth_client(), inventory, inventory_max_age
+    )
     if command.bypass_push_with_pull_request(branch):
         click.echo(
             f"Branch bypass pull request was enabled with success for repository {repository}"
@@ -203,6 +622,8 @@ def enable_bypass_branch_pull_request(workspace, repository, branch):
 )
 @click.option("--group", prompt="Group name", type=click.STRING, help="Group name")
 def remove_user_from_group(workspace, account_id, group):
+    from bitbucketcli.bitbucket.workspace import WorkspaceCommand
+
     workspace_command = WorkspaceCommand(prepare_oauth_client())
     if workspace_command.remove_user_from_group(workspace, account_id, group):
         click.echo(
@@ -212,3 +633,294 @@ def remove_user_from_group(workspace, account_id, group):
         click.ClickException(
             f"Failed to remove user with account id {account_id} from the group {group}"
         ).show()
+
+
+@cli.command(short_help="Remove a user from every repository and group of a workspace.")
+@click.option(
+    "--workspace",
+    prompt="Workspace name",
+    type=click.STRING,
+    help="Workspace name the user is removed from",
+)
+@click.option(
+    "--account-id",
+    prompt="Account ID",
+    type=click.STRING,
+    help="Account ID - You can obtain your account id here: https://id.atlassian.com/gateway/api/me",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=16,
+    show_default=True,
+    help="Number of removals sent concurrently",
+)
+def offboard_user(workspace, account_id, workers):
+    """Remove a user from every repository and group of a workspace."""
+    from bitbucketcli.bitbucket.bitbucket import BitbucketApiException
+    from bitbucketcli.bitbucket.offboarding import OffboardCommand
+
+    command = OffboardCommand(
+        workspace, prepare_oauth_client(pool_size=workers), workers
+    )
+    removed = 0
+    failures = 0
+    try:
+        for result in command.run(account_id):
+            if result.status_code == 204:
+                removed += 1
+                click.echo(f"Removed from {result.target_type} {result.target}")
+            elif result.status_code == 404:
+                click.echo(f"No access to {result.target_type} {result.target}")
+            else:
+                failures += 1
+                click.echo(
+                    f"Failed to remove from {result.target_type} {result.target}"
+                    + (
+                        f" (status {result.status_code})"
+                        if result.status_code
+                        else f": {result.error}"
+                    ),
+                    err=True,
+                )
+    except BitbucketApiException as e:
+        click.ClickException(
+            f"Failed to offboard user with account id {account_id}: {e}"
+        ).show()
+        echo_run_stats(command)
+        return
+    click.echo(f"User with account id {account_id} removed from {removed} targets.")
+    echo_run_stats(command)
+    if failures:
+        click.ClickException(f"{failures} removals failed.").show()
+
+
+@cli.command(short_help="Store the workspace inventory in a local SQLite database.")
+@click.option(
+    "--workspace",
+    prompt="Workspace name",
+    type=click.STRING,
+    help="Workspace name to be synced",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of listings requested concurrently",
+)
+@click.option(
+    "--full",
+    is_flag=True,
+    default=False,
+    help="List everything again instead of only the repositories updated since the last sync",
+)
+def sync_inventory(workspace, workers, full):
+    """Store projects, repositories, restrictions and permissions locally."""
+    from bitbucketcli.bitbucket.bitbucket import BitbucketApiException
+    from bitbucketcli.bitbucket.inventory import Inventory, InventorySyncCommand
+
+    inventory = Inventory()
+    command = InventorySyncCommand(
+        workspace, prepare_oauth_client(pool_size=workers), inventory, workers
+    )
+    try:
+        counts = command.run(full)
+    except BitbucketApiException as e:
+        click.ClickException(f"Failed to sync the inventory of {workspace}: {e}").show()
+        return
+    finally:
+        inventory.close()
+    click.echo(
+        f"Inventory of {workspace} synced with "
+        + ", ".join(f"{count} {table}" for table, count in counts.items())
+    )
+
+
+@cli.command(short_help="Query the local inventory of a workspace.")
+@click.option(
+    "--workspace",
+    prompt="Workspace name",
+    type=click.STRING,
+    help="Workspace name to be queried",
+)
+@click.argument(
+    "table",
+    type=click.Choice(["projects", "repositories", "restrictions", "permissions"]),
+)
+@click.option("--project-key", default=None, help="Filter repositories by project")
+@click.option("--repository", default=None, help="Filter restrictions by repository")
+@click.option("--pattern", default=None, help="Filter restrictions by branch pattern")
+@click.option("--account-id", default=None, help="Filter permissions by user")
+@click.option(
+    "--max-age",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Fail when the inventory was synced more than this many seconds ago",
+)
+def query_inventory(
+    workspace, table, project_key, repository, pattern, account_id, max_age
+):
+    """Print inventory rows as NDJSON without calling Bitbucket."""
+    from bitbucketcli.bitbucket.inventory import (
+        FULL_SYNC_TABLES,
+        Inventory,
+        StaleInventoryException,
+    )
+
+    filters = {
+        "projects": {},
+        "repositories": {"project_key": project_key},
+        "restrictions": {"pattern": pattern, "repository": repository},
+        "permissions": {"account_id": account_id},
+    }[table]
+    inventory = Inventory()
+    try:
+        rows = getattr(inventory, table)(workspace, max_age=max_age, **filters)
+    except StaleInventoryException as e:
+        sync = (
+            "sync-inventory --full" if table in FULL_SYNC_TABLES else "sync-inventory"
+        )
+        click.ClickException(f"{e}, run {sync} first.").show()
+        return
+    finally:
+        inventory.close()
+    for row in rows:
+        click.echo(json.dumps(row))
+
+
+@cli.command(short_help="Run many commands read from stdin in one process.")
+@click.option(
+    "--input",
+    "source",
+    type=click.File("r"),
+    default="-",
+    show_default=True,
+    help="File with one command per line, as shell words or NDJSON objects",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="Number of independent commands run concurrently",
+)
+def batch(source, workers):
+    """Run one command per line sharing a single session, in dependency order."""
+    global session_cache
+    import time
+
+    from bitbucketcli.bitbucket.batch import (
+        BatchCommand,
+        BatchScriptException,
+        parse_script,
+    )
+    from bitbucketcli.bitbucket.bootstrap import SUCCEEDED
+    from bitbucketcli.bitbucket.daemon import SessionCache
+    from bitbucketcli.bitbucket.token_cache import TokenCache
+
+    try:
+        lines = parse_script(source.read().splitlines())
+    except BatchScriptException as e:
+        raise click.BadParameter(str(e), param_hint="--input") from e
+
+    started = time.perf_counter()
+    owns_session_cache = session_cache is None
+    if owns_session_cache:
+        session_cache = SessionCache(
+            lambda pool_size: create_oauth_client(max(pool_size or 0, workers)),
+            TokenCache().is_fresh,
+        )
+    failures = 0
+    try:
+        for result in BatchCommand(cli, workers).run(lines):
+            click.echo(result.stdout, nl=False)
+            click.echo(result.stderr, nl=False, err=True)
+            if result.status != SUCCEEDED:
+                failures += 1
+                click.echo(
+                    f"line {result.number} {result.status}"
+                    + (f": {result.detail}" if result.detail else ""),
+                    err=True,
+                )
+    finally:
+        if owns_session_cache:
+            session_cache.close()
+            session_cache = None
+    click.echo(
+        f"Batch finished {len(lines)} commands in {time.perf_counter() - started:.1f}s",
+        err=True,
+    )
+    if failures:
+        click.ClickException(
+            f"{failures} of {len(lines)} commands did not succeed."
+        ).show()
+
+
+@cli.group(short_help="Serve commands from a background process with warm sessions.")
+def daemon():
+    """Keep OAuth sessions, connection pools and caches warm between commands.
+
+    While the daemon listens, bitbucket-cli forwards every command to it over a
+    Unix socket and falls back to running in-process when it is not running."""
+
+
+@daemon.command(short_help="Run the daemon in the foreground.")
+@click.option(
+    "--socket",
+    "socket_path",
+    default=None,
+    help="Unix socket path, by default BITBUCKET_DAEMON_SOCKET or $XDG_RUNTIME_DIR/bitbucket-cli.sock",
+)
+def start(socket_path):
+    global session_cache
+    from bitbucketcli.bitbucket.daemon import (
+        DaemonServer,
+        SessionCache,
+        default_socket_path,
+    )
+    from bitbucketcli.bitbucket.token_cache import TokenCache
+
+    socket_path = socket_path or default_socket_path()
+    try:
+        server = DaemonServer(
+            socket_path, lambda args: cli.main(args, prog_name="bitbucket-cli")
+        )
+    except OSError as e:
+        raise click.ClickException(str(e)) from e
+    session_cache = SessionCache(create_oauth_client, TokenCache().is_fresh)
+    click.echo(f"Listening on {socket_path}", err=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        session_cache.close()
+        session_cache = None
+
+
+@daemon.command(short_help="Stop a running daemon.")
+@click.option("--socket", "socket_path", default=None, help="Unix socket path")
+def stop(socket_path):
+    from bitbucketcli.bitbucket.daemon import DaemonUnavailableException, request
+
+    try:
+        request({"control": "stop"}, socket_path)
+    except DaemonUnavailableException:
+        click.ClickException("The daemon is not running.").show()
+        return
+    click.echo("Daemon stopped.")
+
+
+@daemon.command(short_help="Show whether the daemon is running.")
+@click.option("--socket", "socket_path", default=None, help="Unix socket path")
+def status(socket_path):
+    from bitbucketcli.bitbucket.daemon import DaemonUnavailableException, request
+
+    try:
+        response = request({"control": "status"}, socket_path)
+    except DaemonUnavailableException:
+        click.echo("The daemon is not running.")
+        return
+    click.echo(
+        f"The daemon is running with pid {response['pid']} and served {response['commands']} commands."
+    )
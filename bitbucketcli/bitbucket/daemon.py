@@ -0,0 +1,378 @@
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from os import getenv
+from pathlib import Path
+
+# Only the standard library is imported here: forwarding a command to a running
+# daemon must not pay for click, requests or the OAuth machinery. dotenv is
+# imported when a command runs.
+
+
+def default_socket_path():
+    runtime_dir = getenv("XDG_RUNTIME_DIR") or os.path.join(
+        Path.home(), ".cache", "bitbucket-cli"
+    )
+    return getenv(
+        "BITBUCKET_DAEMON_SOCKET", os.path.join(runtime_dir, "bitbucket-cli.sock")
+    )
+
+
+class DaemonUnavailableException(Exception):
+    pass
+
+
+def send_message(stream, message):
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def receive_message(stream):
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("The connection was closed without a response")
+    return json.loads(line)
+
+
+# Variables that only configure the forwarding client itself.
+CLIENT_VARIABLES = ("BITBUCKET_DAEMON", "BITBUCKET_DAEMON_SOCKET")
+
+
+def connect(socket_path=None):
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path or default_socket_path())
+    except OSError as e:
+        connection.close()
+        raise DaemonUnavailableException(str(e)) from e
+    return connection
+
+
+def request(message, socket_path=None):
+    connection = connect(socket_path)
+    try:
+        with connection.makefile("rwb") as stream:
+            send_message(stream, message)
+            return receive_message(stream)
+    finally:
+        connection.close()
+
+
+def forward(args, stdin=None, cwd=None, socket_path=None, output=None):
+    # Connect first: stdin is only consumed once the daemon will run the command.
+    # The output streams back line by line, to output(name, text) when given and
+    # otherwise collected into the returned response.
+    collected = {"stdout": [], "stderr": []}
+    connection = connect(socket_path)
+    try:
+        with connection.makefile("rwb") as stream:
+            send_message(
+                stream,
+                {
+                    "args": list(args),
+                    "cwd": cwd or os.getcwd(),
+                    "stdin": stdin() if callable(stdin) else stdin,
+                    "environment": client_environment(),
+                },
+            )
+            while True:
+                response = receive_message(stream)
+                if "exit_code" in response or "fallback" in response:
+                    break
+                for name, text in response.items():
+                    if output is None:
+                        collected[name].append(text)
+                    else:
+                        output(name, text)
+    finally:
+        connection.close()
+    if output is None and "exit_code" in response:
+        response = {
+            **{name: "".join(texts) for name, texts in collected.items()},
+            "exit_code": response["exit_code"],
+        }
+    return response
+
+
+def write_output(name, text):
+    stream = sys.stdout if name == "stdout" else sys.stderr
+    stream.write(text)
+    stream.flush()
+
+
+def client_environment():
+    return {
+        name: value
+        for name, value in os.environ.items()
+        if name.startswith("BITBUCKET_") and name not in CLIENT_VARIABLES
+    }
+
+
+def reads_stdin(args):
+    if args[:1] == ["batch"] and not any(
+        arg == "--input" or arg.startswith("--input=") for arg in args
+    ):
+        return True
+    return any(arg == "-" or arg.endswith("=-") for arg in args)
+
+
+def load_environment(args):
+    # .env must be loaded before any setting is read, the daemon's included.
+    # Help never reads one, so it skips the import.
+    if args and "--help" not in args:
+        from dotenv import (  # pylint: disable=import-outside-toplevel
+            load_dotenv,
+        )
+
+        load_dotenv()
+
+
+def dispatch(args):
+    load_environment(args)
+    stdin = None
+    if getenv("BITBUCKET_DAEMON", "1") != "0" and args[:1] != ["daemon"]:
+        response = None
+        interactive = sys.stdin is not None and sys.stdin.isatty()
+        if not (interactive and reads_stdin(args)):
+            read = []
+
+            def read_stdin():
+                if not reads_stdin(args) or sys.stdin is None:
+                    return None
+                read.append(sys.stdin.read())
+                return read[0]
+
+            try:
+                response = forward(args, read_stdin, output=write_output)
+            except DaemonUnavailableException:
+                pass
+            if read:
+                stdin = read[0]
+        if response is not None and "fallback" not in response:
+            sys.exit(response["exit_code"])
+
+    # Imported late: forwarding must not pay for loading the commands.
+    from bitbucketcli.bitbucket.cli import (  # pylint: disable=import-outside-toplevel
+        cli,
+    )
+
+    if stdin is not None:
+        # The daemon declined after stdin was read, hand it to the command.
+        sys.stdin = io.StringIO(stdin)
+    cli.main(args, prog_name="bitbucket-cli")
+
+
+class InteractiveInputRequired(BaseException):
+    pass
+
+
+class InteractiveInput(io.TextIOBase):
+    # Stands in for the client's terminal: any read means the command wants to
+    # prompt, which only works in the client's own process.
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        raise InteractiveInputRequired()
+
+    def readline(self, size=-1):
+        raise InteractiveInputRequired()
+
+
+class StreamedOutput(io.TextIOBase):
+    # Sends every complete line as soon as it is written. A trailing partial
+    # line, like a prompt, is held back so the command can still fall back to
+    # the client before anything of it was shown.
+    def __init__(self, name, send):
+        self.__name = name
+        self.__send = send
+        self.__lock = threading.Lock()
+        self.__pending = ""
+        self.streamed = False
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        with self.__lock:
+            lines, newline, self.__pending = (self.__pending + text).rpartition("\n")
+            if newline:
+                self.__emit(lines + newline)
+        return len(text)
+
+    def finish(self):
+        with self.__lock:
+            if self.__pending:
+                self.__emit(self.__pending)
+                self.__pending = ""
+
+    def __emit(self, text):
+        self.streamed = True
+        try:
+            self.__send({self.__name: text})
+        except OSError:
+            # The client went away, the command still runs to completion.
+            pass
+
+
+class SessionCache:
+    def __init__(self, factory, is_fresh):
+        self.__factory = factory
+        self.__is_fresh = is_fresh
+        self.__lock = threading.Lock()
+        self.__sessions = {}
+
+    def get(self, pool_size=None):
+        with self.__lock:
+            session = self.__sessions.get(pool_size)
+            if session is None or not self.__is_fresh(session.token):
+                if session is not None:
+                    # Commands still running may hold the stale session, only
+                    # its background refresh stops.
+                    stop_token_refresh(session)
+                session = self.__sessions[pool_size] = self.__factory(pool_size)
+            return session
+
+    def close(self):
+        with self.__lock:
+            sessions = list(self.__sessions.values())
+            self.__sessions.clear()
+        for session in sessions:
+            stop_token_refresh(session)
+            session.close()
+
+
+def stop_token_refresh(session):
+    token_manager = getattr(session, "token_manager", None)
+    if token_manager is not None:
+        token_manager.close()
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            message = receive_message(self.rfile)
+        except (ConnectionError, ValueError):
+            return
+        if message.get("control") == "stop":
+            send_message(self.wfile, {"stopping": True})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        elif message.get("control") == "status":
+            send_message(
+                self.wfile, {"pid": os.getpid(), "commands": self.server.commands}
+            )
+        else:
+            lock = threading.Lock()
+
+            def send(response):
+                with lock:
+                    send_message(self.wfile, response)
+
+            send(self.server.execute(message, send))
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    # Connections are served on their own threads so status, stop and busy
+    # replies never wait, but commands share the process streams and working
+    # directory, so only one runs at a time.
+    daemon_threads = True
+
+    def __init__(self, socket_path, command):
+        self.socket_path = socket_path
+        self.commands = 0
+        self.environment = client_environment()
+        self.__command = command
+        self.__running = threading.Lock()
+        prepare_socket_path(socket_path)
+        super().__init__(socket_path, DaemonHandler)
+        os.chmod(socket_path, 0o600)
+
+    def execute(self, message, send):
+        if message.get("environment", self.environment) != self.environment:
+            return {"fallback": "environment"}
+        if not self.__running.acquire(  # pylint: disable=consider-using-with
+            blocking=False
+        ):
+            return {"fallback": "busy"}
+        try:
+            return self.__execute(message, send)
+        finally:
+            self.__running.release()
+
+    def __execute(self, message, send):
+        stdout = StreamedOutput("stdout", send)
+        stderr = StreamedOutput("stderr", send)
+        if message.get("stdin") is None:
+            stdin = InteractiveInput()
+        else:
+            stdin = io.TextIOWrapper(io.BytesIO(message["stdin"].encode()))
+        previous_cwd = os.getcwd()
+        previous_stdin = sys.stdin
+        try:
+            os.chdir(message.get("cwd") or previous_cwd)
+            sys.stdin = stdin
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    exit_code = run_command(self.__command, message["args"])
+                except InteractiveInputRequired:
+                    if not (stdout.streamed or stderr.streamed):
+                        return {"fallback": "interactive"}
+                    print(
+                        "Error: The command needs interactive input, run it with"
+                        " BITBUCKET_DAEMON=0",
+                        file=sys.stderr,
+                    )
+                    exit_code = 1
+        finally:
+            sys.stdin = previous_stdin
+            os.chdir(previous_cwd)
+        stdout.finish()
+        stderr.finish()
+        self.commands += 1
+        return {"exit_code": exit_code}
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def run_command(command, args):
+    try:
+        command(args)
+    except SystemExit as e:
+        return exit_status(e)
+    except Exception:  # pylint: disable=broad-exception-caught
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def exit_status(error):
+    if error.code is None:
+        return 0
+    if isinstance(error.code, int):
+        return error.code
+    print(error.code, file=sys.stderr)
+    return 1
+
+
+def prepare_socket_path(socket_path):
+    directory = os.path.dirname(socket_path) or "."
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if not os.path.exists(socket_path):
+        return
+    try:
+        request({"control": "status"}, socket_path)
+    except (DaemonUnavailableException, ConnectionError):
+        os.unlink(socket_path)
+        return
+    raise OSError(f"A daemon is already listening on {socket_path}")
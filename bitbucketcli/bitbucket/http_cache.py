@@ -0,0 +1,192 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from os import getenv
+from pathlib import Path
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+CacheEntry = namedtuple(
+    "CacheEntry", ["url", "etag", "last_modified", "headers", "content"]
+)
+
+
+class HttpCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, path=None):
+        self.__max_bytes = max_bytes
+        self.__path = Path(path) if path else None
+        self.__lock = threading.Lock()
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+        self.revalidated = 0
+        self.stored = 0
+        self.__load()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_bytes=int(getenv("BITBUCKET_HTTP_CACHE_SIZE", str(DEFAULT_MAX_BYTES))),
+            path=getenv("BITBUCKET_HTTP_CACHE_PATH"),
+        )
+
+    @staticmethod
+    def key(url, params=None):
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()), doseq=True)}"
+
+    def validators(self, key):
+        with self.__lock:
+            entry = self.__entries.get(key)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def update(self, key, response):
+        if response.status_code == 304:
+            with self.__lock:
+                entry = self.__entries.get(key)
+                if entry is not None:
+                    self.__entries.move_to_end(key)
+                    self.revalidated += 1
+            if entry is not None:
+                return cached_response(entry, response)
+            return response
+        if response.status_code != 200:
+            return response
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        etag = etag if isinstance(etag, str) else None
+        last_modified = last_modified if isinstance(last_modified, str) else None
+        if not (etag or last_modified) or not isinstance(response.content, bytes):
+            return response
+        entry = CacheEntry(
+            response.url if isinstance(response.url, str) else key,
+            etag,
+            last_modified,
+            {
+                name: value
+                for name, value in response.headers.items()
+                if name.lower() in ("content-type", "etag", "last-modified")
+            },
+            response.content,
+        )
+        self.__store(key, entry)
+        return response
+
+    def stats(self):
+        with self.__lock:
+            return {
+                "entries": len(self.__entries),
+                "bytes": self.__bytes,
+                "revalidated": self.revalidated,
+                "stored": self.stored,
+            }
+
+    def __store(self, key, entry):
+        size = len(entry.content)
+        if size > self.__max_bytes:
+            return
+        with self.__lock:
+            self.stored += 1
+            previous = self.__entries.pop(key, None)
+            if previous is not None:
+                self.__bytes -= len(previous.content)
+            self.__entries[key] = entry
+            self.__bytes += size
+            evicted = []
+            while self.__bytes > self.__max_bytes:
+                evicted_key, evicted_entry = self.__entries.popitem(last=False)
+                self.__bytes -= len(evicted_entry.content)
+                evicted.append(evicted_key)
+            self.__save(key, entry, evicted)
+
+    def __file(self, key):
+        return self.__path / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def __load(self):
+        if not self.__path or not self.__path.is_dir():
+            return
+        files = sorted(
+            self.__path.glob("*.json"), key=lambda file: file.stat().st_mtime
+        )
+        for file in files:
+            try:
+                with open(file, encoding="utf-8") as cache_file:
+                    stored = json.load(cache_file)
+                key = stored["key"]
+                entry = CacheEntry(
+                    stored["url"],
+                    stored["etag"],
+                    stored["last_modified"],
+                    stored["headers"],
+                    base64.b64decode(stored["content"]),
+                )
+            except (OSError, KeyError, ValueError):
+                continue
+            self.__entries[key] = entry
+            self.__bytes += len(entry.content)
+        while self.__bytes > self.__max_bytes:
+            evicted_key, evicted_entry = self.__entries.popitem(last=False)
+            self.__bytes -= len(evicted_entry.content)
+            self.__file(evicted_key).unlink(missing_ok=True)
+
+    def __save(self, key, entry, evicted):
+        if not self.__path:
+            return
+        # Cached responses can hold private repository data.
+        self.__path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        for evicted_key in evicted:
+            self.__file(evicted_key).unlink(missing_ok=True)
+        if key in evicted:
+            return
+        path = self.__file(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        descriptor = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(descriptor, "w", encoding="utf-8") as cache_file:
+            json.dump(
+                {
+                    "key": key,
+                    **entry._asdict(),
+                    "content": base64.b64encode(entry.content).decode(),
+                },
+                cache_file,
+            )
+        os.replace(tmp_path, path)
+
+
+def cached_response(entry, not_modified):
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = "OK"
+    response.url = entry.url
+    response.headers = CaseInsensitiveDict(entry.headers)
+    response._content = entry.content  # pylint: disable=protected-access
+    response.request = getattr(not_modified, "request", None)
+    response.from_cache = True
+    return response
+
+
+_default_http_cache = None  # pylint: disable=invalid-name
+_default_http_cache_lock = threading.Lock()
+
+
+def default_http_cache():
+    global _default_http_cache  # pylint: disable=global-statement
+    with _default_http_cache_lock:
+        if _default_http_cache is None:
+            _default_http_cache = HttpCache.from_env()
+        return _default_http_cache
@@ -0,0 +1,425 @@
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from os import getenv
+from pathlib import Path
+
+from bitbucketcli.bitbucket.bitbucket import BitbucketClient
+from bitbucketcli.bitbucket.query import Query
+
+PAGELEN = 100
+
+PROJECTS = Query().fields("values.key", "values.name", "values.is_private")
+REPOSITORIES = Query().fields(
+    "values.slug",
+    "values.project.key",
+    "values.mainbranch.name",
+    "values.is_private",
+    "values.updated_on",
+)
+SLUGS = Query().fields("values.slug")
+RESTRICTIONS = Query().fields(
+    "values.id",
+    "values.kind",
+    "values.branch_match_kind",
+    "values.pattern",
+    "values.value",
+)
+PERMISSIONS = Query().fields(
+    "values.permission",
+    "values.user.uuid",
+    "values.user.account_id",
+    "values.repository.full_name",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS syncs (
+    workspace TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL,
+    high_water_mark TEXT
+);
+CREATE TABLE IF NOT EXISTS table_syncs (
+    workspace TEXT NOT NULL,
+    name TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (workspace, name)
+);
+CREATE TABLE IF NOT EXISTS projects (
+    workspace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT,
+    is_private INTEGER,
+    PRIMARY KEY (workspace, key)
+);
+CREATE TABLE IF NOT EXISTS repositories (
+    workspace TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    project_key TEXT,
+    main_branch TEXT,
+    is_private INTEGER,
+    updated_on TEXT,
+    PRIMARY KEY (workspace, slug)
+);
+CREATE INDEX IF NOT EXISTS repositories_project
+    ON repositories (workspace, project_key);
+CREATE TABLE IF NOT EXISTS restrictions (
+    workspace TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    branch_match_kind TEXT,
+    pattern TEXT,
+    value INTEGER,
+    PRIMARY KEY (workspace, repository, id)
+);
+CREATE INDEX IF NOT EXISTS restrictions_pattern
+    ON restrictions (workspace, pattern);
+CREATE TABLE IF NOT EXISTS permissions (
+    workspace TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    user_uuid TEXT NOT NULL,
+    account_id TEXT,
+    permission TEXT NOT NULL,
+    PRIMARY KEY (workspace, repository, user_uuid)
+);
+CREATE INDEX IF NOT EXISTS permissions_account
+    ON permissions (workspace, account_id);
+"""
+
+TABLES = ("projects", "repositories", "restrictions", "permissions")
+# Incremental syncs only re-read these for updated repositories, so they are as
+# fresh as the last full sync.
+FULL_SYNC_TABLES = ("restrictions", "permissions")
+
+
+def default_inventory_path():
+    cache_home = getenv("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    return getenv(
+        "BITBUCKET_INVENTORY_PATH",
+        os.path.join(cache_home, "bitbucket-cli", "inventory.sqlite3"),
+    )
+
+
+class StaleInventoryException(Exception):
+    def __init__(self, workspace, synced_at, table=None):
+        super().__init__(workspace)
+        self.workspace = workspace
+        self.synced_at = synced_at
+        self.table = table
+
+    def __str__(self):
+        inventory = f"The {self.table} inventory" if self.table else "The inventory"
+        if self.synced_at is None:
+            return f"{inventory} of {self.workspace} was never synced"
+        return f"{inventory} of {self.workspace} is older than allowed"
+
+
+class Inventory:
+    def __init__(self, path=None, clock=None):
+        self.__path = path or default_inventory_path()
+        self.__clock = clock or time.time
+        if self.__path != ":memory:":
+            Path(self.__path).parent.mkdir(parents=True, exist_ok=True)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(self.__path, check_same_thread=False)
+        self.__connection.row_factory = sqlite3.Row
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("PRAGMA synchronous=NORMAL")
+        self.__connection.executescript(SCHEMA)
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+    def synced_at(self, workspace, table=None):
+        if table is None:
+            row = self.__fetch_one(
+                "SELECT synced_at FROM syncs WHERE workspace = ?", (workspace,)
+            )
+        else:
+            row = self.__fetch_one(
+                "SELECT synced_at FROM table_syncs WHERE workspace = ? AND name = ?",
+                (workspace, table),
+            )
+        return row["synced_at"] if row else None
+
+    def high_water_mark(self, workspace):
+        row = self.__fetch_one(
+            "SELECT high_water_mark FROM syncs WHERE workspace = ?", (workspace,)
+        )
+        return row["high_water_mark"] if row else None
+
+    def replace(self, workspace, projects, repositories, restrictions, permissions):
+        with self.__lock, self.__connection:
+            for table in TABLES:
+                self.__connection.execute(
+                    f"DELETE FROM {table} WHERE workspace = ?", (workspace,)
+                )
+            self.__insert(workspace, projects, repositories, restrictions, permissions)
+            self.__mark_synced(workspace, repositories, None, TABLES)
+
+    def update(
+        self, workspace, projects, repositories, restrictions, permissions, slugs
+    ):
+        changed = [(workspace, repository["slug"]) for repository in repositories]
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "DELETE FROM projects WHERE workspace = ?", (workspace,)
+            )
+            for table in ("restrictions", "permissions"):
+                self.__connection.executemany(
+                    f"DELETE FROM {table} WHERE workspace = ? AND repository = ?",
+                    changed,
+                )
+            removed = [
+                (workspace, row["slug"])
+                for row in self.__connection.execute(
+                    "SELECT slug FROM repositories WHERE workspace = ?", (workspace,)
+                )
+                if row["slug"] not in slugs
+            ]
+            self.__connection.executemany(
+                "DELETE FROM repositories WHERE workspace = ? AND slug = ?", removed
+            )
+            for table in ("restrictions", "permissions"):
+                self.__connection.executemany(
+                    f"DELETE FROM {table} WHERE workspace = ? AND repository = ?",
+                    removed,
+                )
+            self.__insert(workspace, projects, repositories, restrictions, permissions)
+            self.__mark_synced(
+                workspace,
+                repositories,
+                self.__high_water_mark(workspace),
+                [table for table in TABLES if table not in FULL_SYNC_TABLES],
+            )
+        return len(removed)
+
+    def __insert(self, workspace, projects, repositories, restrictions, permissions):
+        rows = {
+            "projects": [
+                (workspace, p["key"], p.get("name"), p.get("is_private"))
+                for p in projects
+            ],
+            "repositories": [repository_row(workspace, r) for r in repositories],
+            "restrictions": [
+                (
+                    workspace,
+                    repository,
+                    r["id"],
+                    r["kind"],
+                    r.get("branch_match_kind"),
+                    r.get("pattern"),
+                    r.get("value"),
+                )
+                for repository, r in restrictions
+            ],
+            "permissions": [
+                (
+                    workspace,
+                    p["repository"]["full_name"].split("/", 1)[-1],
+                    p["user"]["uuid"],
+                    p["user"].get("account_id"),
+                    p["permission"],
+                )
+                for p in permissions
+            ],
+        }
+        for table in TABLES:
+            if rows[table]:
+                placeholders = ", ".join("?" * len(rows[table][0]))
+                self.__connection.executemany(
+                    f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})",
+                    rows[table],
+                )
+
+    def __mark_synced(self, workspace, repositories, high_water_mark, tables):
+        updated_on = [r["updated_on"] for r in repositories if r.get("updated_on")]
+        if high_water_mark:
+            updated_on.append(high_water_mark)
+        now = self.__clock()
+        self.__connection.execute(
+            "INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)",
+            (workspace, now, max(updated_on, default=None)),
+        )
+        self.__connection.executemany(
+            "INSERT OR REPLACE INTO table_syncs VALUES (?, ?, ?)",
+            [(workspace, table, now) for table in tables],
+        )
+
+    def __high_water_mark(self, workspace):
+        row = self.__connection.execute(
+            "SELECT high_water_mark FROM syncs WHERE workspace = ?", (workspace,)
+        ).fetchone()
+        return row["high_water_mark"] if row else None
+
+    def main_branch(self, workspace, repository, max_age):
+        self.check_fresh(workspace, max_age, "repositories")
+        row = self.__fetch_one(
+            "SELECT main_branch FROM repositories WHERE workspace = ? AND slug = ?",
+            (workspace, repository),
+        )
+        return row["main_branch"] if row else None
+
+    def repositories(self, workspace, project_key=None, max_age=None):
+        self.check_fresh(workspace, max_age, "repositories")
+        return self.__select(
+            "repositories", workspace, project_key=project_key, order="slug"
+        )
+
+    def projects(self, workspace, max_age=None):
+        self.check_fresh(workspace, max_age, "projects")
+        return self.__select("projects", workspace, order="key")
+
+    def restrictions(self, workspace, pattern=None, repository=None, max_age=None):
+        self.check_fresh(workspace, max_age, "restrictions")
+        return self.__select(
+            "restrictions",
+            workspace,
+            pattern=pattern,
+            repository=repository,
+            order="repository, id",
+        )
+
+    def permissions(self, workspace, account_id=None, max_age=None):
+        self.check_fresh(workspace, max_age, "permissions")
+        return self.__select(
+            "permissions", workspace, account_id=account_id, order="repository"
+        )
+
+    def check_fresh(self, workspace, max_age, table=None):
+        if max_age is None:
+            return
+        synced_at = self.synced_at(workspace, table)
+        if synced_at is None or self.__clock() - synced_at > max_age:
+            raise StaleInventoryException(workspace, synced_at, table)
+
+    def __select(self, table, workspace, order, **filters):
+        conditions = ["workspace = ?"]
+        values = [workspace]
+        for column, value in filters.items():
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                values.append(value)
+        with self.__lock:
+            rows = self.__connection.execute(
+                f"SELECT * FROM {table} WHERE {' AND '.join(conditions)} ORDER BY {order}",
+                values,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def __fetch_one(self, query, values):
+        with self.__lock:
+            return self.__connection.execute(query, values).fetchone()
+
+
+def repository_row(workspace, repository):
+    return (
+        workspace,
+        repository["slug"],
+        (repository.get("project") or {}).get("key"),
+        (repository.get("mainbranch") or {}).get("name"),
+        repository.get("is_private"),
+        repository.get("updated_on"),
+    )
+
+
+class InventorySyncCommand(BitbucketClient):
+    def __init__(self, workspace, oauth_client, inventory, workers=8):
+        super().__init__(oauth_client)
+        self.__workspace = workspace
+        self.__inventory = inventory
+        self.__workers = workers
+
+    def run(self, full=False):
+        high_water_mark = (
+            None if full else self.__inventory.high_water_mark(self.__workspace)
+        )
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            projects = executor.submit(
+                self.__list, f"2.0/workspaces/{self.__workspace}/projects", PROJECTS
+            )
+            if high_water_mark is None:
+                workspace_permissions = executor.submit(
+                    self.__list,
+                    f"2.0/workspaces/{self.__workspace}/permissions/repositories",
+                    PERMISSIONS,
+                )
+                repositories = self.__list(
+                    f"2.0/repositories/{self.__workspace}", REPOSITORIES
+                )
+            else:
+                slugs = executor.submit(self.__list_slugs)
+                repositories = self.__list(
+                    f"2.0/repositories/{self.__workspace}",
+                    REPOSITORIES.where(
+                        "updated_on", ">", datetime.fromisoformat(high_water_mark)
+                    ),
+                )
+                permission_pages = executor.map(self.__list_permissions, repositories)
+            restrictions = [
+                (repository["slug"], restriction)
+                for repository, page in zip(
+                    repositories,
+                    executor.map(self.__list_restrictions, repositories),
+                )
+                for restriction in page
+            ]
+            if high_water_mark is None:
+                permissions = workspace_permissions.result()
+            else:
+                permissions = [
+                    permission for page in permission_pages for permission in page
+                ]
+            counts = {
+                "projects": len(projects.result()),
+                "repositories": len(repositories),
+                "restrictions": len(restrictions),
+                "permissions": len(permissions),
+            }
+            if high_water_mark is None:
+                self.__inventory.replace(
+                    self.__workspace,
+                    projects.result(),
+                    repositories,
+                    restrictions,
+                    permissions,
+                )
+            else:
+                counts["removed"] = self.__inventory.update(
+                    self.__workspace,
+                    projects.result(),
+                    repositories,
+                    restrictions,
+                    permissions,
+                    slugs.result(),
+                )
+        return counts
+
+    def __list_slugs(self):
+        return {
+            repository["slug"]
+            for repository in self.__list(f"2.0/repositories/{self.__workspace}", SLUGS)
+        }
+
+    def __list_restrictions(self, repository):
+        return self.__list(
+            f"2.0/repositories/{self.__workspace}/{repository['slug']}/branch-restrictions",
+            RESTRICTIONS,
+        )
+
+    def __list_permissions(self, repository):
+        return self.__list(
+            f"2.0/workspaces/{self.__workspace}/permissions/repositories/{repository['slug']}",
+            PERMISSIONS,
+        )
+
+    def __list(self, path, query):
+        return list(
+            super().paginate(
+                path, query=query, pagelen=PAGELEN, prefetch=self.__workers
+            )
+        )
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+
+PLANNED = "planned"
+COMPLETED = "completed"
+FAILED = "failed"
+
+DEFAULT_SYNC_EVERY = 256
+DEFAULT_SYNC_INTERVAL = 1.0
+
+
+class Journal:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        path,
+        resume=False,
+        sync_every=DEFAULT_SYNC_EVERY,
+        sync_interval=DEFAULT_SYNC_INTERVAL,
+        clock=time.monotonic,
+    ):
+        self.__completed = completed_operations(path) if resume else set()
+        self.__sync_every = sync_every
+        self.__sync_interval = sync_interval
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        # Closed by close(), the journal stays open for the whole run.
+        self.__file = open(  # pylint: disable=consider-using-with
+            path, "a", encoding="utf-8"
+        )
+        self.__unsynced = 0
+        self.__synced_at = clock()
+        self.skipped = 0
+        self.syncs = 0
+
+    def pending(self, operations, operation_id):
+        for operation in operations:
+            if operation_id(operation) in self.__completed:
+                self.skipped += 1
+            else:
+                yield operation
+
+    def plan(self, operation_ids):
+        for operation_id in operation_ids:
+            self.__append({"id": operation_id, "state": PLANNED})
+        self.sync()
+
+    def record(self, operation_id, success, status_code=None, error=None):
+        entry = {"id": operation_id, "state": COMPLETED if success else FAILED}
+        if status_code is not None:
+            entry["status"] = status_code
+        if error:
+            entry["error"] = error
+        self.__append(entry)
+        with self.__lock:
+            due = (
+                self.__unsynced >= self.__sync_every
+                or self.__clock() - self.__synced_at >= self.__sync_interval
+            )
+        if due:
+            self.sync()
+
+    def sync(self):
+        with self.__lock:
+            if not self.__unsynced:
+                return
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+            self.__unsynced = 0
+            self.__synced_at = self.__clock()
+            self.syncs += 1
+
+    def close(self):
+        self.sync()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __append(self, entry):
+        line = json.dumps({**entry, "at": time.time()}) + "\n"
+        with self.__lock:
+            self.__file.write(line)
+            self.__unsynced += 1
+
+
+def completed_operations(path):
+    states = {}
+    try:
+        with open(path, encoding="utf-8") as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash can leave the last line half written.
+                    continue
+                states[entry["id"]] = entry["state"]
+    except FileNotFoundError:
+        return set()
+    return {
+        operation_id for operation_id, state in states.items() if state == COMPLETED
+    }
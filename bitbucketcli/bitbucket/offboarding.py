@@ -0,0 +1,88 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+
+import requests
+from bitbucketcli.bitbucket.bitbucket import BitbucketApiException, BitbucketClient
+from bitbucketcli.bitbucket.query import Query
+
+REPOSITORIES_PAGELEN = 100
+
+OffboardResult = namedtuple(
+    "OffboardResult", ["target_type", "target", "status_code", "error"]
+)
+
+
+class OffboardCommand(BitbucketClient):
+    def __init__(self, workspace, oauth_client, workers=16):
+        super().__init__(oauth_client)
+        self.__workspace = workspace
+        self.__workers = workers
+
+    def run(self, account_id):
+        uuid = quote(super().get_user_uuid(account_id))
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            pending = {
+                executor.submit(
+                    self.__remove,
+                    "group",
+                    group,
+                    f"1.0/groups/{self.__workspace}/{group}/members/{uuid}",
+                    False,
+                )
+                for group in self.__groups_of(uuid)
+            }
+            try:
+                for repository in super().paginate(
+                    f"2.0/repositories/{self.__workspace}",
+                    pagelen=REPOSITORIES_PAGELEN,
+                    prefetch=self.__workers,
+                    query=Query().fields("values.slug"),
+                ):
+                    pending.add(
+                        executor.submit(
+                            self.__remove,
+                            "repository",
+                            repository["slug"],
+                            f"\u0021api/internal/privileges/{self.__workspace}/{repository['slug']}/{uuid}",
+                            True,
+                        )
+                    )
+                    yield from completed(pending)
+            except (BitbucketApiException, requests.exceptions.RequestException):
+                # Report the removals already sent before the listing error.
+                for future in as_completed(pending):
+                    yield future.result()
+                raise
+            for future in as_completed(pending):
+                yield future.result()
+
+    def __groups_of(self, uuid):
+        response = super().get(f"1.0/groups/{self.__workspace}")
+        if not response.ok:
+            raise BitbucketApiException(
+                f"Failed to list the groups of {self.__workspace}",
+                response.status_code,
+            )
+        return [
+            group["slug"]
+            for group in response.json()
+            if any(
+                quote(member.get("uuid", "")) == uuid
+                for member in group.get("members", [])
+            )
+        ]
+
+    def __remove(self, target_type, target, path, is_internal_api):
+        try:
+            response = super().delete(path, is_internal_api=is_internal_api)
+            return OffboardResult(target_type, target, response.status_code, None)
+        except requests.exceptions.RequestException as e:
+            return OffboardResult(target_type, target, None, str(e))
+
+
+def completed(pending):
+    done = [future for future in pending if future.done()]
+    for future in done:
+        pending.discard(future)
+        yield future.result()
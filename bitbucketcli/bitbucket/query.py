@@ -0,0 +1,91 @@
+import re
+from datetime import date, datetime
+
+OPERATORS = ("=", "!=", "~", "!~", ">", ">=", "<", "<=")
+PAGINATION_FIELDS = ("next", "page", "pagelen", "size")
+
+_field_name = re.compile(r"[+-]?[A-Za-z_][A-Za-z0-9_]*(\.([A-Za-z_][A-Za-z0-9_]*|\*))*")
+
+
+class Query:
+    def __init__(self, fields=(), conditions=(), sort=None, pagelen=None, params=None):
+        self.__fields = tuple(fields)
+        self.__conditions = tuple(conditions)
+        self.__sort = sort
+        self.__pagelen = pagelen
+        self.__params = dict(params or {})
+
+    def fields(self, *fields):
+        for field in fields:
+            check_field(field)
+        return self.__copy(fields=self.__fields + fields)
+
+    def where(self, field, operator, value):
+        check_field(field)
+        if operator not in OPERATORS:
+            raise ValueError(f'Unsupported BBQL operator "{operator}"')
+        condition = f"{field} {operator} {literal(value)}"
+        return self.__copy(conditions=self.__conditions + (condition,))
+
+    def sort(self, field, descending=False):
+        check_field(field)
+        return self.__copy(sort=f"-{field}" if descending else field)
+
+    def pagelen(self, pagelen):
+        if pagelen < 1:
+            raise ValueError("pagelen must be positive")
+        return self.__copy(pagelen=pagelen)
+
+    def param(self, name, value):
+        return self.__copy(params={**self.__params, name: value})
+
+    def params(self, paginated=False):
+        params = dict(self.__params)
+        if self.__fields:
+            fields = self.__fields
+            if paginated and not all(field[0] in "+-" for field in fields):
+                fields = PAGINATION_FIELDS + tuple(
+                    field for field in fields if field not in PAGINATION_FIELDS
+                )
+            params["fields"] = ",".join(fields)
+        if self.__conditions:
+            params["q"] = " AND ".join(self.__conditions)
+        if self.__sort:
+            params["sort"] = self.__sort
+        if self.__pagelen:
+            params["pagelen"] = self.__pagelen
+        return params
+
+    def __copy(self, **changes):
+        current = {
+            "fields": self.__fields,
+            "conditions": self.__conditions,
+            "sort": self.__sort,
+            "pagelen": self.__pagelen,
+            "params": self.__params,
+        }
+        return Query(**{**current, **changes})
+
+    def __eq__(self, other):
+        return isinstance(other, Query) and self.params() == other.params()
+
+    def __repr__(self):
+        return f"Query({self.params()!r})"
+
+
+def check_field(field):
+    if not _field_name.fullmatch(field):
+        raise ValueError(f'Invalid field name "{field}"')
+
+
+def literal(value):
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
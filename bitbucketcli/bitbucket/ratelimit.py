@@ -0,0 +1,302 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from os import getenv
+from urllib.parse import urlsplit
+
+import requests
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30.0
+THROTTLE_STATUSES = frozenset({429, 503})
+DEFAULT_CONCURRENCY = 16
+DEFAULT_MAX_CONCURRENCY = 256
+DEFAULT_MIN_SAMPLES = 20
+
+
+class TokenBucket:  # pylint: disable=too-few-public-methods
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.__tokens = self.capacity
+        self.__clock = clock
+        self.__updated_at = clock()
+        self.__lock = threading.Lock()
+
+    def reserve(self):
+        with self.__lock:
+            now = self.__clock()
+            self.__tokens = min(
+                self.capacity, self.__tokens + (now - self.__updated_at) * self.rate
+            )
+            self.__updated_at = now
+            self.__tokens -= 1
+            return 0 if self.__tokens >= 0 else -self.__tokens / self.rate
+
+
+class AdaptiveLimiter:  # pylint: disable=too-many-instance-attributes
+    # Additive increase, multiplicative decrease: every uncongested response
+    # adds 1/limit, so the limit grows by one per window of requests, while a
+    # 429, a 503, a connection error or a latency above twice the baseline
+    # halves it once per window. Endpoints differ a lot in latency, so each one
+    # keeps its own baseline and only judges latency after a few samples.
+    def __init__(
+        self,
+        limit=DEFAULT_CONCURRENCY,
+        min_limit=1,
+        max_limit=DEFAULT_MAX_CONCURRENCY,
+        decrease_ratio=0.5,
+        latency_tolerance=2.0,
+        smoothing=0.2,
+        baseline_drift=1.01,
+        min_samples=DEFAULT_MIN_SAMPLES,
+        clock=time.monotonic,
+    ):
+        self.limit = float(min(max(limit, min_limit), max_limit))
+        self.__min_limit = min_limit
+        self.__max_limit = max_limit
+        self.__decrease_ratio = decrease_ratio
+        self.__latency_tolerance = latency_tolerance
+        self.__smoothing = smoothing
+        self.__baseline_drift = baseline_drift
+        self.__min_samples = min_samples
+        self.__clock = clock
+        self.__condition = threading.Condition()
+        self.__in_flight = 0
+        self.__latencies = {}
+        self.__decreased_at = float("-inf")
+        self.decreases = 0
+
+    def acquire(self):
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__in_flight < int(self.limit))
+            self.__in_flight += 1
+            return self.__clock()
+
+    def release(self, started, throttled=False, endpoint=None):
+        now = self.__clock()
+        with self.__condition:
+            self.__in_flight -= 1
+            congested = self.__slow(endpoint, now - started) or throttled
+            if not congested:
+                self.limit = min(self.__max_limit, self.limit + 1 / self.limit)
+            elif started >= self.__decreased_at:
+                # Requests sent before the last decrease saw the old limit.
+                self.limit = max(self.__min_limit, self.limit * self.__decrease_ratio)
+                self.__decreased_at = now
+                self.decreases += 1
+            self.__condition.notify_all()
+
+    def __slow(self, endpoint, latency):
+        if endpoint not in self.__latencies:
+            self.__latencies[endpoint] = [latency, latency, 1]
+            return False
+        state = self.__latencies[endpoint]
+        state[0] += self.__smoothing * (latency - state[0])
+        state[1] = min(latency, state[1] * self.__baseline_drift)
+        state[2] += 1
+        return (
+            state[2] >= self.__min_samples
+            and state[0] > state[1] * self.__latency_tolerance
+            and state[0] > 0
+        )
+
+    def stats(self):
+        with self.__condition:
+            return {
+                "concurrency_limit": int(self.limit),
+                "in_flight": self.__in_flight,
+                "decreases": self.decreases,
+            }
+
+
+class RequestScheduler:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        rate=None,
+        burst=None,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff=DEFAULT_BACKOFF,
+        max_backoff=DEFAULT_MAX_BACKOFF,
+        concurrency=None,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        sleep=time.sleep,
+        clock=time.monotonic,
+    ):
+        self.__rate = rate
+        self.__burst = burst
+        self.__max_retries = max_retries
+        self.__backoff = backoff
+        self.__max_backoff = max_backoff
+        self.__concurrency = concurrency
+        self.__max_concurrency = max_concurrency
+        self.__sleep = sleep
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__buckets = {}
+        self.__limiters = {}
+        self.__blocked_until = defaultdict(float)
+        self.__throttled = defaultdict(float)
+        self.__retries = defaultdict(int)
+
+    @classmethod
+    def from_env(cls):
+        rate = getenv("BITBUCKET_RATE_LIMIT")
+        burst = getenv("BITBUCKET_RATE_BURST")
+        concurrency = int(getenv("BITBUCKET_CONCURRENCY", str(DEFAULT_CONCURRENCY)))
+        return cls(
+            rate=float(rate) if rate else None,
+            burst=float(burst) if burst else None,
+            max_retries=int(getenv("BITBUCKET_MAX_RETRIES", str(DEFAULT_MAX_RETRIES))),
+            concurrency=concurrency or None,
+            max_concurrency=int(
+                getenv("BITBUCKET_MAX_CONCURRENCY", str(DEFAULT_MAX_CONCURRENCY))
+            ),
+        )
+
+    def execute(self, method, url, send):
+        host = urlsplit(url).netloc
+        endpoint = endpoint_template(method, url)
+        attempt = 0
+        while True:
+            self.__wait_for_slot(host)
+            try:
+                response = self.__send(host, endpoint, send)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if method not in IDEMPOTENT_METHODS or attempt >= self.__max_retries:
+                    raise
+                self.__retry(host, self.__backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            if attempt < self.__max_retries:
+                if response.status_code == 429:
+                    delay = retry_after(response)
+                    if delay is None:
+                        delay = self.__backoff_delay(attempt)
+                    self.__block(host, delay)
+                    self.__retry(host, 0)
+                    attempt += 1
+                    continue
+                if (
+                    response.status_code in RETRY_STATUSES
+                    and method in IDEMPOTENT_METHODS
+                ):
+                    self.__retry(host, self.__backoff_delay(attempt))
+                    attempt += 1
+                    continue
+            return response
+
+    def stats(self):
+        with self.__lock:
+            limiters = dict(self.__limiters)
+            stats = {
+                host: {
+                    "throttled_seconds": self.__throttled[host],
+                    "retries": self.__retries[host],
+                }
+                for host in set(self.__throttled) | set(self.__retries) | set(limiters)
+            }
+        for host, limiter in limiters.items():
+            stats[host]["concurrency_limit"] = limiter.stats()["concurrency_limit"]
+        return stats
+
+    def __send(self, host, endpoint, send):
+        if not self.__concurrency:
+            return send()
+        limiter = self.__limiter(host)
+        started = limiter.acquire()
+        try:
+            response = send()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            limiter.release(started, True, endpoint)
+            raise
+        except BaseException:
+            limiter.release(started, endpoint=endpoint)
+            raise
+        limiter.release(started, response.status_code in THROTTLE_STATUSES, endpoint)
+        return response
+
+    def __limiter(self, host):
+        with self.__lock:
+            if host not in self.__limiters:
+                self.__limiters[host] = AdaptiveLimiter(
+                    self.__concurrency,
+                    max_limit=self.__max_concurrency,
+                    clock=self.__clock,
+                )
+            return self.__limiters[host]
+
+    def __wait_for_slot(self, host):
+        delay = max(self.__blocked_until[host] - self.__clock(), 0)
+        if self.__rate:
+            delay += self.__bucket(host).reserve()
+        self.__throttle(host, delay)
+
+    def __bucket(self, host):
+        with self.__lock:
+            if host not in self.__buckets:
+                self.__buckets[host] = TokenBucket(
+                    self.__rate, self.__burst, clock=self.__clock
+                )
+            return self.__buckets[host]
+
+    def __block(self, host, delay):
+        with self.__lock:
+            self.__blocked_until[host] = max(
+                self.__blocked_until[host], self.__clock() + delay
+            )
+
+    def __retry(self, host, delay):
+        with self.__lock:
+            self.__retries[host] += 1
+        self.__throttle(host, delay)
+
+    def __throttle(self, host, delay):
+        if delay <= 0:
+            return
+        with self.__lock:
+            self.__throttled[host] += delay
+        self.__sleep(delay)
+
+    def __backoff_delay(self, attempt):
+        delay = min(self.__max_backoff, self.__backoff * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+def endpoint_template(method, url):
+    # Workspace and repository names cannot be told apart from the fixed parts
+    # of a path, so keep the API version and collection plus the path depth.
+    segments = [segment for segment in urlsplit(url).path.split("/") if segment]
+    return " ".join([method, "/".join(segments[:2] + ["*"] * len(segments[2:]))])
+
+
+def retry_after(response):
+    value = response.headers.get("Retry-After")
+    if not isinstance(value, str):
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+_default_scheduler = None  # pylint: disable=invalid-name
+_default_scheduler_lock = threading.Lock()
+
+
+def default_scheduler():
+    global _default_scheduler  # pylint: disable=global-statement
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler.from_env()
+        return _default_scheduler
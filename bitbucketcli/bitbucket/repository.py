@@ -1,13 +1,28 @@
 import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 
+import requests
 from bitbucketcli.bitbucket.bitbucket import BitbucketClient
 
+DEFAULT_BRANCH_RESTRICTIONS = [{"kind": "push"}, {"kind": "force"}, {"kind": "delete"}]
+
+# Errors about the request as a whole, splitting the emails would not help.
+UNSPLITTABLE_STATUSES = frozenset({401, 403, 404, 429})
+
+RestrictionResult = namedtuple("RestrictionResult", ["kind", "pattern", "status_code"])
+InvitationResult = namedtuple("InvitationResult", ["invited", "status_code"])
+
 
 class RepositoryCommand(BitbucketClient):
-    def __init__(self, workspace, oauth_client):
+    def __init__(self, workspace, oauth_client, restriction_template=None):
         super().__init__(oauth_client)
         self.__workspace = workspace
+        self.__restriction_template = restriction_template_or_default(
+            restriction_template
+        )
+        self.restriction_results = []
 
     def create(self, name, project_key, is_private=True):
         payload = {
@@ -27,10 +42,40 @@ class RepositoryCommand(BitbucketClient):
         return False
 
     def add_user_to_repository(self, email, repository_name, permission="read"):
+        return self.add_users_to_repository([email], repository_name, permission)[email]
+
+    def add_users_to_repository(self, emails, repository_name, permission="read"):
+        results = self.invitation_results(emails, repository_name, permission)
+        return {email: result.invited for email, result in results.items()}
+
+    def invitation_results(self, emails, repository_name, permission="read"):
+        emails = list(emails)
+        response = self.invite_users(emails, repository_name, permission)
+        status_code = response.status_code
+        if (
+            len(emails) > 1
+            and 400 <= status_code < 500
+            and status_code not in UNSPLITTABLE_STATUSES
+        ):
+            # A single rejected email fails the whole request, halve it to find it.
+            middle = len(emails) // 2
+            return {
+                **self.invitation_results(emails[:middle], repository_name, permission),
+                **self.invitation_results(emails[middle:], repository_name, permission),
+            }
+        invited = invited_emails(response)
+        return {
+            email: InvitationResult(
+                status_code == 200 and (invited is None or email in invited),
+                status_code,
+            )
+            for email in emails
+        }
+
+    def invite_users(self, emails, repository_name, permission="read"):
         path = f"\u0021api/internal/invitations/repositories/{self.__workspace}/{repository_name}"
-        dump = json.dumps({"emails": [email], "permission": permission})
-        response = super().post(path=path, data=dump, is_internal_api=True)
-        return response.status_code == 200
+        dump = json.dumps({"emails": list(emails), "permission": permission})
+        return super().post(path=path, data=dump, is_internal_api=True)
 
     def remove_user_from_repository(self, repository_name, account_id):
         uuid = self.get_user_uuid(account_id)
@@ -39,20 +84,63 @@ class RepositoryCommand(BitbucketClient):
         return response.status_code == 204
 
     def __apply_default_branch_restrictions(self, repository_name, branch_name):
-        for kind in ["push", "force", "delete"]:
-            self.__apply_restriction(kind, repository_name, branch_name)
-
-    def __apply_restriction(self, kind, repository_name, branch_name):
-        data = {
-            "type": "branchrestriction",
-            "kind": kind,
-            "branch_match_kind": "glob",
-            "pattern": branch_name,
-            "users": [],
-            "groups": [],
-        }
-        dump = json.dumps(data)
-        super().post(
-            f"2.0/repositories/{self.__workspace}/{repository_name}/branch-restrictions",
-            data=dump,
+        restrictions = [
+            restriction_payload(template, branch_name)
+            for template in self.__restriction_template
+        ]
+        if not restrictions:
+            self.restriction_results = []
+            return
+        with ThreadPoolExecutor(max_workers=len(restrictions)) as executor:
+            self.restriction_results = list(
+                executor.map(
+                    lambda restriction: self.__apply_restriction(
+                        restriction, repository_name
+                    ),
+                    restrictions,
+                )
+            )
+
+    def __apply_restriction(self, restriction, repository_name):
+        try:
+            response = super().post(
+                f"2.0/repositories/{self.__workspace}/{repository_name}/branch-restrictions",
+                data=json.dumps(restriction),
+            )
+            status_code = response.status_code
+        except requests.exceptions.RequestException:
+            status_code = None
+        return RestrictionResult(
+            restriction["kind"], restriction["pattern"], status_code
         )
+
+
+def restriction_template_or_default(restriction_template):
+    if restriction_template is None:
+        return DEFAULT_BRANCH_RESTRICTIONS
+    return restriction_template
+
+
+def invited_emails(response):
+    # The invitation response lists the emails it accepted, None when it does not.
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    if isinstance(body, dict) and isinstance(body.get("emails"), list):
+        return set(body["emails"])
+    return None
+
+
+def restriction_payload(template, branch_name):
+    payload = {
+        "type": "branchrestriction",
+        "kind": template["kind"],
+        "branch_match_kind": "glob",
+        "pattern": branch_name,
+        "users": [],
+        "groups": [],
+    }
+    payload.update(template)
+    payload["pattern"] = payload["pattern"].replace("{main_branch}", branch_name)
+    return payload
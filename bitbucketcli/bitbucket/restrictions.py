@@ -0,0 +1,205 @@
+import json
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from bitbucketcli.bitbucket.bitbucket import BitbucketApiException, BitbucketClient
+from bitbucketcli.bitbucket.query import Query
+from bitbucketcli.bitbucket.repository import (
+    restriction_payload,
+    restriction_template_or_default,
+)
+
+RESTRICTIONS_PAGELEN = 100
+REPOSITORIES_PAGELEN = 100
+RESTRICTION_FIELDS = (
+    "values.id",
+    "values.kind",
+    "values.branch_match_kind",
+    "values.pattern",
+    "values.branch_type",
+    "values.value",
+    "values.users.account_id",
+    "values.users.uuid",
+    "values.groups.slug",
+)
+
+SyncPlan = namedtuple(
+    "SyncPlan", ["repository", "creates", "deletes", "unchanged", "error"]
+)
+SyncResult = namedtuple(
+    "SyncResult", ["repository", "action", "kind", "pattern", "status_code"]
+)
+
+
+def restriction_key(restriction):
+    return (
+        restriction["kind"],
+        restriction.get("branch_match_kind") or "glob",
+        restriction.get("pattern") or "",
+        restriction.get("branch_type") or "",
+        restriction.get("value"),
+        tuple(
+            sorted(
+                user.get("account_id") or user.get("uuid")
+                for user in restriction.get("users") or []
+            )
+        ),
+        tuple(sorted(group.get("slug") for group in restriction.get("groups") or [])),
+    )
+
+
+def managed_key(restriction):
+    return (
+        restriction["kind"],
+        restriction.get("branch_match_kind") or "glob",
+        restriction.get("pattern") or "",
+        restriction.get("branch_type") or "",
+    )
+
+
+def diff_restrictions(repository, existing, desired, prune=False):
+    available = {}
+    for restriction in existing:
+        available.setdefault(restriction_key(restriction), []).append(restriction)
+
+    creates = []
+    unchanged = []
+    for restriction in desired:
+        matches = available.get(restriction_key(restriction))
+        if matches:
+            unchanged.append(matches.pop(0))
+        else:
+            creates.append(restriction)
+    # Only the kinds and branches the template manages are pruned by default.
+    managed = {managed_key(restriction) for restriction in desired}
+    deletes = []
+    for matches in available.values():
+        for restriction in matches:
+            if prune or managed_key(restriction) in managed:
+                deletes.append(restriction)
+            else:
+                unchanged.append(restriction)
+    return SyncPlan(repository, creates, deletes, unchanged, None)
+
+
+def main_branch_name(repository):
+    # Empty repositories have a null mainbranch.
+    return (repository.get("mainbranch") or {}).get("name", "")
+
+
+def change_id(workspace, change):
+    repository, action, restriction = change
+    if action == "delete":
+        return f"delete {workspace}/{repository} {restriction['id']}"
+    return f"create {workspace}/{repository} {json.dumps(restriction_key(restriction))}"
+
+
+class RestrictionSyncCommand(BitbucketClient):
+    def __init__(
+        self,
+        workspace,
+        oauth_client,
+        restriction_template=None,
+        workers=8,
+        journal=None,
+        prune=False,
+    ):
+        super().__init__(oauth_client)
+        self.__workspace = workspace
+        self.__restriction_template = restriction_template_or_default(
+            restriction_template
+        )
+        self.__workers = workers
+        self.__journal = journal
+        self.__prune = prune
+
+    def plan(self, repositories=None):
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            yield from executor.map(
+                lambda repository: self.__plan_repository(*repository),
+                self.__main_branches(repositories),
+            )
+
+    def apply(self, plans):
+        changes = [
+            (plan.repository, action, restriction)
+            for plan in plans
+            for action, restrictions in (
+                ("delete", plan.deletes),
+                ("create", plan.creates),
+            )
+            for restriction in restrictions
+        ]
+        if self.__journal is not None:
+            changes = list(
+                self.__journal.pending(changes, partial(change_id, self.__workspace))
+            )
+            self.__journal.plan(
+                change_id(self.__workspace, change) for change in changes
+            )
+        with ThreadPoolExecutor(max_workers=self.__workers) as executor:
+            for change, result in zip(
+                changes, executor.map(lambda change: self.__apply(*change), changes)
+            ):
+                if self.__journal is not None:
+                    self.__journal.record(
+                        change_id(self.__workspace, change),
+                        result.status_code in (200, 201, 204),
+                        result.status_code,
+                    )
+                yield result
+
+    def __main_branches(self, repositories):
+        if repositories:
+            yield from ((name, None) for name in repositories)
+            return
+        for repository in super().paginate(
+            f"2.0/repositories/{self.__workspace}",
+            pagelen=REPOSITORIES_PAGELEN,
+            prefetch=self.__workers,
+            query=Query().fields("values.slug", "values.mainbranch.name"),
+        ):
+            yield repository["slug"], main_branch_name(repository)
+
+    def __plan_repository(self, name, main_branch):
+        path = f"2.0/repositories/{self.__workspace}/{name}"
+        try:
+            if main_branch is None:
+                response = super().get(path, query=Query().fields("mainbranch.name"))
+                if not response.ok:
+                    raise BitbucketApiException(
+                        f"Failed to get repository {name}", response.status_code
+                    )
+                main_branch = main_branch_name(response.json())
+            if not main_branch:
+                return SyncPlan(name, [], [], [], "Repository has no main branch")
+            existing = list(
+                super().paginate(
+                    f"{path}/branch-restrictions",
+                    pagelen=RESTRICTIONS_PAGELEN,
+                    query=Query().fields(*RESTRICTION_FIELDS),
+                )
+            )
+        except (BitbucketApiException, requests.exceptions.RequestException) as e:
+            return SyncPlan(name, [], [], [], str(e))
+        desired = [
+            restriction_payload(template, main_branch)
+            for template in self.__restriction_template
+        ]
+        return diff_restrictions(name, existing, desired, self.__prune)
+
+    def __apply(self, repository, action, restriction):
+        path = f"2.0/repositories/{self.__workspace}/{repository}/branch-restrictions"
+        try:
+            if action == "delete":
+                response = super().delete(f"{path}/{restriction['id']}")
+            else:
+                response = super().post(path, data=json.dumps(restriction))
+            status_code = response.status_code
+        except requests.exceptions.RequestException:
+            status_code = None
+        return SyncResult(
+            repository, action, restriction["kind"], restriction["pattern"], status_code
+        )
@@ -0,0 +1,100 @@
+import fcntl
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from os import getenv
+from pathlib import Path
+
+DEFAULT_REFRESH_MARGIN = 60
+
+
+def default_cache_path():
+    cache_home = getenv("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    return getenv(
+        "BITBUCKET_TOKEN_CACHE_PATH",
+        os.path.join(cache_home, "bitbucket-cli", "tokens.json"),
+    )
+
+
+class TokenCache:
+    def __init__(self, path=None, refresh_margin=DEFAULT_REFRESH_MARGIN, clock=None):
+        self.__path = Path(path or default_cache_path())
+        self.__lock_path = self.__path.with_name(f"{self.__path.name}.lock")
+        self.__refresh_margin = refresh_margin
+        self.__clock = clock or time.time
+
+    @staticmethod
+    def key(client_id, token_url):
+        return hashlib.sha256(f"{client_id}\n{token_url}".encode()).hexdigest()
+
+    def get(self, client_id, token_url):
+        with self.__locked(fcntl.LOCK_SH):
+            token = self.__read().get(self.key(client_id, token_url))
+        if token and self.is_fresh(token):
+            return token
+        return None
+
+    def put(self, client_id, token_url, token):
+        token = self.__with_expiry(token)
+        with self.__locked(fcntl.LOCK_EX):
+            tokens = self.__read()
+            tokens[self.key(client_id, token_url)] = token
+            self.__write(tokens)
+        return token
+
+    def fetch(self, client_id, token_url, fetch_token, rejected=None):
+        token = self.get(client_id, token_url)
+        if token and not same_token(token, rejected):
+            return token
+        with self.__locked(fcntl.LOCK_EX):
+            # Another process may have refreshed while we waited for the lock.
+            tokens = self.__read()
+            token = tokens.get(self.key(client_id, token_url))
+            if token and self.is_fresh(token) and not same_token(token, rejected):
+                return token
+            token = self.__with_expiry(fetch_token())
+            tokens[self.key(client_id, token_url)] = token
+            self.__write(tokens)
+        return token
+
+    def is_fresh(self, token):
+        expires_at = token.get("expires_at")
+        if expires_at is None:
+            return False
+        return float(expires_at) - self.__refresh_margin > self.__clock()
+
+    def __with_expiry(self, token):
+        token = dict(token)
+        if "expires_at" not in token and "expires_in" in token:
+            token["expires_at"] = self.__clock() + float(token["expires_in"])
+        return token
+
+    @contextmanager
+    def __locked(self, operation):
+        self.__path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.__lock_path, "a", encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __read(self):
+        try:
+            with open(self.__path, encoding="utf-8") as cache_file:
+                return json.load(cache_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def __write(self, tokens):
+        tmp_path = self.__path.with_name(f"{self.__path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as cache_file:
+            json.dump(tokens, cache_file)
+        os.replace(tmp_path, self.__path)
+
+
+def same_token(token, other):
+    return other is not None and token.get("access_token") == other.get("access_token")
@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+
+DEFAULT_REFRESH_AHEAD = 300
+DEFAULT_RETRY_DELAY = 10
+MAX_WAIT = 60
+
+
+class TokenManager:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        session,
+        fetch_token,
+        refresh_ahead=DEFAULT_REFRESH_AHEAD,
+        retry_delay=DEFAULT_RETRY_DELAY,
+        clock=time.time,
+    ):
+        self.__session = session
+        self.__fetch_token = fetch_token
+        self.__refresh_ahead = refresh_ahead
+        self.__retry_delay = retry_delay
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread = None
+        self.refreshes = 0
+        session.token = fetch_token(None)
+        session.token_manager = self
+
+    @property
+    def token(self):
+        return self.__session.token
+
+    def start(self):
+        self.__thread = threading.Thread(
+            target=self.__run, name="token-refresh", daemon=True
+        )
+        self.__thread.start()
+        return self
+
+    def close(self):
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def refresh(self, rejected=None):
+        # Single flight: callers that saw the same rejected token wait for the
+        # refresh in progress and then reuse its result.
+        with self.__lock:
+            current = self.__session.token
+            if rejected is not None and access_token(current) != access_token(rejected):
+                return current
+            token = self.__fetch_token(current)
+            self.__session.token = token
+            self.refreshes += 1
+            return token
+
+    def refresh_delay(self):
+        expires_at = (self.token or {}).get("expires_at")
+        if expires_at is None:
+            return MAX_WAIT
+        return float(expires_at) - self.__refresh_ahead - self.__clock()
+
+    def __run(self):
+        while not self.__stopped.is_set():
+            delay = self.refresh_delay()
+            if delay > 0:
+                self.__stopped.wait(min(delay, MAX_WAIT))
+                continue
+            try:
+                self.refresh(rejected=self.token)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logging.error("Failed to refresh the OAuth token, error=%s", e)
+            if self.refresh_delay() <= 0:
+                self.__stopped.wait(self.__retry_delay)
+
+
+def access_token(token):
+    return (token or {}).get("access_token")
@@ -0,0 +1,100 @@
+import json
+import re
+import threading
+import time
+from collections import defaultdict, namedtuple
+from urllib.parse import urlsplit
+
+RequestEvent = namedtuple(
+    "RequestEvent",
+    ["timestamp", "method", "path", "host", "status", "bytes", "elapsed"],
+)
+
+PATH_TEMPLATES = [
+    (
+        r"2\.0/repositories/[^/]+/[^/]+/branch-restrictions/[^/]+",
+        "2.0/repositories/{workspace}/{repository}/branch-restrictions/{id}",
+    ),
+    (
+        r"2\.0/repositories/[^/]+/[^/]+/branch-restrictions",
+        "2.0/repositories/{workspace}/{repository}/branch-restrictions",
+    ),
+    (r"2\.0/repositories/[^/]+/[^/]+", "2.0/repositories/{workspace}/{repository}"),
+    (r"2\.0/repositories/[^/]+", "2.0/repositories/{workspace}"),
+    (r"2\.0/workspaces/[^/]+/projects", "2.0/workspaces/{workspace}/projects"),
+    (r"2\.0/users/[^/]+", "2.0/users/{account_id}"),
+    (
+        r"1\.0/groups/[^/]+/[^/]+/members/[^/]+",
+        "1.0/groups/{workspace}/{group}/members/{uuid}",
+    ),
+    (r"1\.0/groups/[^/]+", "1.0/groups/{workspace}"),
+    (
+        r"!api/internal/invitations/repositories/[^/]+/[^/]+",
+        "!api/internal/invitations/repositories/{workspace}/{repository}",
+    ),
+    (
+        r"!api/internal/privileges/[^/]+/[^/]+/[^/]+",
+        "!api/internal/privileges/{workspace}/{repository}/{uuid}",
+    ),
+]
+_compiled_templates = [
+    (re.compile(pattern), template) for pattern, template in PATH_TEMPLATES
+]
+
+
+def template_path(path):
+    parts = urlsplit(path)
+    path = parts.path.lstrip("/") if parts.scheme else path.split("?", 1)[0]
+    for pattern, template in _compiled_templates:
+        if pattern.fullmatch(path):
+            return template
+    return path
+
+
+class RequestTimer:  # pylint: disable=too-few-public-methods
+    def __init__(self, method, path, is_internal_api):
+        self.__method = method
+        self.__path = path
+        self.__host = "internal" if is_internal_api else "public"
+        self.__timestamp = time.time()
+        self.__started = time.perf_counter()
+
+    def event(self, response=None):
+        return RequestEvent(
+            self.__timestamp,
+            self.__method,
+            template_path(self.__path),
+            self.__host,
+            response.status_code if response is not None else None,
+            len(response.content) if response is not None else 0,
+            time.perf_counter() - self.__started,
+        )
+
+
+class Tracer:
+    def __init__(self, stream):
+        self.__stream = stream
+        self.__lock = threading.Lock()
+        self.__calls = defaultdict(int)
+        self.__elapsed = defaultdict(float)
+
+    def __call__(self, event):
+        line = json.dumps(event._asdict())
+        with self.__lock:
+            self.__stream.write(f"{line}\n")
+            self.__calls[(event.method, event.host, event.path)] += 1
+            self.__elapsed[(event.method, event.host, event.path)] += event.elapsed
+
+    def summary(self):
+        lines = []
+        with self.__lock:
+            endpoints = sorted(
+                self.__elapsed.items(), key=lambda item: item[1], reverse=True
+            )
+            for (method, host, path), elapsed in endpoints:
+                calls = self.__calls[(method, host, path)]
+                lines.append(
+                    f"{method} {path} ({host}): {calls} calls, "
+                    f"{elapsed * 1000:.1f}ms total, {elapsed * 1000 / calls:.1f}ms avg"
+                )
+        return lines
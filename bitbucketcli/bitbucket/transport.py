@@ -0,0 +1,89 @@
+from os import getenv
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE, timeout=None, **kwargs):
+        self.pool_size = pool_size
+        self.timeout = timeout or (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+        super().__init__(pool_connections=1, pool_maxsize=pool_size, **kwargs)
+
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        return super().send(
+            request,
+            stream=stream,
+            timeout=timeout or self.timeout,
+            verify=verify,
+            cert=cert,
+            proxies=proxies,
+        )
+
+    def connection_stats(self):
+        stats = {"connections": 0, "requests": 0}
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools.get(key)
+            if pool is not None:
+                stats["connections"] += pool.num_connections
+                stats["requests"] += pool.num_requests
+        stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+        return stats
+
+
+def configure_transport(
+    session, urls, pool_size=None, connect_timeout=None, read_timeout=None
+):
+    pool_size = pool_size or int(getenv("BITBUCKET_POOL_SIZE", str(DEFAULT_POOL_SIZE)))
+    timeout = env_timeout(connect_timeout, read_timeout)
+    for origin in origins(urls):
+        session.mount(origin, PooledHTTPAdapter(pool_size, timeout=timeout))
+    return session
+
+
+def ensure_pool_size(session, urls, pool_size):
+    # Grows the pools that would make concurrent callers wait for a connection,
+    # keeping the timeouts configure_transport() set.
+    for origin in origins(urls):
+        adapter = session.get_adapter(origin)
+        if isinstance(adapter, PooledHTTPAdapter):
+            if adapter.pool_size >= pool_size:
+                continue
+            timeout = adapter.timeout
+        else:
+            timeout = env_timeout()
+        session.mount(origin, PooledHTTPAdapter(pool_size, timeout=timeout))
+    return session
+
+
+def env_timeout(connect_timeout=None, read_timeout=None):
+    return (
+        connect_timeout
+        or float(getenv("BITBUCKET_CONNECT_TIMEOUT", str(DEFAULT_CONNECT_TIMEOUT))),
+        read_timeout
+        or float(getenv("BITBUCKET_READ_TIMEOUT", str(DEFAULT_READ_TIMEOUT))),
+    )
+
+
+def connection_stats(session, urls):
+    stats = {}
+    for origin in origins(urls):
+        adapter = session.get_adapter(origin)
+        if isinstance(adapter, PooledHTTPAdapter):
+            stats[origin.rstrip("/")] = adapter.connection_stats()
+    return stats
+
+
+def origins(urls):
+    return list(
+        dict.fromkeys(
+            f"{parts.scheme}://{parts.netloc}/"
+            for parts in (urlsplit(url) for url in urls if url)
+        )
+    )
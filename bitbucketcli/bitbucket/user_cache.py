@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from os import getenv
+from pathlib import Path
+
+DEFAULT_MAX_SIZE = 4096
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_NEGATIVE_TTL = 10 * 60
+
+MISSING = object()
+
+
+class UserUuidCache:  # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        max_size=DEFAULT_MAX_SIZE,
+        path=None,
+        ttl=DEFAULT_TTL,
+        negative_ttl=DEFAULT_NEGATIVE_TTL,
+        clock=time.time,
+    ):
+        self.__max_size = max_size
+        self.__path = Path(path) if path else None
+        self.__ttl = ttl
+        self.__negative_ttl = negative_ttl
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.__load()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_size=int(getenv("BITBUCKET_USER_CACHE_SIZE", str(DEFAULT_MAX_SIZE))),
+            path=getenv("BITBUCKET_USER_CACHE_PATH"),
+            ttl=float(getenv("BITBUCKET_USER_CACHE_TTL", str(DEFAULT_TTL))),
+        )
+
+    def get(self, account_id):
+        with self.__lock:
+            entry = self.__entries.get(account_id)
+            if entry is None or entry[1] <= self.__clock():
+                self.__entries.pop(account_id, None)
+                self.misses += 1
+                return MISSING
+            self.__entries.move_to_end(account_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, account_id, uuid):
+        ttl = self.__ttl if uuid is not None else self.__negative_ttl
+        with self.__lock:
+            self.__entries[account_id] = (uuid, self.__clock() + ttl)
+            self.__entries.move_to_end(account_id)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+            self.__save()
+
+    def stats(self):
+        with self.__lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.__entries),
+            }
+
+    def __load(self):
+        if not self.__path:
+            return
+        try:
+            with open(self.__path, encoding="utf-8") as cache_file:
+                entries = json.load(cache_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = self.__clock()
+        for account_id, (uuid, expires_at) in entries.items():
+            if expires_at > now:
+                self.__entries[account_id] = (uuid, expires_at)
+        while len(self.__entries) > self.__max_size:
+            self.__entries.popitem(last=False)
+
+    def __save(self):
+        if not self.__path:
+            return
+        self.__path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.__path.with_name(f"{self.__path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as cache_file:
+            json.dump(self.__entries, cache_file)
+        os.replace(tmp_path, self.__path)
+
+
+_default_user_cache = None  # pylint: disable=invalid-name
+_default_user_cache_lock = threading.Lock()
+
+
+def default_user_cache():
+    global _default_user_cache  # pylint: disable=global-statement
+    with _default_user_cache_lock:
+        if _default_user_cache is None:
+            _default_user_cache = UserUuidCache.from_env()
+        return _default_user_cache
@@ -37,7 +37,7 @@ def test_bypass_push_with_pull_request_with_success(
         url=restriction_api_url(workspace, repository),
         data=None,
         headers={"Accept": "application/json"},
-        params={"kind": "push", "pattern": branch},
+        params=restriction_params(branch),
     )
     session_mock.delete.assert_called_with(
         url=remove_push_restriction,
@@ -94,13 +94,13 @@ def test_bypass_push_with_pull_request_default_branch_with_success(
                 url=default_branch_url,
                 data=None,
                 headers={"Accept": "application/json"},
-                params=None,
+                params={"fields": "mainbranch.name"},
             ),
             call(
                 url=restriction_api_url(workspace, repository),
                 data=None,
                 headers={"Accept": "application/json"},
-                params={"kind": "push", "pattern": default_branch_name},
+                params=restriction_params(default_branch_name),
             ),
         ]
     )
@@ -144,7 +144,7 @@ def test_fail_to_bypass_push_with_pull_request(
         url=restriction_api_url(workspace, repository),
         data=None,
         headers={"Accept": "application/json"},
-        params={"kind": "push", "pattern": branch},
+        params=restriction_params(branch),
     )
     session_mock.delete.assert_called_with(
         url=remove_push_restriction,
@@ -178,7 +178,7 @@ def test_fail_to_bypass_push_with_pull_request_if_push_restriction_dont_exists(
         url=restriction_api_url(workspace, repository),
         data=None,
         headers={"Accept": "application/json"},
-        params={"kind": "push", "pattern": branch},
+        params=restriction_params(branch),
     )
 
 
@@ -188,3 +188,11 @@ def restriction_api_url(workspace, repository):
 
 def repositories_api_url(workspace, repository):
     return f"{os.getenv('BITBUCKET_API_URL')}/2.0/repositories/{workspace}/{repository}"
+
+
+def restriction_params(branch):
+    return {
+        "kind": "push",
+        "pattern": branch,
+        "fields": "next,page,pagelen,size,values.id",
+    }
@@ -27,3 +27,19 @@ def mock_session(mocker):
     mock = mocker.patch.object(requests, "Session", autospec=True)
     mock.return_value.__enter__.return_value = mock
     return mock
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_state(monkeypatch):
+    monkeypatch.setattr(
+        "bitbucketcli.bitbucket.ratelimit._default_scheduler", None, raising=True
+    )
+    monkeypatch.setattr(
+        "bitbucketcli.bitbucket.user_cache._default_user_cache", None, raising=True
+    )
+    monkeypatch.setattr(
+        "bitbucketcli.bitbucket.http_cache._default_http_cache", None, raising=True
+    )
+    monkeypatch.setattr(
+        "bitbucketcli.bitbucket.aio._default_offloader", None, raising=True
+    )
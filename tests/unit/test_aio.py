@@ -0,0 +1,180 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+import requests
+from bitbucketcli.bitbucket.aio import (
+    AsyncBitbucketClient,
+    AsyncBranchCommand,
+    AsyncProjectCommand,
+    AsyncRepositoryCommand,
+    AsyncWorkspaceCommand,
+    ThreadOffloader,
+    default_offloader,
+)
+from bitbucketcli.bitbucket.transport import PooledHTTPAdapter, configure_transport
+
+
+def test_async_client_requests_public_and_internal_api():
+    session_mock = MagicMock()
+
+    async def run():
+        client = AsyncBitbucketClient(session_mock)
+        await client.get("2.0/repositories/workspace1")
+        await client.delete("path/1", is_internal_api=True)
+
+    asyncio.run(run())
+
+    session_mock.get.assert_called_once_with(
+        url=f"{os.getenv('BITBUCKET_API_URL')}/2.0/repositories/workspace1",
+        data=None,
+        params=None,
+        headers={"Accept": "application/json"},
+    )
+    session_mock.delete.assert_called_once_with(
+        url=f"{os.getenv('BITBUCKET_INTERNAL_API_URL')}/path/1",
+        data=None,
+        params=None,
+        headers={"Accept": "application/json"},
+    )
+
+
+def test_offloader_bounds_concurrent_requests():
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def post(**kwargs):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return MagicMock(status_code=200)
+
+    session_mock = MagicMock()
+    session_mock.post.side_effect = post
+
+    async def run():
+        offloader = ThreadOffloader(concurrency=4)
+        commands = [
+            AsyncRepositoryCommand("workspace1", session_mock, offloader)
+            for _ in range(4)
+        ]
+        results = await asyncio.gather(
+            *(
+                commands[i % 4].add_user_to_repository(
+                    f"user{i}@email.com", "repository1"
+                )
+                for i in range(40)
+            )
+        )
+        offloader.close()
+        return results
+
+    results = asyncio.run(run())
+
+    assert results == [True] * 40
+    assert session_mock.post.call_count == 40
+    assert 1 < peak <= 4
+
+
+def test_async_commands():
+    session_mock = MagicMock()
+    session_mock.post.return_value.status_code = 201
+    session_mock.delete.return_value.status_code = 204
+    session_mock.get.return_value.json.return_value = {
+        "uuid": "{uuid}",
+        "values": [{"id": "1234"}],
+    }
+
+    async def run():
+        offloader = ThreadOffloader(concurrency=2)
+        project = AsyncProjectCommand("workspace1", session_mock, offloader)
+        branch = AsyncBranchCommand(
+            "workspace1", "repository1", session_mock, offloader
+        )
+        workspace = AsyncWorkspaceCommand(session_mock, offloader)
+        results = await asyncio.gather(
+            project.create("project1", "key1"),
+            branch.bypass_push_with_pull_request("master"),
+            workspace.remove_user_from_group("workspace1", "account", "group1"),
+        )
+        offloader.close()
+        return results
+
+    session_mock.get.return_value.status_code = 200
+    assert asyncio.run(run()) == [True, True, True]
+    project_call = [
+        kwargs
+        for _, kwargs in session_mock.post.call_args_list
+        if kwargs["url"].endswith("/projects")
+    ]
+    assert json.loads(project_call[0]["data"])["key"] == "key1"
+
+
+def test_clients_share_the_default_offloader():
+    session_mock = MagicMock()
+
+    repository = AsyncRepositoryCommand("workspace1", session_mock)
+    project = AsyncProjectCommand("workspace1", session_mock)
+
+    assert repository.offloader is project.offloader is default_offloader()
+
+
+def test_offloader_sizes_the_transport_pool_on_request(monkeypatch):
+    monkeypatch.setenv("BITBUCKET_API_URL", "https://api.bitbucket.org")
+    monkeypatch.setenv("BITBUCKET_INTERNAL_API_URL", "https://bitbucket.org")
+    session = configure_transport(
+        requests.Session(),
+        ["https://api.bitbucket.org", "https://bitbucket.org"],
+        pool_size=10,
+        read_timeout=60,
+    )
+    offloader = ThreadOffloader(concurrency=48)
+
+    AsyncBitbucketClient(session, offloader)
+    assert session.get_adapter("https://bitbucket.org/").pool_size == 10
+
+    offloader.size_pool(session)
+    offloader.close()
+
+    for origin in ("https://api.bitbucket.org/", "https://bitbucket.org/"):
+        adapter = session.get_adapter(origin)
+        assert isinstance(adapter, PooledHTTPAdapter)
+        assert adapter.pool_size == 48
+        assert adapter.timeout[1] == 60
+
+
+def test_offloader_bounds_each_event_loop():
+    offloader = ThreadOffloader(concurrency=2)
+    started = threading.Semaphore(0)
+    release = threading.Event()
+    calls = []
+
+    def block():
+        calls.append(1)
+        started.release()
+        release.wait(5)
+
+    async def run():
+        tasks = [asyncio.ensure_future(offloader.run(block)) for _ in range(4)]
+        for _ in range(2):
+            await asyncio.get_running_loop().run_in_executor(None, started.acquire)
+        tasks[3].cancel()
+        release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    first = asyncio.run(run())
+    release.clear()
+    second = asyncio.run(run())
+    offloader.close()
+
+    assert [result is None for result in first] == [True, True, True, False]
+    assert [result is None for result in second] == [True, True, True, False]
+    assert len(calls) == 6
@@ -0,0 +1,285 @@
+import threading
+import time
+
+import click
+import pytest
+import requests
+from benchmarks.fake_bitbucket import FakeBitbucketServer
+from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.batch import (
+    BatchCommand,
+    BatchLine,
+    BatchScriptException,
+    parse_script,
+    plan_dependencies,
+)
+from bitbucketcli.bitbucket.bootstrap import FAILED, SKIPPED, SUCCEEDED
+
+
+@click.group()
+def fake_cli():
+    pass
+
+
+@fake_cli.command()
+@click.option("--workspace")
+@click.option("--repository")
+@click.option("--delay", type=float, default=0.0)
+@click.option("--fail", is_flag=True)
+def touch(workspace, repository, delay, fail):
+    time.sleep(delay)
+    click.echo(f"{workspace}/{repository} on {threading.current_thread().name}")
+    if fail:
+        click.ClickException(f"{repository} failed").show()
+
+
+def lines(*commands):
+    return [BatchLine(number, args) for number, args in enumerate(commands, start=1)]
+
+
+def test_parse_script_accepts_words_and_ndjson():
+    script = [
+        "# generated by the pipeline",
+        "./bitbucket-cli create-project --workspace w --key 'MY KEY' --name P",
+        "",
+        '{"command": "create-repository", "workspace": "w", "name": "r", "public": true}',
+        '{"args": ["enable-bypass-branch-pull-request", "--workspace", "w"]}',
+        '{"command": "sync-branch-restrictions", "repository": ["a", "b"], "dry_run": true}',
+    ]
+
+    assert parse_script(script) == [
+        BatchLine(
+            2, ["create-project", "--workspace", "w", "--key", "MY KEY", "--name", "P"]
+        ),
+        BatchLine(
+            4, ["create-repository", "--workspace", "w", "--name", "r", "--public"]
+        ),
+        BatchLine(5, ["enable-bypass-branch-pull-request", "--workspace", "w"]),
+        BatchLine(
+            6,
+            [
+                "sync-branch-restrictions",
+                "--repository",
+                "a",
+                "--repository",
+                "b",
+                "--dry-run",
+            ],
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "line, message",
+    [
+        ("{not json", "Line 1 is not valid JSON"),
+        ('{"workspace": "w"}', "Line 1 needs a command or args"),
+        ("create-project 'unterminated", "Line 1: No closing quotation"),
+        ("bitbucket-cli", "Line 1 has no command"),
+        ("daemon start", "Line 1: daemon cannot be run from a batch"),
+    ],
+)
+def test_parse_script_rejects_invalid_lines(line, message):
+    with pytest.raises(BatchScriptException, match=message):
+        parse_script([line])
+
+
+def test_plan_dependencies_orders_commands_on_the_same_resources():
+    dependencies = plan_dependencies(
+        lines(
+            ["create-project", "--workspace", "w", "--key", "PROJ"],
+            [
+                "create-repository",
+                "--workspace",
+                "w",
+                "--name",
+                "a",
+                "--project-key",
+                "PROJ",
+            ],
+            [
+                "create-repository",
+                "--workspace",
+                "w",
+                "--name",
+                "b",
+                "--project-key",
+                "PROJ",
+            ],
+            ["add-user-to-repository", "--workspace", "w", "--repository", "a"],
+            ["enable-bypass-branch-pull-request", "--workspace=w", "--repository=b"],
+            ["create-repository", "--workspace", "other", "--name", "a"],
+            ["offboard-user", "--workspace", "w", "--account-id", "1"],
+            ["add-user-to-repository", "--workspace", "w", "--repository", "c"],
+            ["query-inventory", "--help"],
+        )
+    )
+
+    assert dependencies == {
+        1: [],
+        2: [1],
+        3: [1],
+        4: [2],
+        5: [3],
+        6: [],
+        7: [1, 2, 3, 4, 5],
+        8: [7],
+        9: [1, 2, 3, 4, 5, 6, 7, 8],
+    }
+
+
+def test_plan_dependencies_waits_for_lines_without_a_workspace():
+    dependencies = plan_dependencies(
+        lines(
+            ["create-repository", "--workspace", "w", "--name", "a"],
+            ["create-repository", "--workspace", "other", "--name", "a"],
+            ["sync-inventory", "--full"],
+            ["add-user-to-repository", "--workspace", "w", "--repository", "a"],
+        ),
+        cli.cli,
+    )
+
+    assert dependencies == {1: [], 2: [], 3: [1, 2], 4: [3]}
+
+
+@pytest.mark.parametrize(
+    "script",
+    [
+        [
+            "create-repository --private --workspace ws --name r --project-key P",
+            "add-user-to-repository --workspace ws --repository r",
+        ],
+        [
+            '{"command": "create-repository", "private": true, "workspace": "ws",'
+            ' "name": "r", "project_key": "P"}',
+            '{"command": "add-user-to-repository", "workspace": "ws",'
+            ' "repository": "r"}',
+        ],
+        [
+            "sync-branch-restrictions --dry-run --prune --workspace ws",
+            "add-user-to-repository --workspace ws --repository r",
+        ],
+    ],
+)
+def test_plan_dependencies_reads_flags_before_the_workspace(script):
+    assert plan_dependencies(parse_script(script), cli.cli) == {1: [], 2: [1]}
+
+
+def test_plan_dependencies_does_not_take_an_option_as_a_value():
+    dependencies = plan_dependencies(
+        lines(
+            ["create-repository", "--unknown-flag", "--workspace", "ws", "--name", "r"],
+            ["add-user-to-repository", "--workspace", "ws", "--repository", "r"],
+        )
+    )
+
+    assert dependencies == {1: [], 2: [1]}
+
+
+def test_batch_streams_results_in_input_order():
+    command = BatchCommand(fake_cli, workers=4)
+
+    results = list(
+        command.run(
+            lines(
+                ["touch", "--workspace", "w", "--repository", "a", "--delay", "0.2"],
+                ["touch", "--workspace", "w", "--repository", "b"],
+                ["touch", "--workspace", "w", "--repository", "a"],
+            )
+        )
+    )
+
+    assert [result.number for result in results] == [1, 2, 3]
+    assert [result.status for result in results] == [SUCCEEDED] * 3
+    assert results[0].stdout.startswith("w/a on ")
+    assert results[1].stdout.startswith("w/b on ")
+    assert results[1].elapsed < 0.2
+    assert results[2].exit_code == 0
+
+
+def test_batch_runs_independent_commands_concurrently():
+    command = BatchCommand(fake_cli, workers=8)
+    started = time.perf_counter()
+
+    results = list(
+        command.run(
+            lines(
+                *[
+                    [
+                        "touch",
+                        "--workspace",
+                        "w",
+                        "--repository",
+                        f"r{i}",
+                        "--delay",
+                        "0.1",
+                    ]
+                    for i in range(8)
+                ]
+            )
+        )
+    )
+
+    assert time.perf_counter() - started < 0.5
+    assert len({result.stdout.split(" on ")[1] for result in results}) > 1
+
+
+def test_batch_skips_commands_after_a_failure():
+    command = BatchCommand(fake_cli, workers=2)
+
+    results = list(
+        command.run(
+            lines(
+                ["touch", "--workspace", "w", "--repository", "a", "--fail"],
+                ["touch", "--workspace", "w", "--repository", "a"],
+                ["touch", "--workspace", "w", "--repository", "b"],
+                ["touch", "--workspace", "other", "--unknown"],
+            )
+        )
+    )
+
+    assert [(result.number, result.status) for result in results] == [
+        (1, FAILED),
+        (2, SKIPPED),
+        (3, SUCCEEDED),
+        (4, FAILED),
+    ]
+    assert results[0].stderr == "Error: a failed\n"
+    assert results[1].detail == "line 1 did not succeed"
+    assert results[3].exit_code == 2
+    assert "No such option: --unknown" in results[3].stderr
+
+
+def test_batch_restores_process_streams():
+    import sys
+
+    streams = sys.stdin, sys.stdout, sys.stderr
+
+    list(BatchCommand(fake_cli).run(lines(["touch"])))
+
+    assert (sys.stdin, sys.stdout, sys.stderr) == streams
+
+
+def test_batch_against_fake_server(monkeypatch):
+    server = FakeBitbucketServer().start()
+    monkeypatch.setenv("BITBUCKET_API_URL", server.url)
+    try:
+        with requests.Session() as session:
+            monkeypatch.setattr(cli, "prepare_oauth_client", lambda **kwargs: session)
+            results = list(
+                BatchCommand(cli.cli, workers=4).run(
+                    parse_script(
+                        [
+                            "create-project --workspace w --name P --key PROJ --description ''",
+                            "create-repository --workspace w --name a --project-key PROJ",
+                            "create-repository --workspace w --name b --project-key PROJ",
+                            "enable-bypass-branch-pull-request --workspace w --repository a",
+                        ]
+                    )
+                )
+            )
+    finally:
+        server.stop()
+
+    assert [result.status for result in results] == [SUCCEEDED] * 4, results
+    assert set(server.state.repositories["w"]) == {"a", "b"}
@@ -0,0 +1,72 @@
+from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.batch import BatchResult
+from bitbucketcli.bitbucket.bootstrap import FAILED, SKIPPED, SUCCEEDED
+
+
+def test_batch_with_success(runner, mock_client):
+    mock = mock_client.patch(
+        "bitbucketcli.bitbucket.batch.BatchCommand.run",
+        return_value=iter(
+            [
+                BatchResult(1, [], SUCCEEDED, 0, "Project created.\n", "", 0.1, None),
+                BatchResult(
+                    2, [], SUCCEEDED, 0, "Repository created.\n", "", 0.2, None
+                ),
+            ]
+        ),
+    )
+
+    result = runner.invoke(
+        cli.batch,
+        ["--workers", "4"],
+        input="create-project --workspace w --key PROJ\n"
+        '{"command": "create-repository", "workspace": "w", "name": "r"}\n',
+    )
+
+    assert [line.args[0] for line in mock.call_args.args[0]] == [
+        "create-project",
+        "create-repository",
+    ]
+    assert result.exit_code == 0
+    assert result.output.startswith("Project created.\nRepository created.\n")
+    assert "Batch finished 2 commands in " in result.output
+    assert cli.session_cache is None
+
+
+def test_batch_with_failures(runner, mock_client):
+    mock_client.patch(
+        "bitbucketcli.bitbucket.batch.BatchCommand.run",
+        return_value=iter(
+            [
+                BatchResult(1, [], FAILED, 0, "", "Error: failed.\n", 0.1, None),
+                BatchResult(
+                    2, [], SKIPPED, None, "", "", 0.0, "line 1 did not succeed"
+                ),
+            ]
+        ),
+    )
+
+    result = runner.invoke(cli.batch, input="create-project\ncreate-project\n")
+
+    assert result.exit_code == 0
+    assert "Error: failed.\nline 1 failed\n" in result.output
+    assert "line 2 skipped: line 1 did not succeed\n" in result.output
+    assert result.output.endswith("Error: 2 of 2 commands did not succeed.\n")
+
+
+def test_batch_runs_cli_commands(runner, mock_client):
+    result = runner.invoke(
+        cli.batch, input="create-project --help\nremove-user-from-repository --help\n"
+    )
+
+    assert result.exit_code == 0
+    assert result.output.index("create-project [OPTIONS]") < result.output.index(
+        "remove-user-from-repository [OPTIONS]"
+    )
+
+
+def test_batch_with_invalid_script(runner, mock_client):
+    result = runner.invoke(cli.batch, input="{invalid\n")
+
+    assert result.exit_code == 2
+    assert "Line 1 is not valid JSON" in result.output
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+import requests
+from benchmarks.fake_bitbucket import FakeBitbucketServer
+from benchmarks.throughput import percentile, run
+
+
+@pytest.fixture
+def server():
+    server = FakeBitbucketServer().start()
+    yield server
+    server.stop()
+
+
+def test_fake_server_serves_paginated_repositories(server):
+    server.state.seed("workspace1", repositories=25)
+
+    first = requests.get(
+        f"{server.url}/2.0/repositories/workspace1", params={"pagelen": 10}
+    ).json()
+    last = requests.get(first["next"]).json()
+
+    assert first["size"] == 25
+    assert len(first["values"]) == 10
+    assert last["page"] == 2
+
+
+def test_fake_server_injects_throttling():
+    server = FakeBitbucketServer(throttle_rate=1.0).start()
+    try:
+        response = requests.post(
+            f"{server.url}/2.0/workspaces/workspace1/projects",
+            data=json.dumps({"key": "KEY"}),
+        )
+    finally:
+        server.stop()
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "0"
+
+
+def test_percentile():
+    samples = list(range(1, 101))
+    assert percentile(samples, 0.5) == 50
+    assert percentile(samples, 0.99) == 99
+
+
+def test_benchmark_covers_every_command_in_single_and_bulk_modes():
+    results = run(operations=3, workers=2)
+
+    assert {(result["scenario"], result["mode"]) for result in results} == {
+        (scenario, mode)
+        for scenario in {result["scenario"] for result in results}
+        for mode in ("single", "bulk")
+    }
+    assert len(results) == 14
+    assert all(result["failures"] == 0 for result in results)
+    assert all(result["ops_per_second"] > 0 for result in results)
@@ -0,0 +1,128 @@
+import threading
+import time
+from unittest.mock import MagicMock, call
+
+import pytest
+from bitbucketcli.bitbucket.bitbucket import BitbucketApiException, BitbucketClient
+
+
+def page(values, next_url=None, status_code=200):
+    response = MagicMock(status_code=status_code, ok=status_code < 400)
+    body = {"values": values}
+    if next_url:
+        body["next"] = next_url
+    response.json.return_value = body
+    return response
+
+
+def test_paginate_follows_next_links_lazily(monkeypatch):
+    monkeypatch.setenv("BITBUCKET_API_URL", "https://api.bitbucket.org")
+    repositories_url = "https://api.bitbucket.org/2.0/repositories/workspace1"
+    next_url = f"{repositories_url}?pagelen=2&page=2"
+    session_mock = MagicMock()
+    session_mock.get.side_effect = [
+        page([{"slug": "repo1"}, {"slug": "repo2"}], next_url),
+        page([{"slug": "repo3"}]),
+    ]
+
+    items = BitbucketClient(session_mock).paginate(
+        "2.0/repositories/workspace1", params={"role": "member"}, pagelen=2
+    )
+
+    assert next(items) == {"slug": "repo1"}
+    assert next(items) == {"slug": "repo2"}
+    assert session_mock.get.call_count == 1
+    assert list(items) == [{"slug": "repo3"}]
+    session_mock.get.assert_has_calls(
+        [
+            call(
+                url=repositories_url,
+                data=None,
+                params={"role": "member", "pagelen": 2},
+                headers={"Accept": "application/json"},
+            ),
+            call(
+                url=next_url,
+                data=None,
+                params=None,
+                headers={"Accept": "application/json"},
+            ),
+        ]
+    )
+
+
+def test_paginate_without_pagelen_keeps_params():
+    session_mock = MagicMock()
+    session_mock.get.return_value = page([])
+
+    assert list(BitbucketClient(session_mock).paginate("2.0/path")) == []
+    assert session_mock.get.call_args.kwargs["params"] is None
+
+
+def test_paginate_raises_on_failed_page():
+    session_mock = MagicMock()
+    session_mock.get.side_effect = [
+        page([{"slug": "repo1"}], "https://api.bitbucket.org/next"),
+        page([], status_code=404),
+    ]
+
+    items = BitbucketClient(session_mock).paginate("2.0/repositories/workspace1")
+
+    assert next(items) == {"slug": "repo1"}
+    with pytest.raises(BitbucketApiException) as error:
+        next(items)
+    assert error.value.status_code == 404
+
+
+def numbered_pages(size, pagelen, delays=None):
+    lock = threading.Lock()
+    in_flight = 0
+    stats = {"peak": 0, "pages": []}
+
+    def get(url, params, **kwargs):
+        nonlocal in_flight
+        number = (params or {}).get("page", 1)
+        with lock:
+            in_flight += 1
+            stats["peak"] = max(stats["peak"], in_flight)
+            stats["pages"].append(number)
+        time.sleep((delays or {}).get(number, 0))
+        with lock:
+            in_flight -= 1
+        first = (number - 1) * pagelen
+        response = page(list(range(first, min(first + pagelen, size))))
+        response.json.return_value.update(
+            {"size": size, "pagelen": pagelen, "page": number, "next": "unused"}
+        )
+        return response
+
+    return get, stats
+
+
+def test_paginate_prefetches_numbered_pages_in_order():
+    get, stats = numbered_pages(size=95, pagelen=10, delays={2: 0.05, 3: 0.02, 7: 0.03})
+    session_mock = MagicMock()
+    session_mock.get.side_effect = get
+
+    items = list(
+        BitbucketClient(session_mock).paginate(
+            "2.0/repositories/workspace1", pagelen=10, prefetch=4
+        )
+    )
+
+    assert items == list(range(95))
+    assert sorted(stats["pages"]) == list(range(1, 11))
+    assert 1 < stats["peak"] <= 4
+
+
+def test_paginate_prefetch_falls_back_to_next_links():
+    session_mock = MagicMock()
+    session_mock.get.side_effect = [
+        page([1, 2], "https://api.bitbucket.org/next"),
+        page([3]),
+    ]
+
+    items = BitbucketClient(session_mock).paginate("2.0/path", prefetch=4)
+
+    assert list(items) == [1, 2, 3]
+    assert session_mock.get.call_count == 2
@@ -0,0 +1,212 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from bitbucketcli.bitbucket.bitbucket import current_request_hooks, request_hook
+from bitbucketcli.bitbucket.bootstrap import (
+    FAILED,
+    SKIPPED,
+    SUCCEEDED,
+    BootstrapCommand,
+    BootstrapManifestException,
+    DagExecutor,
+    Node,
+    build_plan,
+)
+
+
+def succeed(order):
+    def action():
+        order.append(threading.current_thread().name)
+        return True, None
+
+    return action
+
+
+def test_dag_executor_runs_dependencies_first():
+    finished = []
+
+    def action(name):
+        def run():
+            finished.append(name)
+            return True, None
+
+        return run
+
+    nodes = [
+        Node("invite", action("invite"), ["repository"]),
+        Node("repository", action("repository"), ["project"]),
+        Node("project", action("project"), []),
+    ]
+
+    results = list(DagExecutor(workers=4).run(nodes))
+
+    assert finished == ["project", "repository", "invite"]
+    assert [result.status for result in results] == [SUCCEEDED] * 3
+    assert all(result.elapsed >= 0 for result in results)
+
+
+def test_dag_executor_runs_independent_nodes_in_parallel():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def action():
+        barrier.wait()
+        return True, None
+
+    nodes = [Node(f"repository:{i}", action, []) for i in range(3)]
+
+    results = list(DagExecutor(workers=3).run(nodes))
+
+    assert {result.status for result in results} == {SUCCEEDED}
+
+
+def test_dag_executor_skips_dependents_of_failed_nodes():
+    nodes = [
+        Node("project", lambda: (False, "conflict"), []),
+        Node("other-project", lambda: (True, None), []),
+        Node("repository", lambda: (True, None), ["project", "other-project"]),
+        Node("invite", lambda: (True, None), ["repository"]),
+        Node(
+            "network",
+            MagicMock(side_effect=requests.exceptions.ConnectionError("down")),
+            [],
+        ),
+        Node("unexpected", MagicMock(side_effect=KeyError("uuid")), []),
+        Node("after-unexpected", lambda: (True, None), ["unexpected"]),
+    ]
+
+    results = {result.id: result for result in DagExecutor(workers=2).run(nodes)}
+
+    assert results["project"].status == FAILED
+    assert results["project"].detail == "conflict"
+    assert results["other-project"].status == SUCCEEDED
+    assert results["repository"].status == SKIPPED
+    assert results["invite"].status == SKIPPED
+    assert results["network"].status == FAILED
+    assert results["network"].detail == "down"
+    assert results["unexpected"].status == FAILED
+    assert results["unexpected"].detail == "KeyError('uuid')"
+    assert results["after-unexpected"].status == SKIPPED
+
+
+def test_dag_executor_runs_actions_with_the_caller_request_hooks():
+    seen = []
+
+    def action():
+        seen.append(current_request_hooks())
+        return True, None
+
+    with request_hook(print):
+        list(DagExecutor(workers=2).run([Node("a", action, []), Node("b", action, [])]))
+
+    assert seen == [(print,), (print,)]
+
+
+@pytest.mark.parametrize(
+    "nodes,message",
+    [
+        ([Node("a", None, []), Node("a", None, [])], "a is declared twice"),
+        ([Node("a", None, ["b"])], "a depends on unknown b"),
+        (
+            [Node("a", None, ["b"]), Node("b", None, ["a"]), Node("c", None, [])],
+            "Dependency cycle between a, b",
+        ),
+    ],
+)
+def test_dag_executor_rejects_invalid_graphs(nodes, message):
+    with pytest.raises(BootstrapManifestException, match=message):
+        DagExecutor().run(nodes)
+
+
+def test_build_plan_links_projects_repositories_and_invites():
+    manifest = {
+        "workspace": "workspace1",
+        "projects": [{"key": "PROJ", "name": "Project"}],
+        "repositories": [
+            {"name": "repository1", "project_key": "PROJ"},
+            {"name": "repository2", "project_key": "EXISTING"},
+        ],
+        "invites": [
+            {"email": "user1@email.com", "repository": "repository1"},
+            {"email": "user2@email.com", "repository": "repository1"},
+            {
+                "email": "user3@email.com",
+                "repository": "repository3",
+                "permission": "write",
+            },
+        ],
+    }
+
+    nodes = build_plan(manifest)
+
+    assert [(node.id, node.dependencies) for node in nodes] == [
+        ("project:PROJ", []),
+        ("repository:repository1", ["project:PROJ"]),
+        ("repository:repository2", []),
+        ("invite:repository1:read:1", ["repository:repository1"]),
+        ("invite:repository3:write:1", []),
+    ]
+
+
+@pytest.mark.parametrize(
+    "manifest",
+    [
+        {},
+        {"workspace": "workspace1", "projects": [{"name": "No key"}]},
+        {"workspace": "workspace1", "repositories": [{"name": "repository1"}]},
+        {"workspace": "workspace1", "repositories": "repository1"},
+        {"workspace": "workspace1", "projects": [{"key": "P"}, {"key": "P"}]},
+        {
+            "workspace": "workspace1",
+            "repositories": [
+                {"name": "repository1", "project_key": "P"},
+                {"name": "repository1", "project_key": "P"},
+            ],
+        },
+    ],
+)
+def test_build_plan_rejects_invalid_manifests(manifest):
+    with pytest.raises(BootstrapManifestException):
+        build_plan(manifest)
+
+
+def test_bootstrap_command_creates_resources_in_order():
+    session_mock = MagicMock()
+    calls = []
+
+    def post(url, data, params, headers):
+        calls.append(url)
+        response = MagicMock()
+        if "/projects" in url:
+            response.status_code = 201
+        elif "branch-restrictions" in url:
+            response.status_code = 201
+        else:
+            response.status_code = 200
+            response.json.return_value = {"mainbranch": {"name": "main"}}
+        return response
+
+    session_mock.post.side_effect = post
+    manifest = {
+        "workspace": "workspace1",
+        "projects": [{"key": "PROJ"}],
+        "repositories": [{"name": "repository1", "project_key": "PROJ"}],
+        "restrictions": [{"kind": "push"}],
+        "invites": [{"email": "user1@email.com", "repository": "repository1"}],
+    }
+
+    results = list(BootstrapCommand(session_mock, workers=4).run(build_plan(manifest)))
+
+    assert [(result.id, result.status) for result in results] == [
+        ("project:PROJ", SUCCEEDED),
+        ("repository:repository1", SUCCEEDED),
+        ("invite:repository1:read:1", SUCCEEDED),
+    ]
+    assert [url.rsplit("/", 2)[-2:] for url in calls] == [
+        ["workspace1", "projects"],
+        ["workspace1", "repository1"],
+        ["repository1", "branch-restrictions"],
+        ["workspace1", "repository1"],
+    ]
+    assert results[2].detail == "user1@email.com"
@@ -0,0 +1,105 @@
+import json
+
+from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.bootstrap import FAILED, SKIPPED, SUCCEEDED, NodeResult
+
+
+def test_bootstrap_with_success(runner, mock_client, tmp_path):
+    manifest = tmp_path / "bootstrap.json"
+    manifest.write_text(
+        json.dumps(
+            {
+                "workspace": "workspace1",
+                "projects": [{"key": "PROJ"}],
+                "repositories": [{"name": "repository1", "project_key": "PROJ"}],
+            }
+        )
+    )
+    mock = mock_client.patch(
+        "bitbucketcli.bitbucket.bootstrap.BootstrapCommand.run",
+        return_value=iter(
+            [
+                NodeResult("project:PROJ", SUCCEEDED, 0.1, None),
+                NodeResult("repository:repository1", SUCCEEDED, 0.2, None),
+            ]
+        ),
+    )
+
+    result = runner.invoke(
+        cli.bootstrap, ["--manifest", str(manifest), "--workers", "4"]
+    )
+
+    assert [node.id for node in mock.call_args.args[0]] == [
+        "project:PROJ",
+        "repository:repository1",
+    ]
+    cli.prepare_oauth_client.assert_called_once_with(pool_size=4)
+    assert result.exit_code == 0
+    assert result.output.startswith(
+        "project:PROJ succeeded in 100ms\n"
+        "repository:repository1 succeeded in 200ms\n"
+    )
+    assert "Bootstrap finished 2 steps in" in result.output
+
+
+def test_bootstrap_with_failures(runner, mock_client, tmp_path):
+    manifest = tmp_path / "bootstrap.json"
+    manifest.write_text(
+        json.dumps(
+            {
+                "workspace": "workspace1",
+                "repositories": [{"name": "repository1", "project_key": "PROJ"}],
+                "invites": [{"email": "user1@email.com", "repository": "repository1"}],
+            }
+        )
+    )
+    mock_client.patch(
+        "bitbucketcli.bitbucket.bootstrap.BootstrapCommand.run",
+        return_value=iter(
+            [
+                NodeResult("repository:repository1", FAILED, 0.1, None),
+                NodeResult(
+                    "invite:repository1:read:1",
+                    SKIPPED,
+                    0.0,
+                    "repository:repository1 did not succeed",
+                ),
+            ]
+        ),
+    )
+
+    result = runner.invoke(cli.bootstrap, ["--manifest", str(manifest)])
+
+    assert result.exit_code == 0
+    assert "repository:repository1 failed in 100ms\n" in result.output
+    assert (
+        "invite:repository1:read:1 skipped in 0ms: repository:repository1 did not succeed\n"
+        in result.output
+    )
+    assert result.output.endswith("Error: 2 of 2 steps did not succeed.\n")
+
+
+def test_bootstrap_with_invalid_manifest(runner, mock_client, tmp_path):
+    manifest = tmp_path / "bootstrap.json"
+    manifest.write_text(json.dumps({"projects": []}))
+
+    result = runner.invoke(cli.bootstrap, ["--manifest", str(manifest)])
+
+    assert result.exit_code == 2
+    assert "Invalid value for --manifest" in result.output
+    cli.prepare_oauth_client.assert_not_called()
+
+
+def test_bootstrap_with_duplicated_project(runner, mock_client, tmp_path):
+    manifest = tmp_path / "bootstrap.json"
+    manifest.write_text(
+        json.dumps(
+            {"workspace": "workspace1", "projects": [{"key": "P"}, {"key": "P"}]}
+        )
+    )
+
+    result = runner.invoke(cli.bootstrap, ["--manifest", str(manifest)])
+
+    assert result.exit_code == 2
+    assert "project:P is declared twice" in result.output
+    cli.prepare_oauth_client.assert_not_called()
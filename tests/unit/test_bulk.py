@@ -0,0 +1,221 @@
+import io
+import json
+import os
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from bitbucketcli.bitbucket.bulk import (
+    BulkInviteCommand,
+    Invite,
+    InviteResult,
+    ManifestException,
+    batch_invites,
+    manifest_format_from_name,
+    read_manifest,
+)
+from bitbucketcli.bitbucket.journal import Journal
+
+
+def test_read_csv_manifest():
+    manifest = io.StringIO(
+        "email,repository,permission\n"
+        "user1@email.com,repository1,write\n"
+        "user2@email.com,repository2,\n"
+    )
+    invites = list(read_manifest(manifest, "csv"))
+    assert invites == [
+        Invite("user1@email.com", "repository1", "write"),
+        Invite("user2@email.com", "repository2", "read"),
+    ]
+
+
+def test_read_ndjson_manifest():
+    manifest = io.StringIO(
+        '{"email": "user1@email.com", "repository": "repository1", "permission": "admin"}\n'
+        "\n"
+        '{"email": "user2@email.com", "repository": "repository2"}\n'
+    )
+    invites = list(read_manifest(manifest, "ndjson"))
+    assert invites == [
+        Invite("user1@email.com", "repository1", "admin"),
+        Invite("user2@email.com", "repository2", "read"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "content,manifest_format,line",
+    [
+        ("email,repository,permission\nuser@email.com,,read\n", "csv", 2),
+        ("email,repository,permission\nuser@email.com,repo,owner\n", "csv", 2),
+        ('{"email": "user@email.com", "repository": "repo"}\n{bad\n', "ndjson", 2),
+    ],
+)
+def test_invalid_manifest(content, manifest_format, line):
+    with pytest.raises(ManifestException) as error:
+        list(read_manifest(io.StringIO(content), manifest_format))
+    assert error.value.line == line
+
+
+@pytest.mark.parametrize(
+    "name,manifest_format",
+    [("invites.csv", "csv"), ("invites.CSV", "csv"), ("invites.ndjson", "ndjson")],
+)
+def test_manifest_format_from_name(name, manifest_format):
+    assert manifest_format_from_name(name) == manifest_format
+
+
+def test_bulk_invites_share_the_session():
+    invites = [
+        Invite(f"user{i}@email.com", f"repository{i % 3}", "read") for i in range(20)
+    ]
+    session_mock = MagicMock()
+    session_mock.post.return_value.status_code = 200
+
+    results = list(
+        BulkInviteCommand("workspace1", session_mock, workers=4, batch_size=1).run(
+            invites
+        )
+    )
+
+    assert len(results) == 20
+    assert all(result.success for result in results)
+    assert {result.invite for result in results} == set(invites)
+    assert session_mock.post.call_count == 20
+    posted = {
+        (kwargs["url"], kwargs["data"])
+        for _, kwargs in session_mock.post.call_args_list
+    }
+    assert (
+        f"{os.getenv('BITBUCKET_INTERNAL_API_URL')}/!api/internal/invitations/repositories/workspace1/repository1",
+        json.dumps({"emails": ["user1@email.com"], "permission": "read"}),
+    ) in posted
+
+
+def test_batch_invites_by_repository_and_permission():
+    invites = [
+        Invite("user1@email.com", "repository1", "read"),
+        Invite("user2@email.com", "repository1", "read"),
+        Invite("user3@email.com", "repository1", "read"),
+        Invite("user1@email.com", "repository1", "read"),
+        Invite("user1@email.com", "repository1", "admin"),
+        Invite("user1@email.com", "repository2", "read"),
+    ]
+    batches = list(batch_invites(invites, max_batch_size=2))
+    assert batches == [
+        [invites[0], invites[1]],
+        [invites[2]],
+        [invites[4]],
+        [invites[5]],
+    ]
+
+
+def test_bulk_invites_are_coalesced_per_repository():
+    invites = [
+        Invite(f"user{i}@email.com", f"repository{i % 2}", "read") for i in range(10)
+    ]
+    session_mock = MagicMock()
+    session_mock.post.return_value.status_code = 200
+
+    results = list(BulkInviteCommand("workspace1", session_mock).run(invites))
+
+    assert sorted(results) == sorted(
+        InviteResult(invite, True, None, 200) for invite in invites
+    )
+    assert session_mock.post.call_count == 2
+    payloads = sorted(
+        json.loads(kwargs["data"])["emails"]
+        for _, kwargs in session_mock.post.call_args_list
+    )
+    assert payloads == [
+        [f"user{i}@email.com" for i in range(0, 10, 2)],
+        [f"user{i}@email.com" for i in range(1, 10, 2)],
+    ]
+
+
+def test_bulk_invites_report_failures():
+    invites = [
+        Invite("user1@email.com", "repository1", "read"),
+        Invite("user2@email.com", "repository2", "read"),
+    ]
+
+    def post(url, **kwargs):
+        if url.endswith("repository2"):
+            raise requests.exceptions.ConnectionError("connection reset")
+        return MagicMock(status_code=200)
+
+    session_mock = MagicMock()
+    session_mock.post.side_effect = post
+
+    results = {
+        result.invite.repository: result
+        for result in BulkInviteCommand("workspace1", session_mock).run(invites)
+    }
+
+    assert results["repository1"].success is True
+    assert results["repository2"].success is False
+    assert results["repository2"].error == "connection reset"
+
+
+def test_bulk_invites_resume_from_journal(tmp_path):
+    invites = [Invite(f"user{i}@email.com", f"repository{i}", "read") for i in range(3)]
+    session_mock = MagicMock()
+    session_mock.post.side_effect = [
+        MagicMock(status_code=status_code) for status_code in (200, 500, 200)
+    ]
+    path = tmp_path / "invites.journal"
+
+    with Journal(path) as journal:
+        first = list(
+            BulkInviteCommand("workspace1", session_mock, 1, journal=journal).run(
+                invites
+            )
+        )
+    session_mock.post.side_effect = None
+    session_mock.post.return_value.status_code = 200
+    with Journal(path, resume=True) as journal:
+        second = list(
+            BulkInviteCommand("workspace1", session_mock, 1, journal=journal).run(
+                invites
+            )
+        )
+
+    assert sorted(result.status_code for result in first) == [200, 200, 500]
+    assert [result.invite for result in second] == [
+        next(result.invite for result in first if result.status_code == 500)
+    ]
+    assert journal.skipped == 2
+    assert session_mock.post.call_count == 4
+
+
+def test_bulk_invites_resume_only_in_the_journaled_workspace(tmp_path):
+    invites = [Invite("user1@email.com", "repository1", "read")]
+    session_mock = MagicMock()
+    session_mock.post.return_value.status_code = 200
+    path = tmp_path / "invites.journal"
+
+    with Journal(path) as journal:
+        list(
+            BulkInviteCommand("workspace1", session_mock, journal=journal).run(invites)
+        )
+    with Journal(path, resume=True) as journal:
+        results = list(
+            BulkInviteCommand("workspace2", session_mock, journal=journal).run(invites)
+        )
+
+    assert [result.invite for result in results] == invites
+    assert journal.skipped == 0
+    assert session_mock.post.call_count == 2
+
+
+def test_bulk_invites_skip_duplicates():
+    invite = Invite("user1@email.com", "repository1", "read")
+    session_mock = MagicMock()
+    session_mock.post.return_value.status_code = 200
+    command = BulkInviteCommand("workspace1", session_mock)
+
+    results = list(command.run([invite, invite, invite]))
+
+    assert results == [InviteResult(invite, True, None, 200)]
+    assert command.duplicates == 2
+    assert session_mock.post.call_count == 1
@@ -0,0 +1,164 @@
+from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.bulk import Invite, InviteResult
+from bitbucketcli.bitbucket.repository import InvitationResult
+
+
+def test_bulk_add_user_to_repository_with_success(runner, mock_client, tmp_path):
+    manifest = tmp_path / "invites.csv"
+    manifest.write_text(
+        "email,repository,permission\n"
+        "user1@email.com,repository1,write\n"
+        "user2@email.com,repository2,read\n"
+    )
+    invites = [
+        Invite("user1@email.com", "repository1", "write"),
+        Invite("user2@email.com", "repository2", "read"),
+    ]
+    mock = mock_client.patch(
+        "bitbucketcli.bitbucket.bulk.BulkInviteCommand.run",
+        return_value=iter(InviteResult(invite, True, None) for invite in invites),
+    )
+
+    result = runner.invoke(
+        cli.bulk_add_user_to_repository,
+        ["--workspace", "workspace1", "--manifest", str(manifest), "--workers", "4"],
+    )
+
+    mock.assert_called_once_with(invites)
+    cli.prepare_oauth_client.assert_called_once_with(pool_size=4)
+    assert result.exit_code == 0
+    assert result.output == (
+        "Invite to access the repository repository1 was created with success for user with email user1@email.com\n"
+        "Invite to access the repository repository2 was created with success for user with email user2@email.com\n"
+    )
+
+
+def test_bulk_add_user_to_repository_with_failures(runner, mock_client, tmp_path):
+    manifest = tmp_path / "invites.ndjson"
+    manifest.write_text('{"email": "user1@email.com", "repository": "repository1"}\n')
+    invite = Invite("user1@email.com", "repository1", "read")
+    mock_client.patch(
+        "bitbucketcli.bitbucket.bulk.BulkInviteCommand.run",
+        return_value=iter([InviteResult(invite, False, None)]),
+    )
+
+    result = runner.invoke(
+        cli.bulk_add_user_to_repository,
+        ["--workspace", "workspace1", "--manifest", str(manifest)],
+    )
+
+    assert result.exit_code == 0
+    assert result.output == (
+        "Failed to invite to access the repository repository1 for user with email user1@email.com.\n"
+        "Error: 1 of 1 invites failed.\n"
+    )
+
+
+def test_bulk_add_user_to_repository_with_invalid_manifest(
+    runner, mock_client, tmp_path
+):
+    manifest = tmp_path / "invites.csv"
+    manifest.write_text("email,repository,permission\nuser1@email.com,,read\n")
+    mock = mock_client.patch("bitbucketcli.bitbucket.bulk.BulkInviteCommand.run")
+
+    result = runner.invoke(
+        cli.bulk_add_user_to_repository,
+        ["--workspace", "workspace1", "--manifest", str(manifest)],
+    )
+
+    mock.assert_not_called()
+    assert result.exit_code == 2
+    assert "Invalid manifest entry at line 2" in result.output
+
+
+def test_bulk_add_user_to_repository_with_journal(runner, mock_client, tmp_path):
+    manifest = tmp_path / "invites.csv"
+    manifest.write_text("email,repository\nuser1@email.com,repository1\n")
+    journal = tmp_path / "invites.journal"
+    journal.write_text(
+        '{"id": "invite workspace1/repository1 read user1@email.com", "state": "completed"}\n'
+    )
+    mock = mock_client.patch("bitbucketcli.bitbucket.bulk.RepositoryCommand")
+
+    result = runner.invoke(
+        cli.bulk_add_user_to_repository,
+        [
+            "--workspace",
+            "workspace1",
+            "--manifest",
+            str(manifest),
+            "--journal",
+            str(journal),
+            "--resume",
+        ],
+    )
+
+    mock.return_value.invite_users.assert_not_called()
+    assert result.exit_code == 0
+    assert result.output == ("Skipped 1 operations already completed in the journal.\n")
+
+
+def test_bulk_add_user_to_repository_resume_requires_journal(
+    runner, mock_client, tmp_path
+):
+    manifest = tmp_path / "invites.csv"
+    manifest.write_text("email,repository\nuser1@email.com,repository1\n")
+
+    result = runner.invoke(
+        cli.bulk_add_user_to_repository,
+        ["--workspace", "workspace1", "--manifest", str(manifest), "--resume"],
+    )
+
+    assert result.exit_code == 2
+    assert "Invalid value for --resume: requires --journal" in result.output
+
+
+def test_bulk_add_user_to_repository_prints_connection_stats(
+    runner, mock_client, tmp_path
+):
+    manifest = tmp_path / "invites.csv"
+    manifest.write_text("email,repository\nuser1@email.com,repository1\n")
+    mock_client.patch(
+        "bitbucketcli.bitbucket.bulk.BulkInviteCommand.run", return_value=iter([])
+    )
+    mock_client.patch(
+        "bitbucketcli.bitbucket.bulk.BulkInviteCommand.connection_stats",
+        return_value={
+            "https://api.bitbucket.org": {"connections": 2, "requests": 9, "reused": 7}
+        },
+    )
+
+    result = runner.invoke(
+        cli.bulk_add_user_to_repository,
+        ["--workspace", "workspace1", "--manifest", str(manifest)],
+    )
+
+    assert result.exit_code == 0
+    assert result.stderr == (
+        "https://api.bitbucket.org: 9 requests over 2 connections, 7 reused\n"
+    )
+
+
+def test_bulk_add_user_to_repository_reports_duplicates(runner, mock_client, tmp_path):
+    manifest = tmp_path / "invites.csv"
+    manifest.write_text(
+        "email,repository\nuser1@email.com,repository1\nuser1@email.com,repository1\n"
+    )
+    mock = mock_client.patch("bitbucketcli.bitbucket.bulk.RepositoryCommand")
+    mock.return_value.invitation_results.return_value = {
+        "user1@email.com": InvitationResult(False, 400)
+    }
+    mock.return_value.connection_stats.return_value = {}
+    mock.return_value.throttle_stats.return_value = {}
+
+    result = runner.invoke(
+        cli.bulk_add_user_to_repository,
+        ["--workspace", "workspace1", "--manifest", str(manifest)],
+    )
+
+    assert result.exit_code == 0
+    assert result.stderr == (
+        "Failed to invite to access the repository repository1 for user with email user1@email.com.\n"
+        "Skipped 1 duplicate invites in the manifest.\n"
+        "Error: 1 of 1 invites failed.\n"
+    )
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+DEFERRED_MODULES = [
+    "requests",
+    "oauthlib",
+    "requests_oauthlib",
+    "dotenv",
+    "bitbucketcli.bitbucket.bitbucket",
+    "bitbucketcli.bitbucket.repository",
+]
+
+
+def imported_modules(code):
+    output = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport sys\nprint('\\n'.join(sys.modules))"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parents[2],
+    ).stdout
+    return set(output.splitlines())
+
+
+@pytest.mark.parametrize("module", DEFERRED_MODULES)
+def test_cli_import_defers_heavy_modules(module):
+    assert module not in imported_modules("import bitbucketcli.bitbucket.cli")
+
+
+def test_help_does_not_import_heavy_modules():
+    modules = imported_modules(
+        "from bitbucketcli.bitbucket.cli import cli\n"
+        "try:\n"
+        "    cli(['create-repository', '--help'])\n"
+        "except SystemExit:\n"
+        "    pass"
+    )
+    assert modules.isdisjoint(DEFERRED_MODULES)
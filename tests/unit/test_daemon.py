@@ -0,0 +1,329 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import click
+import pytest
+from bitbucketcli.bitbucket import daemon
+from bitbucketcli.bitbucket.daemon import (
+    DaemonServer,
+    DaemonUnavailableException,
+    SessionCache,
+    forward,
+    request,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@click.command()
+@click.option("--name", prompt="Name")
+@click.option("--input", "input_file", type=click.File())
+@click.option("--fail", is_flag=True)
+def greet(name, input_file, fail):
+    if fail:
+        raise click.ClickException("failed")
+    click.echo(f"hello {name} from {os.getcwd()}")
+    if input_file is not None:
+        click.echo(input_file.read(), nl=False)
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to ~100 bytes, shorter than most tmp_paths.
+    directory = tempfile.mkdtemp(prefix="bb-", dir="/tmp")
+    yield os.path.join(directory, "daemon.sock")
+    os.rmdir(directory)
+
+
+@pytest.fixture
+def server(socket_path):
+    server = DaemonServer(socket_path, lambda args: greet.main(args, prog_name="greet"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_forward_returns_output_and_exit_code(server, socket_path, tmp_path):
+    response = forward(
+        ["--name", "world", "--input", "-"], "piped", str(tmp_path), socket_path
+    )
+
+    assert response == {
+        "stdout": f"hello world from {tmp_path}\npiped",
+        "stderr": "",
+        "exit_code": 0,
+    }
+    assert server.commands == 1
+
+
+def test_forward_reports_failures(server, socket_path):
+    response = forward(["--name", "world", "--fail"], socket_path=socket_path)
+
+    assert response["exit_code"] == 1
+    assert response["stderr"] == "Error: failed\n"
+
+    response = forward(["--bogus"], socket_path=socket_path)
+
+    assert response["exit_code"] == 2
+    assert "No such option: --bogus" in response["stderr"]
+
+
+def test_prompts_fall_back_to_the_client(server, socket_path):
+    assert forward([], socket_path=socket_path) == {"fallback": "interactive"}
+    assert server.commands == 0
+
+
+def test_prompt_after_output_fails_instead_of_falling_back(socket_path):
+    @click.command()
+    def late_prompt():
+        click.echo("working")
+        click.prompt("Name")
+
+    server = DaemonServer(socket_path, lambda args: late_prompt.main(args))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        response = forward([], socket_path=socket_path)
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    assert response["exit_code"] == 1
+    assert response["stdout"].startswith("working\n")
+    assert "needs interactive input" in response["stderr"]
+
+
+def test_output_streams_while_busy_commands_fall_back(socket_path):
+    release = threading.Event()
+
+    @click.command()
+    def slow():
+        click.echo("first row")
+        release.wait(5)
+        click.echo("second row")
+
+    server = DaemonServer(socket_path, lambda args: slow.main(args))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    streamed = []
+    first_row = threading.Event()
+
+    def output(name, text):
+        streamed.append((name, text))
+        first_row.set()
+
+    client = threading.Thread(
+        target=forward,
+        args=([],),
+        kwargs={"socket_path": socket_path, "output": output},
+    )
+    client.start()
+    try:
+        assert first_row.wait(5)
+        assert streamed == [("stdout", "first row\n")]
+        assert forward([], socket_path=socket_path) == {"fallback": "busy"}
+        assert request({"control": "status"}, socket_path)["commands"] == 0
+    finally:
+        release.set()
+        client.join()
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    assert streamed == [("stdout", "first row\n"), ("stdout", "second row\n")]
+    assert server.commands == 1
+
+
+def test_environment_mismatch_falls_back_to_the_client(
+    server, socket_path, monkeypatch
+):
+    monkeypatch.setenv("BITBUCKET_API_URL", "http://localhost:1")
+
+    response = forward(["--name", "world"], socket_path=socket_path)
+
+    assert response == {"fallback": "environment"}
+    assert server.commands == 0
+
+
+def test_daemon_restores_process_state(server, socket_path, tmp_path):
+    cwd = os.getcwd()
+    stdin = sys.stdin
+
+    forward(["--name", "world", "--input", "-"], "piped", str(tmp_path), socket_path)
+
+    assert os.getcwd() == cwd
+    assert sys.stdin is stdin
+
+
+def test_status_and_stop(server, socket_path):
+    assert request({"control": "status"}, socket_path) == {
+        "pid": os.getpid(),
+        "commands": 0,
+    }
+    assert request({"control": "stop"}, socket_path) == {"stopping": True}
+
+
+def test_socket_is_private(server, socket_path):
+    assert os.stat(socket_path).st_mode & 0o777 == 0o600
+
+
+def test_request_without_daemon(socket_path):
+    with pytest.raises(DaemonUnavailableException):
+        request({"control": "status"}, socket_path)
+
+
+def test_stale_socket_is_replaced(socket_path):
+    stale = DaemonServer(socket_path, lambda args: None)
+    stale.socket.close()
+
+    server = DaemonServer(socket_path, lambda args: None)
+    server.server_close()
+
+    assert not os.path.exists(socket_path)
+
+
+def test_live_daemon_is_not_replaced(server, socket_path):
+    with pytest.raises(OSError, match="already listening"):
+        DaemonServer(socket_path, lambda args: None)
+
+
+def test_session_cache_reuses_fresh_sessions():
+    created = []
+
+    def factory(pool_size):
+        created.append(pool_size)
+        return SimpleNamespace(token={"fresh": True})
+
+    cache = SessionCache(factory, lambda token: token["fresh"])
+
+    first = cache.get()
+    assert cache.get() is first
+    assert cache.get(32) is not first
+    first.token["fresh"] = False
+    assert cache.get() is not first
+    assert created == [None, 32, None]
+
+
+def test_session_cache_stops_the_refresh_of_replaced_sessions():
+    def factory(pool_size):
+        return MagicMock(token={"fresh": True})
+
+    cache = SessionCache(factory, lambda token: token["fresh"])
+    stale = cache.get()
+    stale.token["fresh"] = False
+    current = cache.get()
+    other = cache.get(32)
+
+    stale.token_manager.close.assert_called_once_with()
+    stale.close.assert_not_called()
+    current.token_manager.close.assert_not_called()
+
+    cache.close()
+
+    for session in (current, other):
+        session.token_manager.close.assert_called_once_with()
+        session.close.assert_called_once_with()
+
+
+def test_dispatch_forwards_to_daemon(server, socket_path, monkeypatch, capsys):
+    monkeypatch.setenv("BITBUCKET_DAEMON_SOCKET", socket_path)
+
+    with pytest.raises(SystemExit) as exit_info:
+        daemon.dispatch(["--name", "world"])
+
+    assert exit_info.value.code == 0
+    assert capsys.readouterr().out.startswith("hello world from ")
+
+
+def test_dispatch_reads_daemon_settings_from_dotenv(
+    server, socket_path, monkeypatch, capsys
+):
+    monkeypatch.delenv("BITBUCKET_DAEMON_SOCKET", raising=False)
+    monkeypatch.setattr(
+        "dotenv.load_dotenv",
+        lambda: monkeypatch.setenv("BITBUCKET_DAEMON_SOCKET", socket_path),
+    )
+
+    with pytest.raises(SystemExit):
+        daemon.dispatch(["--name", "world"])
+
+    assert server.commands == 1
+    assert capsys.readouterr().out.startswith("hello world from ")
+
+
+def test_help_does_not_load_dotenv(monkeypatch):
+    loaded = []
+    monkeypatch.setattr("dotenv.load_dotenv", lambda: loaded.append(True))
+
+    daemon.load_environment(["create-project", "--help"])
+    daemon.load_environment([])
+    daemon.load_environment(["create-project"])
+
+    assert loaded == [True]
+
+
+def test_dispatch_hands_read_stdin_to_the_fallback(
+    server, socket_path, monkeypatch, capsys
+):
+    monkeypatch.setenv("BITBUCKET_DAEMON_SOCKET", socket_path)
+    monkeypatch.setenv("BITBUCKET_API_URL", "http://localhost:1")
+    monkeypatch.setattr(sys, "stdin", io.StringIO("--help\n"))
+
+    with pytest.raises(SystemExit):
+        daemon.dispatch(["batch"])
+
+    assert "Batch finished 1 commands" in capsys.readouterr().err
+    assert server.commands == 0
+
+
+def run_script(args, socket_path, **kwargs):
+    environment = dict(os.environ, BITBUCKET_DAEMON_SOCKET=socket_path)
+    return subprocess.run(
+        [sys.executable, os.path.join(ROOT, "bitbucket-cli"), *args],
+        cwd=ROOT,
+        env=environment,
+        capture_output=True,
+        text=True,
+        timeout=30,
+        check=False,
+        **kwargs,
+    )
+
+
+def test_script_pipes_stdin_in_process_without_daemon(socket_path):
+    result = run_script(["batch"], socket_path, input="--help\n--help\n")
+
+    assert "Batch finished 2 commands" in result.stderr
+
+
+def test_script_does_not_wait_for_unused_stdin(socket_path):
+    with subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(60)"], stdout=subprocess.PIPE
+    ) as writer:
+        try:
+            result = run_script(["--help"], socket_path, stdin=writer.stdout)
+        finally:
+            writer.kill()
+
+    assert result.returncode == 0
+    assert "Usage:" in result.stdout
+
+
+def test_dispatch_can_be_disabled(server, socket_path, monkeypatch, capsys):
+    monkeypatch.setenv("BITBUCKET_DAEMON_SOCKET", socket_path)
+    monkeypatch.setenv("BITBUCKET_DAEMON", "0")
+
+    with pytest.raises(SystemExit):
+        daemon.dispatch(["--help"])
+
+    assert server.commands == 0
@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+import pytest
+from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.daemon import SessionCache
+
+
+@pytest.fixture
+def socket_path():
+    directory = tempfile.mkdtemp(prefix="bb-", dir="/tmp")
+    yield os.path.join(directory, "daemon.sock")
+    os.rmdir(directory)
+
+
+def test_daemon_status_when_not_running(runner, socket_path):
+    result = runner.invoke(cli.daemon, ["status", "--socket", socket_path])
+
+    assert result.exit_code == 0
+    assert result.output == "The daemon is not running.\n"
+
+
+def test_daemon_stop_when_not_running(runner, socket_path):
+    result = runner.invoke(cli.daemon, ["stop", "--socket", socket_path])
+
+    assert result.exit_code == 0
+    assert result.output == "Error: The daemon is not running.\n"
+
+
+def test_prepare_oauth_client_uses_session_cache(monkeypatch):
+    session = object()
+    monkeypatch.setattr(
+        cli, "session_cache", SessionCache(lambda pool_size: session, bool)
+    )
+    monkeypatch.setattr(
+        cli, "create_oauth_client", lambda pool_size=None: pytest.fail("not cached")
+    )
+
+    assert cli.prepare_oauth_client() is session
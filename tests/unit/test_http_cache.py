@@ -0,0 +1,146 @@
+from unittest.mock import MagicMock
+
+import requests
+from benchmarks.fake_bitbucket import FakeBitbucketServer
+from bitbucketcli.bitbucket.bitbucket import BitbucketClient
+from bitbucketcli.bitbucket.branch import BranchCommand
+from bitbucketcli.bitbucket.http_cache import HttpCache
+
+
+def response(status_code=200, content=b'{"name": "value"}', **headers):
+    result = requests.Response()
+    result.status_code = status_code
+    result.url = "https://api/2.0/resource"
+    result.headers.update(headers)
+    result._content = content
+    return result
+
+
+def test_key_includes_sorted_params():
+    assert HttpCache.key("https://api/path") == "https://api/path"
+    assert (
+        HttpCache.key("https://api/path", {"pagelen": 10, "page": 2})
+        == "https://api/path?page=2&pagelen=10"
+    )
+
+
+def test_validators_come_from_the_stored_response():
+    cache = HttpCache()
+    cache.update("key", response(ETag='"abc"', **{"Last-Modified": "Mon, 01 Jan 2024"}))
+
+    assert cache.validators("key") == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Mon, 01 Jan 2024",
+    }
+    assert cache.validators("other") == {}
+
+
+def test_not_modified_is_served_from_the_cache():
+    cache = HttpCache()
+    cache.update("key", response(ETag='"abc"', **{"Content-Type": "application/json"}))
+
+    served = cache.update("key", response(304, b""))
+
+    assert served.status_code == 200
+    assert served.json() == {"name": "value"}
+    assert served.headers["Content-Type"] == "application/json"
+    assert served.from_cache is True
+    assert cache.stats() == {"entries": 1, "bytes": 17, "revalidated": 1, "stored": 1}
+
+
+def test_responses_without_validators_are_not_stored():
+    cache = HttpCache()
+    mock = MagicMock(status_code=200)
+
+    assert cache.update("key", response()) is not None
+    assert cache.update("mock", mock) is mock
+    assert cache.update("error", response(500, ETag='"abc"')).status_code == 500
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = HttpCache(max_bytes=25)
+    cache.update("first", response(content=b"a" * 10, ETag='"1"'))
+    cache.update("second", response(content=b"b" * 10, ETag='"2"'))
+    cache.update("first", response(304, b""))
+    cache.update("third", response(content=b"c" * 10, ETag='"3"'))
+    cache.update("huge", response(content=b"d" * 26, ETag='"4"'))
+
+    assert cache.validators("second") == {}
+    assert cache.validators("first") == {"If-None-Match": '"1"'}
+    assert cache.stats()["bytes"] == 20
+
+
+def test_cache_persists_on_disk(tmp_path):
+    HttpCache(path=tmp_path).update("key", response(ETag='"abc"'))
+    HttpCache(max_bytes=10, path=tmp_path / "small").update(
+        "key", response(ETag='"abc"')
+    )
+
+    cache = HttpCache(path=tmp_path)
+
+    assert cache.validators("key") == {"If-None-Match": '"abc"'}
+    assert cache.update("key", response(304, b"")).content == b'{"name": "value"}'
+    assert list((tmp_path / "small").glob("*")) == []
+
+
+def test_cache_files_are_private(tmp_path):
+    path = tmp_path / "cache"
+    HttpCache(path=path).update("key", response(ETag='"abc"'))
+
+    assert path.stat().st_mode & 0o777 == 0o700
+    assert [file.stat().st_mode & 0o777 for file in path.glob("*.json")] == [0o600]
+
+
+def test_cache_files_without_key_are_ignored(tmp_path):
+    (tmp_path / "broken.json").write_text(
+        '{"url": "u", "etag": "e", "last_modified": null, "headers": {}, "content": ""}'
+    )
+    HttpCache(path=tmp_path).update("key", response(ETag='"abc"'))
+
+    cache = HttpCache(path=tmp_path)
+
+    assert cache.stats()["entries"] == 1
+
+
+def test_client_sends_validators_on_repeated_gets():
+    session_mock = MagicMock()
+    session_mock.get.side_effect = [
+        response(ETag='"abc"'),
+        response(304, b""),
+    ]
+    client = BitbucketClient(session_mock, http_cache=HttpCache())
+
+    first = client.get("2.0/resource", params={"q": "x"})
+    second = client.get("2.0/resource", params={"q": "x"})
+
+    assert first.json() == second.json() == {"name": "value"}
+    assert "If-None-Match" not in session_mock.get.call_args_list[0].kwargs["headers"]
+    assert session_mock.get.call_args_list[1].kwargs["headers"] == {
+        "Accept": "application/json",
+        "If-None-Match": '"abc"',
+    }
+    assert client.http_cache_stats()["revalidated"] == 1
+
+
+def test_repeated_reads_are_revalidated_against_fake_server(monkeypatch):
+    server = FakeBitbucketServer().start()
+    monkeypatch.setenv("BITBUCKET_API_URL", server.url)
+    try:
+        server.state.seed("workspace1", repositories=1)
+        with requests.Session() as session:
+            commands = [
+                BranchCommand("workspace1", "repository0", session) for _ in range(3)
+            ]
+            for command in commands:
+                command.bypass_push_with_pull_request()
+    finally:
+        server.stop()
+
+    assert server.requests["GET"] == 6
+    assert commands[0].http_cache_stats() == {
+        "entries": 2,
+        "bytes": commands[0].http_cache_stats()["bytes"],
+        "revalidated": 4,
+        "stored": 2,
+    }
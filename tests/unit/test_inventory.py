@@ -0,0 +1,258 @@
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from benchmarks.fake_bitbucket import FakeBitbucketServer
+from bitbucketcli.bitbucket.branch import BranchCommand
+from bitbucketcli.bitbucket.inventory import (
+    Inventory,
+    InventorySyncCommand,
+    StaleInventoryException,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def repository(slug, project_key="PROJ", main_branch="master"):
+    return {
+        "slug": slug,
+        "project": {"key": project_key},
+        "mainbranch": {"name": main_branch},
+        "is_private": True,
+        "updated_on": "2024-01-01T00:00:00+00:00",
+    }
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    clock = FakeClock()
+    inventory = Inventory(tmp_path / "inventory.sqlite3", clock=clock)
+    inventory.clock = clock
+    yield inventory
+    inventory.close()
+
+
+def test_inventory_uses_wal_mode(tmp_path, inventory):
+    connection = sqlite3.connect(tmp_path / "inventory.sqlite3")
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    connection.close()
+
+
+def test_inventory_replaces_workspace_rows(inventory):
+    inventory.replace(
+        "workspace1",
+        [{"key": "PROJ", "name": "Project", "is_private": True}],
+        [repository("repository1"), repository("repository2", "OTHER", "main")],
+        [("repository1", {"id": 1, "kind": "push", "pattern": "master"})],
+        [
+            {
+                "permission": "write",
+                "user": {"uuid": "{user}", "account_id": "account1"},
+                "repository": {"full_name": "workspace1/repository2"},
+            }
+        ],
+    )
+    inventory.replace("workspace2", [], [repository("repository1")], [], [])
+    inventory.replace(
+        "workspace1", [], [repository("repository2", "OTHER", "main")], [], []
+    )
+
+    assert inventory.main_branch("workspace1", "repository2", max_age=10) == "main"
+    assert inventory.main_branch("workspace1", "repository1", max_age=10) is None
+    assert [r["slug"] for r in inventory.repositories("workspace1", "OTHER")] == [
+        "repository2"
+    ]
+    assert inventory.restrictions("workspace1") == []
+    assert inventory.permissions("workspace1") == []
+    assert [r["slug"] for r in inventory.repositories("workspace2")] == ["repository1"]
+
+
+def test_inventory_queries_by_index(inventory):
+    inventory.replace(
+        "workspace1",
+        [],
+        [repository("repository1"), repository("repository2")],
+        [
+            ("repository1", {"id": 1, "kind": "push", "pattern": "master"}),
+            ("repository2", {"id": 2, "kind": "force", "pattern": "release/*"}),
+        ],
+        [
+            {
+                "permission": "admin",
+                "user": {"uuid": "{user}", "account_id": "account1"},
+                "repository": {"full_name": "workspace1/repository2"},
+            }
+        ],
+    )
+
+    assert [
+        r["id"] for r in inventory.restrictions("workspace1", pattern="release/*")
+    ] == [2]
+    assert inventory.permissions("workspace1", account_id="account1") == [
+        {
+            "workspace": "workspace1",
+            "repository": "repository2",
+            "user_uuid": "{user}",
+            "account_id": "account1",
+            "permission": "admin",
+        }
+    ]
+
+
+def test_inventory_enforces_freshness(inventory):
+    with pytest.raises(StaleInventoryException, match="never synced"):
+        inventory.repositories("workspace1", max_age=60)
+
+    inventory.replace("workspace1", [], [repository("repository1")], [], [])
+    inventory.clock.now += 61
+
+    assert inventory.repositories("workspace1")[0]["slug"] == "repository1"
+    with pytest.raises(StaleInventoryException, match="older than allowed"):
+        inventory.main_branch("workspace1", "repository1", max_age=60)
+
+
+def test_branch_command_reads_main_branch_from_inventory(inventory):
+    inventory.replace(
+        "workspace1", [], [repository("repository1", main_branch="main")], [], []
+    )
+    session_mock = MagicMock()
+    session_mock.get.return_value.json.return_value = {"values": []}
+
+    BranchCommand(
+        "workspace1", "repository1", session_mock, inventory, max_age=60
+    ).bypass_push_with_pull_request()
+
+    assert session_mock.get.call_count == 1
+    assert session_mock.get.call_args.kwargs["params"]["pattern"] == "main"
+
+
+def test_branch_command_ignores_stale_inventory(inventory):
+    inventory.replace(
+        "workspace1", [], [repository("repository1", main_branch="main")], [], []
+    )
+    inventory.clock.now += 120
+    session_mock = MagicMock()
+    session_mock.get.return_value.json.return_value = {
+        "mainbranch": {"name": "develop"},
+        "values": [],
+    }
+
+    BranchCommand(
+        "workspace1", "repository1", session_mock, inventory, max_age=60
+    ).bypass_push_with_pull_request()
+
+    assert session_mock.get.call_count == 2
+    assert session_mock.get.call_args.kwargs["params"]["pattern"] == "develop"
+
+
+def test_sync_inventory_against_fake_server(monkeypatch, inventory):
+    server = FakeBitbucketServer().start()
+    monkeypatch.setenv("BITBUCKET_API_URL", server.url)
+    try:
+        server.state.seed("workspace1", repositories=120, restrictions=["push"])
+        server.state.projects["workspace1"] = {"PROJ": {"key": "PROJ", "name": "P"}}
+        server.state.grant("workspace1", "repository7", "account1", "admin")
+        with requests.Session() as session:
+            counts = InventorySyncCommand("workspace1", session, inventory, 4).run()
+    finally:
+        server.stop()
+
+    assert counts == {
+        "projects": 1,
+        "repositories": 120,
+        "restrictions": 120,
+        "permissions": 1,
+    }
+    assert inventory.main_branch("workspace1", "repository42", max_age=60) == "master"
+    assert (
+        inventory.permissions("workspace1", account_id="account1")[0]["repository"]
+        == "repository7"
+    )
+    assert len(inventory.restrictions("workspace1", pattern="master")) == 120
+
+
+def test_inventory_tracks_high_water_mark(inventory):
+    first = repository("repository1")
+    second = {**repository("repository2"), "updated_on": "2024-03-01T00:00:00+00:00"}
+    inventory.replace("workspace1", [], [first, second], [], [])
+
+    assert inventory.high_water_mark("workspace1") == "2024-03-01T00:00:00+00:00"
+
+    removed = inventory.update(
+        "workspace1",
+        [],
+        [
+            {
+                **repository("repository1", main_branch="main"),
+                "updated_on": "2024-02-01T00:00:00+00:00",
+            }
+        ],
+        [("repository1", {"id": 9, "kind": "push", "pattern": "main"})],
+        [],
+        {"repository1"},
+    )
+
+    assert removed == 1
+    assert inventory.high_water_mark("workspace1") == "2024-03-01T00:00:00+00:00"
+    assert inventory.main_branch("workspace1", "repository1", max_age=None) == "main"
+    assert [r["slug"] for r in inventory.repositories("workspace1")] == ["repository1"]
+    assert [r["id"] for r in inventory.restrictions("workspace1")] == [9]
+
+
+def test_incremental_update_keeps_full_sync_time_of_restrictions(inventory):
+    inventory.replace("workspace1", [], [repository("repository1")], [], [])
+    inventory.clock.now += 100
+    inventory.update("workspace1", [], [], [], [], {"repository1"})
+
+    assert inventory.synced_at("workspace1") == 1100.0
+    assert inventory.synced_at("workspace1", "repositories") == 1100.0
+    assert inventory.synced_at("workspace1", "restrictions") == 1000.0
+    assert inventory.synced_at("workspace1", "permissions") == 1000.0
+    assert inventory.repositories("workspace1", max_age=60)
+    with pytest.raises(StaleInventoryException, match="restrictions inventory"):
+        inventory.restrictions("workspace1", max_age=60)
+
+
+def test_incremental_sync_against_fake_server(monkeypatch, inventory):
+    server = FakeBitbucketServer().start()
+    monkeypatch.setenv("BITBUCKET_API_URL", server.url)
+    state = server.state
+    try:
+        state.seed("workspace1", repositories=150, restrictions=["push"])
+        for index in range(150):
+            state.touch("workspace1", f"repository{index}", "2024-01-01T00:00:00+00:00")
+        with requests.Session() as session:
+            command = InventorySyncCommand("workspace1", session, inventory, 4)
+            command.run()
+            state.repositories["workspace1"].pop("repository3")
+            for slug in ("repository5", "repository6"):
+                state.touch("workspace1", slug, "2024-02-01T00:00:00+00:00")
+            state.add_restriction("workspace1", "repository5", "force", "master")
+            state.grant("workspace1", "repository6", "account1", "admin")
+            server.requests.clear()
+            counts = command.run()
+    finally:
+        server.stop()
+
+    assert counts == {
+        "projects": 0,
+        "repositories": 2,
+        "restrictions": 3,
+        "permissions": 1,
+        "removed": 1,
+    }
+    assert server.requests["GET"] == 1 + 2 + 1 + 2 + 2
+    assert inventory.high_water_mark("workspace1") == "2024-02-01T00:00:00+00:00"
+    assert len(inventory.repositories("workspace1")) == 149
+    assert len(inventory.restrictions("workspace1", repository="repository5")) == 2
+    assert (
+        inventory.permissions("workspace1", account_id="account1")[0]["repository"]
+        == "repository6"
+    )
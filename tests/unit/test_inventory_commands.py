@@ -0,0 +1,132 @@
+import json
+
+import pytest
+from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.inventory import Inventory
+
+
+@pytest.fixture
+def inventory_path(tmp_path, monkeypatch):
+    path = tmp_path / "inventory.sqlite3"
+    monkeypatch.setenv("BITBUCKET_INVENTORY_PATH", str(path))
+    return path
+
+
+def test_sync_inventory(runner, mock_client, inventory_path):
+    mock = mock_client.patch(
+        "bitbucketcli.bitbucket.inventory.InventorySyncCommand.run",
+        return_value={
+            "projects": 1,
+            "repositories": 2,
+            "restrictions": 3,
+            "permissions": 4,
+        },
+    )
+
+    result = runner.invoke(cli.sync_inventory, ["--workspace", "workspace1"])
+
+    mock.assert_called_once_with(False)
+    assert result.exit_code == 0
+    assert result.output == (
+        "Inventory of workspace1 synced with 1 projects, 2 repositories, 3 restrictions, 4 permissions\n"
+    )
+
+
+def test_sync_inventory_full(runner, mock_client, inventory_path):
+    mock = mock_client.patch(
+        "bitbucketcli.bitbucket.inventory.InventorySyncCommand.run",
+        return_value={"projects": 0, "repositories": 0, "removed": 2},
+    )
+
+    result = runner.invoke(cli.sync_inventory, ["--workspace", "workspace1", "--full"])
+
+    mock.assert_called_once_with(True)
+    assert result.output == (
+        "Inventory of workspace1 synced with 0 projects, 0 repositories, 2 removed\n"
+    )
+
+
+def test_query_inventory(runner, inventory_path):
+    inventory = Inventory(inventory_path)
+    inventory.replace(
+        "workspace1",
+        [],
+        [
+            {
+                "slug": "repository1",
+                "project": {"key": "PROJ"},
+                "mainbranch": {"name": "main"},
+            },
+            {"slug": "repository2", "project": {"key": "OTHER"}},
+        ],
+        [],
+        [],
+    )
+    inventory.close()
+
+    result = runner.invoke(
+        cli.query_inventory,
+        [
+            "--workspace",
+            "workspace1",
+            "repositories",
+            "--project-key",
+            "PROJ",
+            "--max-age",
+            "60",
+        ],
+    )
+
+    assert result.exit_code == 0
+    assert [json.loads(line)["slug"] for line in result.output.splitlines()] == [
+        "repository1"
+    ]
+
+
+def test_query_inventory_never_synced(runner, inventory_path):
+    result = runner.invoke(
+        cli.query_inventory,
+        ["--workspace", "workspace1", "projects", "--max-age", "60"],
+    )
+
+    assert result.exit_code == 0
+    assert result.output == (
+        "Error: The projects inventory of workspace1 was never synced, run sync-inventory first.\n"
+    )
+
+
+def test_query_inventory_asks_for_a_full_sync_of_restrictions(runner, inventory_path):
+    inventory = Inventory()
+    inventory.update("workspace1", [], [], [], [], set())
+    inventory.close()
+
+    result = runner.invoke(
+        cli.query_inventory,
+        ["--workspace", "workspace1", "restrictions", "--max-age", "60"],
+    )
+
+    assert result.output == (
+        "Error: The restrictions inventory of workspace1 was never synced, run sync-inventory --full first.\n"
+    )
+
+
+def test_enable_bypass_reads_inventory(runner, mock_client, inventory_path):
+    mock = mock_client.patch("bitbucketcli.bitbucket.branch.BranchCommand")
+    mock.return_value.bypass_push_with_pull_request.return_value = True
+
+    result = runner.invoke(
+        cli.enable_bypass_branch_pull_request,
+        [
+            "--workspace",
+            "workspace1",
+            "--repository",
+            "repository1",
+            "--inventory-max-age",
+            "300",
+        ],
+    )
+
+    assert result.exit_code == 0
+    args = mock.call_args.args
+    assert isinstance(args[3], Inventory)
+    assert args[4] == 300
@@ -0,0 +1,86 @@
+import json
+
+from bitbucketcli.bitbucket.journal import Journal, completed_operations
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def entries(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_journal_appends_planned_and_finished_operations(tmp_path):
+    path = tmp_path / "run.journal"
+
+    with Journal(path) as journal:
+        journal.plan(["op1", "op2"])
+        journal.record("op1", True, 200)
+        journal.record("op2", False, None, "Connection refused")
+
+    assert [
+        {key: value for key, value in entry.items() if key != "at"}
+        for entry in entries(path)
+    ] == [
+        {"id": "op1", "state": "planned"},
+        {"id": "op2", "state": "planned"},
+        {"id": "op1", "state": "completed", "status": 200},
+        {"id": "op2", "state": "failed", "error": "Connection refused"},
+    ]
+
+
+def test_resume_skips_only_completed_operations(tmp_path):
+    path = tmp_path / "run.journal"
+    with Journal(path) as journal:
+        journal.plan(["op1", "op2", "op3"])
+        journal.record("op1", True, 200)
+        journal.record("op2", False, 500)
+        journal.record("op2", True, 200)
+        journal.record("op3", False, 500)
+    with open(path, "a", encoding="utf-8") as journal_file:
+        journal_file.write('{"id": "op4", "sta')
+
+    with Journal(path, resume=True) as journal:
+        pending = list(journal.pending(["op1", "op2", "op3", "op4"], str))
+        skipped = journal.skipped
+
+    assert pending == ["op3", "op4"]
+    assert skipped == 2
+    assert completed_operations(path) == {"op1", "op2"}
+
+
+def test_journal_without_resume_runs_everything(tmp_path):
+    path = tmp_path / "run.journal"
+    with Journal(path) as journal:
+        journal.record("op1", True, 200)
+
+    with Journal(path) as journal:
+        assert list(journal.pending(["op1"], str)) == ["op1"]
+
+    assert completed_operations(tmp_path / "missing.journal") == set()
+
+
+def test_journal_batches_fsync(tmp_path):
+    clock = FakeClock()
+    journal = Journal(
+        tmp_path / "run.journal", sync_every=3, sync_interval=10, clock=clock
+    )
+
+    journal.plan([f"op{i}" for i in range(5)])
+    for i in range(5):
+        journal.record(f"op{i}", True, 200)
+    syncs_by_count = journal.syncs
+    clock.now += 10
+    journal.record("op5", True, 200)
+    syncs_by_time = journal.syncs
+    journal.close()
+
+    assert syncs_by_count == 2
+    assert syncs_by_time == 3
+    assert journal.syncs == 3
+    assert len(entries(tmp_path / "run.journal")) == 11
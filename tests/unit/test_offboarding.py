@@ -0,0 +1,112 @@
+from unittest.mock import MagicMock
+from urllib.parse import quote
+
+import pytest
+import requests
+from benchmarks.fake_bitbucket import FakeBitbucketServer
+from bitbucketcli.bitbucket.bitbucket import BitbucketApiException
+from bitbucketcli.bitbucket.offboarding import OffboardCommand, OffboardResult
+
+
+def response(payload, status_code=200):
+    mock = MagicMock(ok=status_code < 400, status_code=status_code)
+    mock.json.return_value = payload
+    return mock
+
+
+def test_offboard_removes_user_from_repositories_and_member_groups():
+    session_mock = MagicMock()
+    session_mock.get.side_effect = [
+        response({"uuid": "{user-uuid}"}),
+        response(
+            [
+                {"slug": "developers", "members": [{"uuid": "{user-uuid}"}]},
+                {"slug": "admins", "members": [{"uuid": "{other-uuid}"}]},
+            ]
+        ),
+        response({"values": [{"slug": "repository1"}, {"slug": "repository2"}]}),
+    ]
+
+    def delete(url, data, params, headers):
+        return MagicMock(status_code=403 if "repository2" in url else 204)
+
+    session_mock.delete.side_effect = delete
+
+    results = list(OffboardCommand("workspace1", session_mock).run("account1"))
+
+    assert sorted(results) == [
+        OffboardResult("group", "developers", 204, None),
+        OffboardResult("repository", "repository1", 204, None),
+        OffboardResult("repository", "repository2", 403, None),
+    ]
+    urls = [call.kwargs["url"] for call in session_mock.delete.call_args_list]
+    uuid = quote("{user-uuid}")
+    assert any(
+        url.endswith(f"/1.0/groups/workspace1/developers/members/{uuid}")
+        for url in urls
+    )
+    assert any(
+        url.endswith(f"/privileges/workspace1/repository1/{uuid}") for url in urls
+    )
+
+
+def test_offboard_fails_when_groups_cannot_be_listed():
+    session_mock = MagicMock()
+    session_mock.get.side_effect = [
+        response({"uuid": "{user-uuid}"}),
+        response(None, 403),
+    ]
+
+    with pytest.raises(BitbucketApiException):
+        list(OffboardCommand("workspace1", session_mock).run("account1"))
+    session_mock.delete.assert_not_called()
+
+
+def test_offboard_reports_removals_before_a_listing_error():
+    session_mock = MagicMock()
+    session_mock.get.side_effect = [
+        response({"uuid": "{user-uuid}"}),
+        response([{"slug": "developers", "members": [{"uuid": "{user-uuid}"}]}]),
+        response({"values": [{"slug": "repository1"}], "next": "page2"}),
+        response(None, 403),
+    ]
+    session_mock.delete.return_value = MagicMock(status_code=204)
+
+    results = []
+    with pytest.raises(BitbucketApiException):
+        for result in OffboardCommand("workspace1", session_mock).run("account1"):
+            results.append(result)
+
+    assert sorted(results) == [
+        OffboardResult("group", "developers", 204, None),
+        OffboardResult("repository", "repository1", 204, None),
+    ]
+
+
+def test_offboard_against_fake_server(monkeypatch):
+    server = FakeBitbucketServer().start()
+    monkeypatch.setenv("BITBUCKET_API_URL", server.url)
+    monkeypatch.setenv("BITBUCKET_INTERNAL_API_URL", server.url)
+    try:
+        server.state.seed(
+            "workspace1",
+            repositories=250,
+            groups=["developers", "admins"],
+            users=["account1"],
+        )
+        server.state.groups["workspace1"]["outsiders"] = set()
+        with requests.Session() as session:
+            results = list(
+                OffboardCommand("workspace1", session, workers=8).run("account1")
+            )
+    finally:
+        server.stop()
+
+    assert len(results) == 252
+    assert {result.status_code for result in results} == {204}
+    assert sorted(r.target for r in results if r.target_type == "group") == [
+        "admins",
+        "developers",
+    ]
+    assert server.requests["GET"] == 1 + 1 + 3
+    assert not any(server.state.groups["workspace1"].values())
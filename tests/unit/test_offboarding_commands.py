@@ -0,0 +1,77 @@
+from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.bitbucket import BitbucketApiException
+from bitbucketcli.bitbucket.offboarding import OffboardResult
+
+
+def test_offboard_user_reports_each_target(runner, mock_client):
+    mock = mock_client.patch(
+        "bitbucketcli.bitbucket.offboarding.OffboardCommand.run",
+        return_value=iter(
+            [
+                OffboardResult("group", "developers", 204, None),
+                OffboardResult("repository", "repository1", 404, None),
+                OffboardResult("repository", "repository2", 500, None),
+                OffboardResult("repository", "repository3", None, "reset"),
+            ]
+        ),
+    )
+
+    result = runner.invoke(
+        cli.offboard_user,
+        ["--workspace", "workspace1", "--account-id", "account1", "--workers", "4"],
+    )
+
+    mock.assert_called_once_with("account1")
+    cli.prepare_oauth_client.assert_called_once_with(pool_size=4)
+    assert result.exit_code == 0
+    assert result.output == (
+        "Removed from group developers\n"
+        "No access to repository repository1\n"
+        "Failed to remove from repository repository2 (status 500)\n"
+        "Failed to remove from repository repository3: reset\n"
+        "User with account id account1 removed from 1 targets.\n"
+        "Error: 2 removals failed.\n"
+    )
+
+
+def test_offboard_user_with_unknown_account(runner, mock_client):
+    mock_client.patch(
+        "bitbucketcli.bitbucket.offboarding.OffboardCommand.run",
+        side_effect=BitbucketApiException("not found", 404),
+    )
+
+    result = runner.invoke(
+        cli.offboard_user, ["--workspace", "workspace1", "--account-id", "account1"]
+    )
+
+    assert result.exit_code == 0
+    assert result.output == (
+        "Error: Failed to offboard user with account id account1: 404 - Request failed from Bitbucket Api\n"
+    )
+
+
+def test_offboard_user_prints_throttle_stats(runner, mock_client):
+    mock_client.patch(
+        "bitbucketcli.bitbucket.offboarding.OffboardCommand.run", return_value=iter([])
+    )
+    mock_client.patch(
+        "bitbucketcli.bitbucket.offboarding.OffboardCommand.throttle_stats",
+        return_value={
+            "api.bitbucket.org": {
+                "throttled_seconds": 2.25,
+                "retries": 3,
+                "concurrency_limit": 8,
+            },
+            "bitbucket.org": {"throttled_seconds": 0, "retries": 0},
+        },
+    )
+
+    result = runner.invoke(
+        cli.offboard_user, ["--workspace", "workspace1", "--account-id", "account1"]
+    )
+
+    assert result.exit_code == 0
+    assert result.stderr == (
+        "api.bitbucket.org: throttled for 2.2s, 3 retries, concurrency limit 8\n"
+        "bitbucket.org: throttled for 0.0s, 0 retries\n"
+    )
@@ -0,0 +1,111 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+from benchmarks.fake_bitbucket import select_fields
+from bitbucketcli.bitbucket.bitbucket import BitbucketClient
+from bitbucketcli.bitbucket.query import Query
+
+
+def test_query_composes_params():
+    query = (
+        Query()
+        .fields("values.slug", "values.mainbranch.name")
+        .where("project.key", "=", "PROJ")
+        .where("updated_on", ">", datetime(2024, 1, 2, tzinfo=timezone.utc))
+        .sort("updated_on", descending=True)
+        .pagelen(50)
+        .param("role", "member")
+    )
+
+    assert query.params() == {
+        "role": "member",
+        "fields": "values.slug,values.mainbranch.name",
+        "q": 'project.key = "PROJ" AND updated_on > 2024-01-02T00:00:00+00:00',
+        "sort": "-updated_on",
+        "pagelen": 50,
+    }
+
+
+def test_query_keeps_pagination_fields_for_listings():
+    query = Query().fields("values.slug")
+
+    assert query.params(paginated=True) == {
+        "fields": "next,page,pagelen,size,values.slug"
+    }
+    assert Query().fields("-values.links").params(paginated=True) == {
+        "fields": "-values.links"
+    }
+
+
+def test_query_is_immutable():
+    base = Query().fields("values.slug")
+    filtered = base.where("is_private", "=", True)
+
+    assert base.params() == {"fields": "values.slug"}
+    assert filtered.params()["q"] == "is_private = true"
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ('say "hi"', 'name = "say \\"hi\\""'),
+        ("back\\slash", 'name = "back\\\\slash"'),
+        (None, "name = null"),
+        (3, "name = 3"),
+    ],
+)
+def test_query_escapes_values(value, expected):
+    assert Query().where("name", "=", value).params()["q"] == expected
+
+
+@pytest.mark.parametrize(
+    "build",
+    [
+        lambda: Query().fields("values.slug,values.name"),
+        lambda: Query().where("name) OR (1", "=", "x"),
+        lambda: Query().where("name", "==", "x"),
+        lambda: Query().sort("name desc"),
+        lambda: Query().pagelen(0),
+    ],
+)
+def test_query_rejects_unsafe_input(build):
+    with pytest.raises(ValueError):
+        build()
+
+
+def test_client_merges_query_into_params():
+    session_mock = MagicMock()
+    session_mock.get.return_value.json.return_value = {"values": [{"slug": "a"}]}
+    client = BitbucketClient(session_mock)
+
+    client.get("2.0/repositories/workspace1/a", query=Query().fields("slug"))
+    items = list(
+        client.paginate(
+            "2.0/repositories/workspace1",
+            params={"role": "member"},
+            pagelen=10,
+            query=Query().fields("values.slug"),
+        )
+    )
+
+    assert items == [{"slug": "a"}]
+    first, second = session_mock.get.call_args_list
+    assert first.kwargs["params"] == {"fields": "slug"}
+    assert second.kwargs["params"] == {
+        "role": "member",
+        "fields": "next,page,pagelen,size,values.slug",
+        "pagelen": 10,
+    }
+
+
+def test_fake_server_projects_fields():
+    payload = {
+        "size": 1,
+        "values": [{"slug": "a", "mainbranch": {"name": "main", "type": "branch"}}],
+    }
+
+    assert select_fields(payload, ["size", "values.mainbranch.name"]) == {
+        "size": 1,
+        "values": [{"mainbranch": {"name": "main"}}],
+    }
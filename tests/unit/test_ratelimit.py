@@ -0,0 +1,301 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+from benchmarks.fake_bitbucket import FakeBitbucketServer
+from bitbucketcli.bitbucket.bitbucket import BitbucketClient
+from bitbucketcli.bitbucket.ratelimit import (
+    AdaptiveLimiter,
+    RequestScheduler,
+    TokenBucket,
+    endpoint_template,
+    retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def response(status_code, headers=None):
+    return MagicMock(status_code=status_code, headers=headers or {})
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def scheduler(clock, **kwargs):
+    return RequestScheduler(sleep=clock.sleep, clock=clock, **kwargs)
+
+
+def test_token_bucket_spaces_requests_after_burst(clock):
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+    clock.now = 10
+    assert bucket.reserve() == 0
+
+
+def test_retry_after_header_is_honored(clock):
+    send = MagicMock(side_effect=[response(429, {"Retry-After": "7"}), response(201)])
+
+    result = scheduler(clock).execute("POST", "https://api.bitbucket.org/2.0", send)
+
+    assert result.status_code == 201
+    assert send.call_count == 2
+    assert clock.sleeps == [7]
+
+
+def test_throttled_time_is_reported_per_host(clock):
+    request_scheduler = scheduler(clock)
+    send = MagicMock(side_effect=[response(429, {"Retry-After": "3"}), response(200)])
+    request_scheduler.execute("GET", "https://bitbucket.org/!api/internal", send)
+
+    assert request_scheduler.stats() == {
+        "bitbucket.org": {"throttled_seconds": 3, "retries": 1}
+    }
+
+
+def test_give_up_after_max_retries(clock):
+    send = MagicMock(return_value=response(429))
+    result = scheduler(clock, max_retries=2).execute(
+        "GET", "https://api.bitbucket.org/2.0", send
+    )
+    assert result.status_code == 429
+    assert send.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "method,calls",
+    [("GET", 2), ("DELETE", 2), ("POST", 1)],
+)
+def test_server_errors_are_retried_only_for_idempotent_methods(clock, method, calls):
+    send = MagicMock(side_effect=[response(503), response(200)])
+    result = scheduler(clock).execute(method, "https://api.bitbucket.org/2.0", send)
+    assert send.call_count == calls
+    assert result.status_code == (200 if calls == 2 else 503)
+
+
+def test_connection_errors_are_retried_with_jittered_backoff(clock):
+    send = MagicMock(
+        side_effect=[
+            requests.exceptions.ConnectionError(),
+            requests.exceptions.ConnectionError(),
+            response(200),
+        ]
+    )
+    result = scheduler(clock, backoff=1).execute(
+        "GET", "https://api.bitbucket.org/2.0", send
+    )
+    assert result.status_code == 200
+    assert 0.5 <= clock.sleeps[0] <= 1
+    assert 1 <= clock.sleeps[1] <= 2
+
+
+def test_connection_errors_are_raised_for_post(clock):
+    send = MagicMock(side_effect=requests.exceptions.ConnectionError())
+    with pytest.raises(requests.exceptions.ConnectionError):
+        scheduler(clock).execute("POST", "https://api.bitbucket.org/2.0", send)
+    assert send.call_count == 1
+
+
+def test_rate_limit_is_applied_per_host(clock):
+    request_scheduler = scheduler(clock, rate=1, burst=1)
+    send = MagicMock(return_value=response(200))
+    for _ in range(3):
+        request_scheduler.execute("GET", "https://api.bitbucket.org/2.0", send)
+    request_scheduler.execute("GET", "https://bitbucket.org/!api", send)
+    assert clock.sleeps == [1.0, 1.0]
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [("12", 12), ("-1", 0), ("soon", None), (None, None)],
+)
+def test_retry_after_parsing(value, expected):
+    headers = {"Retry-After": value} if value is not None else {}
+    assert retry_after(response(429, headers)) == expected
+
+
+def test_client_retries_throttled_requests(clock):
+    session_mock = MagicMock()
+    session_mock.post.side_effect = [
+        response(429, {"Retry-After": "1"}),
+        response(201),
+    ]
+    client = BitbucketClient(session_mock, scheduler=scheduler(clock))
+    assert client.post("2.0/workspaces/ws/projects", data="{}").status_code == 201
+    assert session_mock.post.call_count == 2
+    assert list(client.throttle_stats().values()) == [
+        {"throttled_seconds": 1, "retries": 1}
+    ]
+
+
+def test_adaptive_limiter_increases_additively(clock):
+    limiter = AdaptiveLimiter(limit=2, max_limit=4, clock=clock)
+
+    for _ in range(2):
+        limiter.release(limiter.acquire())
+    grown = limiter.limit
+    for _ in range(100):
+        limiter.release(limiter.acquire())
+
+    assert grown == pytest.approx(2 + 1 / 2 + 1 / 2.5)
+    assert limiter.limit == 4
+    assert limiter.stats() == {"concurrency_limit": 4, "in_flight": 0, "decreases": 0}
+
+
+def test_adaptive_limiter_decreases_once_per_window_when_throttled(clock):
+    limiter = AdaptiveLimiter(limit=16, clock=clock)
+    in_flight = [limiter.acquire() for _ in range(8)]
+    clock.now += 1
+
+    for started in in_flight:
+        limiter.release(started, throttled=True)
+    limiter.release(limiter.acquire(), throttled=True)
+
+    assert limiter.limit == 4
+    assert limiter.decreases == 2
+
+
+def release_after(limiter, clock, latency, endpoint=None):
+    started = limiter.acquire()
+    clock.now += latency
+    limiter.release(started, endpoint=endpoint)
+
+
+def test_adaptive_limiter_decreases_on_latency(clock):
+    limiter = AdaptiveLimiter(limit=8, min_samples=2, clock=clock)
+    for latency in (0.1, 0.1, 1.0, 1.0):
+        release_after(limiter, clock, latency)
+
+    assert limiter.stats()["concurrency_limit"] == 2
+    assert limiter.decreases == 2
+
+
+def test_adaptive_limiter_needs_samples_before_judging_latency(clock):
+    limiter = AdaptiveLimiter(limit=8, min_samples=5, clock=clock)
+    for latency in (0.1, 1.0, 1.0):
+        release_after(limiter, clock, latency)
+
+    assert limiter.decreases == 0
+
+
+def test_adaptive_limiter_keeps_a_baseline_per_endpoint(clock):
+    limiter = AdaptiveLimiter(limit=8, min_samples=2, clock=clock)
+    for _ in range(10):
+        release_after(limiter, clock, 0.01, "GET 2.0/user")
+        release_after(limiter, clock, 1.0, "POST 2.0/repositories/*/*")
+
+    assert limiter.decreases == 0
+    assert limiter.stats()["concurrency_limit"] > 8
+
+
+def test_endpoint_template_hides_names():
+    assert (
+        endpoint_template("GET", "https://api.bitbucket.org/2.0/repositories/ws/repo")
+        == endpoint_template("GET", "https://api.bitbucket.org/2.0/repositories/a/b")
+        == "GET 2.0/repositories/*/*"
+    )
+    assert endpoint_template("PUT", "https://api.bitbucket.org/1.0/groups/ws") == (
+        "PUT 1.0/groups/*"
+    )
+
+
+def test_adaptive_limiter_blocks_above_the_limit(clock):
+    limiter = AdaptiveLimiter(limit=1, max_limit=1, clock=clock)
+    started = limiter.acquire()
+    acquired = threading.Event()
+
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release(started)
+    thread.join(1)
+
+    assert acquired.is_set()
+
+
+def test_concurrency_limit_is_reported_per_host(clock):
+    request_scheduler = scheduler(clock, concurrency=4)
+    send = MagicMock(side_effect=[response(429, {"Retry-After": "1"}), response(200)])
+
+    request_scheduler.execute("GET", "https://api.bitbucket.org/2.0", send)
+    request_scheduler.execute(
+        "GET",
+        "https://bitbucket.org/!api/internal",
+        MagicMock(return_value=response(200)),
+    )
+
+    assert request_scheduler.stats() == {
+        "api.bitbucket.org": {
+            "throttled_seconds": 1,
+            "retries": 1,
+            "concurrency_limit": 2,
+        },
+        "bitbucket.org": {
+            "throttled_seconds": 0,
+            "retries": 0,
+            "concurrency_limit": 4,
+        },
+    }
+
+
+def test_connection_errors_lower_the_concurrency_limit(clock):
+    request_scheduler = scheduler(clock, concurrency=8, max_retries=0)
+    send = MagicMock(side_effect=requests.exceptions.ConnectionError())
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        request_scheduler.execute("POST", "https://api.bitbucket.org/2.0", send)
+
+    assert request_scheduler.stats()["api.bitbucket.org"]["concurrency_limit"] == 4
+
+
+def test_concurrency_is_configured_from_env(monkeypatch):
+    monkeypatch.setenv("BITBUCKET_CONCURRENCY", "0")
+    request_scheduler = RequestScheduler.from_env()
+    request_scheduler.execute(
+        "GET", "https://api.bitbucket.org/2.0", MagicMock(return_value=response(200))
+    )
+
+    assert request_scheduler.stats() == {}
+
+
+def test_concurrency_adapts_to_throttling_against_fake_server(monkeypatch):
+    server = FakeBitbucketServer(throttle_rate=0.3).start()
+    monkeypatch.setenv("BITBUCKET_API_URL", server.url)
+    request_scheduler = RequestScheduler(concurrency=16, backoff=0)
+    try:
+        with requests.Session() as session:
+            client = BitbucketClient(session, scheduler=request_scheduler)
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                statuses = list(
+                    executor.map(
+                        lambda i: client.post(
+                            "2.0/workspaces/workspace1/projects",
+                            data=json.dumps({"key": f"KEY{i}"}),
+                        ).status_code,
+                        range(64),
+                    )
+                )
+    finally:
+        server.stop()
+
+    stats = request_scheduler.stats()[urlsplit(server.url).netloc]
+    assert statuses.count(201) > 32
+    assert stats["retries"] > 0
+    assert stats["concurrency_limit"] < 16
@@ -4,7 +4,11 @@ from unittest.mock import ANY, MagicMock, call
 from urllib.parse import quote
 
 import pytest
-from bitbucketcli.bitbucket.repository import RepositoryCommand
+from bitbucketcli.bitbucket.repository import (
+    InvitationResult,
+    RepositoryCommand,
+    RestrictionResult,
+)
 
 
 @pytest.mark.parametrize(
@@ -83,8 +87,67 @@ def test_create_repository(
                 headers=headers,
                 params=None,
             ),
-        ]
+        ],
+        any_order=True,
+    )
+    assert mock_session.post.call_args_list[0] == call(
+        url=repository_create_url,
+        data=create_repository_payload,
+        headers=headers,
+        params=None,
+    )
+    assert sorted(
+        (result.kind, result.pattern) for result in repository.restriction_results
+    ) == [("delete", "master"), ("force", "master"), ("push", "master")]
+
+
+def test_create_repository_with_restriction_template():
+    session_mock = MagicMock()
+    created = MagicMock(status_code=200)
+    created.json.return_value = {"mainbranch": {"name": "main"}}
+    session_mock.post.side_effect = [
+        created,
+        MagicMock(status_code=201),
+        MagicMock(status_code=400),
+    ]
+    template = [
+        {"kind": "require_approvals_to_merge", "value": 2},
+        {"kind": "push", "pattern": "release/*", "groups": [{"slug": "admins"}]},
+    ]
+
+    repository = RepositoryCommand("workspace1", session_mock, template)
+    assert repository.create("repository1", "KEY") is True
+
+    restriction_payloads = sorted(
+        (
+            json.loads(kwargs["data"])
+            for _, kwargs in session_mock.post.call_args_list[1:]
+        ),
+        key=lambda payload: payload["kind"],
     )
+    assert restriction_payloads == [
+        {
+            "type": "branchrestriction",
+            "kind": "push",
+            "branch_match_kind": "glob",
+            "pattern": "release/*",
+            "users": [],
+            "groups": [{"slug": "admins"}],
+        },
+        {
+            "type": "branchrestriction",
+            "kind": "require_approvals_to_merge",
+            "branch_match_kind": "glob",
+            "pattern": "main",
+            "users": [],
+            "groups": [],
+            "value": 2,
+        },
+    ]
+    assert sorted(result.status_code for result in repository.restriction_results) == [
+        201,
+        400,
+    ]
 
 
 @pytest.mark.parametrize(
@@ -187,6 +250,73 @@ def test_fail_to_add_user(workspace, email, repository_name, permission, status_
     )
 
 
+@pytest.mark.parametrize(
+    "status_code,invited",
+    [(200, True), (403, False), (500, False)],
+)
+def test_add_users_to_repository_in_one_request(status_code, invited):
+    emails = ["user1@email.com", "user2@email.com", "user3@email.com"]
+    url = f"{internal_api_url()}/\u0021api/internal/invitations/repositories/workspace1/repository1"
+    session_mock = MagicMock()
+    session_mock.post.return_value.status_code = status_code
+    repository = RepositoryCommand("workspace1", session_mock)
+    result = repository.add_users_to_repository(emails, "repository1", "write")
+    assert result == {email: invited for email in emails}
+    session_mock.post.assert_called_once_with(
+        url=url,
+        data=json.dumps({"emails": emails, "permission": "write"}),
+        headers={"Accept": "application/json", "Content-Type": "application/json"},
+        params=ANY,
+    )
+
+
+def test_add_users_to_repository_reads_accepted_emails():
+    session_mock = MagicMock()
+    session_mock.post.return_value.status_code = 200
+    session_mock.post.return_value.json.return_value = {"emails": ["user1@email.com"]}
+    repository = RepositoryCommand("workspace1", session_mock)
+
+    result = repository.add_users_to_repository(
+        ["user1@email.com", "user2@email.com"], "repository1"
+    )
+
+    assert result == {"user1@email.com": True, "user2@email.com": False}
+
+
+def test_invitation_results_split_rejected_batches():
+    def post(url, data, **kwargs):
+        emails = json.loads(data)["emails"]
+        response = MagicMock(status_code=400 if "bad@email" in emails else 200)
+        response.json.side_effect = ValueError()
+        return response
+
+    session_mock = MagicMock()
+    session_mock.post.side_effect = post
+    repository = RepositoryCommand("workspace1", session_mock)
+
+    results = repository.invitation_results(
+        ["user1@email.com", "bad@email", "user2@email.com", "user3@email.com"],
+        "repository1",
+    )
+
+    assert results == {
+        "user1@email.com": InvitationResult(True, 200),
+        "bad@email": InvitationResult(False, 400),
+        "user2@email.com": InvitationResult(True, 200),
+        "user3@email.com": InvitationResult(True, 200),
+    }
+    assert [
+        json.loads(kwargs["data"])["emails"]
+        for _, kwargs in session_mock.post.call_args_list
+    ] == [
+        ["user1@email.com", "bad@email", "user2@email.com", "user3@email.com"],
+        ["user1@email.com", "bad@email"],
+        ["user1@email.com"],
+        ["bad@email"],
+        ["user2@email.com", "user3@email.com"],
+    ]
+
+
 @pytest.mark.parametrize(
     "workspace,account_id,repository_name,status_code",
     [
@@ -1,5 +1,8 @@
+import json
+
 import pytest
 from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.repository import RestrictionResult
 
 
 @pytest.mark.parametrize(
@@ -173,6 +176,79 @@ def test_fail_to_create_repository(
     assert result.output == f"Error: Repository failed to create.\n"
 
 
+def test_create_repository_with_restriction_template(runner, mock_client, tmp_path):
+    template = [{"kind": "push"}, {"kind": "require_approvals_to_merge", "value": 2}]
+    template_file = tmp_path / "restrictions.json"
+    template_file.write_text(json.dumps(template))
+    init = mock_client.patch(
+        "bitbucketcli.bitbucket.repository.RepositoryCommand.__init__",
+        return_value=None,
+    )
+
+    def create(self, name, project_key, is_private):
+        self.restriction_results = [
+            RestrictionResult("push", "master", 201),
+            RestrictionResult("require_approvals_to_merge", "master", 400),
+        ]
+        return True
+
+    mock_client.patch(
+        "bitbucketcli.bitbucket.repository.RepositoryCommand.create", create
+    )
+
+    result = runner.invoke(
+        cli.create_repository,
+        [
+            "--workspace",
+            "workspace1",
+            "--name",
+            "repository1",
+            "--project-key",
+            "KEY",
+            "--restrictions",
+            str(template_file),
+        ],
+    )
+
+    assert init.call_args.args[-1] == template
+    assert result.exit_code == 0
+    assert result.output == (
+        "Repository created with success. You can access here: https://bitbucket.org/workspace1/repository1/src\n"
+        "Error: Failed to apply require_approvals_to_merge restriction to branch master (status 400).\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    ["{not json", '{"kind": "push"}', '[{"pattern": "master"}]'],
+)
+def test_create_repository_with_invalid_restriction_template(
+    runner, mock_client, tmp_path, content
+):
+    template_file = tmp_path / "restrictions.json"
+    template_file.write_text(content)
+    mock = mock_client.patch(
+        "bitbucketcli.bitbucket.repository.RepositoryCommand.create"
+    )
+
+    result = runner.invoke(
+        cli.create_repository,
+        [
+            "--workspace",
+            "workspace1",
+            "--name",
+            "repository1",
+            "--project-key",
+            "KEY",
+            "--restrictions",
+            str(template_file),
+        ],
+    )
+
+    mock.assert_not_called()
+    assert result.exit_code == 2
+
+
 @pytest.mark.parametrize(
     "workspace,account_id,repository",
     [
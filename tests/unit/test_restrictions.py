@@ -0,0 +1,251 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from benchmarks.fake_bitbucket import FakeBitbucketServer
+from bitbucketcli.bitbucket.journal import Journal
+from bitbucketcli.bitbucket.restrictions import (
+    RestrictionSyncCommand,
+    SyncResult,
+    diff_restrictions,
+)
+
+
+def existing(restriction_id, kind, pattern="master", **fields):
+    return {
+        "type": "branchrestriction",
+        "id": restriction_id,
+        "kind": kind,
+        "branch_match_kind": "glob",
+        "pattern": pattern,
+        "users": [],
+        "groups": [],
+        **fields,
+    }
+
+
+def desired(kind, pattern="master", **fields):
+    return {
+        "type": "branchrestriction",
+        "kind": kind,
+        "branch_match_kind": "glob",
+        "pattern": pattern,
+        "users": [],
+        "groups": [],
+        **fields,
+    }
+
+
+def test_diff_restrictions_keeps_matching_and_removes_duplicates():
+    plan = diff_restrictions(
+        "repository1",
+        [
+            existing(1, "push"),
+            existing(2, "push"),
+            existing(3, "force", "develop"),
+            existing(
+                4,
+                "require_approvals_to_merge",
+                value=2,
+                users=[{"account_id": "b", "uuid": "{2}"}, {"account_id": "a"}],
+                groups=[{"slug": "developers", "name": "Developers"}],
+            ),
+        ],
+        [
+            desired("push"),
+            desired("force"),
+            desired(
+                "require_approvals_to_merge",
+                value=2,
+                users=[{"account_id": "a"}, {"account_id": "b"}],
+                groups=[{"slug": "developers"}],
+            ),
+        ],
+    )
+
+    assert [restriction["id"] for restriction in plan.unchanged] == [1, 4, 3]
+    assert [restriction["id"] for restriction in plan.deletes] == [2]
+    assert plan.creates == [desired("force")]
+    assert plan.error is None
+
+
+def test_diff_restrictions_prunes_unmanaged_restrictions_on_request():
+    current = [existing(1, "push"), existing(2, "force", "develop")]
+
+    kept = diff_restrictions("repository1", current, [desired("push")])
+    pruned = diff_restrictions("repository1", current, [desired("push")], prune=True)
+
+    assert kept.deletes == []
+    assert [restriction["id"] for restriction in kept.unchanged] == [1, 2]
+    assert pruned.deletes == [existing(2, "force", "develop")]
+
+
+@pytest.mark.parametrize(
+    "current,wanted",
+    [
+        (
+            existing(1, "require_approvals_to_merge", value=1),
+            desired("require_approvals_to_merge", value=2),
+        ),
+        (
+            existing(
+                1,
+                "push",
+                branch_match_kind="branching_model",
+                branch_type="release",
+                groups=[{"slug": "developers"}],
+            ),
+            desired("push", branch_match_kind="branching_model", branch_type="release"),
+        ),
+        (existing(1, "push", users=[{"account_id": "a"}]), desired("push")),
+    ],
+)
+def test_diff_restrictions_replaces_changed_restrictions(current, wanted):
+    plan = diff_restrictions("repository1", [current], [wanted])
+
+    assert plan.deletes == [current]
+    assert plan.creates == [wanted]
+
+
+def test_plan_lists_restrictions_of_given_repositories():
+    session_mock = MagicMock()
+    repository_response = MagicMock(ok=True)
+    repository_response.json.return_value = {"mainbranch": {"name": "main"}}
+    restrictions_response = MagicMock(ok=True)
+    restrictions_response.json.return_value = {
+        "values": [existing(7, "push", "main"), existing(8, "delete", "old")]
+    }
+    session_mock.get.side_effect = [repository_response, restrictions_response]
+
+    plans = list(
+        RestrictionSyncCommand(
+            "workspace1", session_mock, [{"kind": "push"}, {"kind": "force"}]
+        ).plan(["repository1"])
+    )
+
+    assert len(plans) == 1
+    assert plans[0].repository == "repository1"
+    assert [r["kind"] for r in plans[0].creates] == ["force"]
+    assert plans[0].creates[0]["pattern"] == "main"
+    assert plans[0].deletes == []
+    assert [r["id"] for r in plans[0].unchanged] == [7, 8]
+    assert session_mock.get.call_args_list[0].kwargs["params"] == {
+        "fields": "mainbranch.name"
+    }
+    params = session_mock.get.call_args.kwargs["params"]
+    assert params["pagelen"] == 100
+    assert params["fields"].startswith("next,page,pagelen,size,values.id,")
+    assert session_mock.get.call_args.kwargs["url"].endswith(
+        "/repositories/workspace1/repository1/branch-restrictions"
+    )
+
+
+def test_plan_reports_repositories_that_cannot_be_read():
+    session_mock = MagicMock()
+    session_mock.get.return_value = MagicMock(ok=False, status_code=403)
+
+    plans = list(RestrictionSyncCommand("workspace1", session_mock).plan(["repo"]))
+
+    assert plans[0].error == "403 - Request failed from Bitbucket Api"
+    assert plans[0].creates == plans[0].deletes == []
+
+
+def test_plan_reports_empty_repositories():
+    session_mock = MagicMock()
+    repository_response = MagicMock(ok=True)
+    repository_response.json.return_value = {"mainbranch": None}
+    listing_response = MagicMock(ok=True)
+    listing_response.json.return_value = {
+        "values": [{"slug": "empty", "mainbranch": None}]
+    }
+    session_mock.get.side_effect = [repository_response, listing_response]
+    command = RestrictionSyncCommand("workspace1", session_mock)
+
+    explicit = list(command.plan(["repository1"]))
+    listed = list(command.plan())
+
+    assert [(plan.repository, plan.error) for plan in explicit + listed] == [
+        ("repository1", "Repository has no main branch"),
+        ("empty", "Repository has no main branch"),
+    ]
+    assert session_mock.get.call_count == 2
+
+
+def test_apply_deletes_and_creates_restrictions():
+    session_mock = MagicMock()
+    session_mock.delete.return_value.status_code = 204
+    session_mock.post.side_effect = requests.exceptions.ConnectionError()
+    command = RestrictionSyncCommand("workspace1", session_mock)
+    plan = diff_restrictions(
+        "repository1", [existing(5, "force", "develop")], [desired("push")], True
+    )
+
+    results = list(command.apply([plan]))
+
+    assert results == [
+        SyncResult("repository1", "delete", "force", "develop", 204),
+        SyncResult("repository1", "create", "push", "master", None),
+    ]
+    assert session_mock.delete.call_args.kwargs["url"].endswith(
+        "/repositories/workspace1/repository1/branch-restrictions/5"
+    )
+    assert json.loads(session_mock.post.call_args.kwargs["data"]) == desired("push")
+
+
+def test_apply_resumes_from_journal(tmp_path):
+    session_mock = MagicMock()
+    session_mock.delete.return_value.status_code = 204
+    session_mock.post.return_value.status_code = 500
+    plan = diff_restrictions(
+        "repository1",
+        [existing(5, "force", "develop")],
+        [desired("push"), desired("delete")],
+        prune=True,
+    )
+    path = tmp_path / "restrictions.journal"
+
+    with Journal(path) as journal:
+        command = RestrictionSyncCommand("workspace1", session_mock, journal=journal)
+        first = list(command.apply([plan]))
+    session_mock.post.return_value.status_code = 201
+    with Journal(path, resume=True) as journal:
+        command = RestrictionSyncCommand("workspace1", session_mock, journal=journal)
+        second = list(command.apply([plan]))
+
+    assert [result.status_code for result in first] == [204, 500, 500]
+    assert [(result.action, result.kind) for result in second] == [
+        ("create", "push"),
+        ("create", "delete"),
+    ]
+    assert journal.skipped == 1
+    assert session_mock.delete.call_count == 1
+
+    with Journal(path, resume=True) as journal:
+        command = RestrictionSyncCommand("workspace2", session_mock, journal=journal)
+        other_workspace = list(command.apply([plan]))
+
+    assert len(other_workspace) == 3
+    assert journal.skipped == 0
+
+
+def test_sync_is_idempotent_against_fake_server(monkeypatch):
+    server = FakeBitbucketServer().start()
+    monkeypatch.setenv("BITBUCKET_API_URL", server.url)
+    try:
+        server.state.seed("workspace1", repositories=3, restrictions=["push", "push"])
+        with requests.Session() as session:
+            command = RestrictionSyncCommand(
+                "workspace1", session, [{"kind": "push"}, {"kind": "delete"}]
+            )
+            results = list(command.apply(list(command.plan())))
+            second_plans = list(command.plan())
+    finally:
+        server.stop()
+
+    assert sorted((result.action, result.kind) for result in results) == sorted(
+        [("delete", "push"), ("create", "delete")] * 3
+    )
+    assert {result.status_code for result in results} == {201, 204}
+    assert [(plan.creates, plan.deletes) for plan in second_plans] == [([], [])] * 3
+    assert server.requests["GET"] == 1 + 3 + 1 + 3
@@ -0,0 +1,148 @@
+import json
+
+from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.restrictions import SyncPlan, SyncResult
+
+
+def plans():
+    return iter(
+        [
+            SyncPlan(
+                "repository1",
+                [{"kind": "push", "pattern": "master"}],
+                [{"id": 3, "kind": "force", "pattern": "develop"}],
+                [{"id": 1, "kind": "delete", "pattern": "master"}],
+                None,
+            ),
+            SyncPlan(
+                "repository2", [], [], [], "403 - Request failed from Bitbucket Api"
+            ),
+        ]
+    )
+
+
+def test_sync_branch_restrictions_dry_run(runner, mock_client):
+    mock_client.patch(
+        "bitbucketcli.bitbucket.restrictions.RestrictionSyncCommand.plan",
+        return_value=plans(),
+    )
+    apply = mock_client.patch(
+        "bitbucketcli.bitbucket.restrictions.RestrictionSyncCommand.apply"
+    )
+
+    result = runner.invoke(
+        cli.sync_branch_restrictions,
+        ["--workspace", "workspace1", "--dry-run"],
+    )
+
+    apply.assert_not_called()
+    assert result.exit_code == 0
+    assert result.output == (
+        "repository1: delete force restriction on develop (id 3)\n"
+        "repository1: create push restriction on master\n"
+        "Error: Failed to read the branch restrictions of repository2: 403 - Request failed from Bitbucket Api\n"
+        "1 to create, 1 to delete, 1 unchanged in 1 repositories.\n"
+    )
+
+
+def test_sync_branch_restrictions_applies_changes(runner, mock_client):
+    plan = mock_client.patch(
+        "bitbucketcli.bitbucket.restrictions.RestrictionSyncCommand.plan",
+        return_value=plans(),
+    )
+    mock_client.patch(
+        "bitbucketcli.bitbucket.restrictions.RestrictionSyncCommand.apply",
+        return_value=iter(
+            [
+                SyncResult("repository1", "delete", "force", "develop", 204),
+                SyncResult("repository1", "create", "push", "master", 400),
+            ]
+        ),
+    )
+
+    result = runner.invoke(
+        cli.sync_branch_restrictions,
+        [
+            "--workspace",
+            "workspace1",
+            "--repository",
+            "repository1",
+            "--repository",
+            "repository2",
+        ],
+    )
+
+    plan.assert_called_once_with(("repository1", "repository2"))
+    assert result.exit_code == 0
+    assert result.output.endswith(
+        "Error: Failed to create push restriction on master of repository1 (status 400).\n"
+        "Error: 1 of 2 changes failed.\n"
+    )
+
+
+def test_sync_branch_restrictions_dry_run_does_not_write_journal(
+    runner, mock_client, tmp_path
+):
+    mock_client.patch(
+        "bitbucketcli.bitbucket.restrictions.RestrictionSyncCommand.plan",
+        return_value=plans(),
+    )
+    journal = tmp_path / "restrictions.journal"
+
+    result = runner.invoke(
+        cli.sync_branch_restrictions,
+        ["--workspace", "workspace1", "--dry-run", "--journal", str(journal)],
+    )
+
+    assert result.exit_code == 0
+    assert not journal.exists()
+
+
+def test_sync_branch_restrictions_writes_journal(runner, mock_client, tmp_path):
+    mock_client.patch(
+        "bitbucketcli.bitbucket.restrictions.RestrictionSyncCommand.plan",
+        return_value=plans(),
+    )
+    cli.prepare_oauth_client.return_value.delete.return_value.status_code = 204
+    cli.prepare_oauth_client.return_value.post.return_value.status_code = 201
+    journal = tmp_path / "restrictions.journal"
+
+    result = runner.invoke(
+        cli.sync_branch_restrictions,
+        ["--workspace", "workspace1", "--journal", str(journal)],
+    )
+
+    assert result.exit_code == 0
+    assert [
+        (entry["id"], entry["state"])
+        for entry in map(json.loads, journal.read_text().splitlines())
+    ] == [
+        ("delete workspace1/repository1 3", "planned"),
+        (
+            'create workspace1/repository1 ["push", "glob", "master", "", null, [], []]',
+            "planned",
+        ),
+        ("delete workspace1/repository1 3", "completed"),
+        (
+            'create workspace1/repository1 ["push", "glob", "master", "", null, [], []]',
+            "completed",
+        ),
+    ]
+
+
+def test_sync_branch_restrictions_prints_throttle_stats(runner, mock_client):
+    mock_client.patch(
+        "bitbucketcli.bitbucket.restrictions.RestrictionSyncCommand.plan",
+        return_value=iter([]),
+    )
+    mock_client.patch(
+        "bitbucketcli.bitbucket.restrictions.RestrictionSyncCommand.throttle_stats",
+        return_value={"api.bitbucket.org": {"throttled_seconds": 1, "retries": 1}},
+    )
+
+    result = runner.invoke(
+        cli.sync_branch_restrictions, ["--workspace", "workspace1", "--dry-run"]
+    )
+
+    assert result.exit_code == 0
+    assert result.stderr == "api.bitbucket.org: throttled for 1.0s, 1 retries\n"
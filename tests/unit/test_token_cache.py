@@ -0,0 +1,104 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.token_cache import TokenCache
+
+TOKEN_URL = "https://bitbucket.org/site/oauth2/access_token"
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return tmp_path / "tokens.json"
+
+
+def test_fetch_token_when_cache_is_empty(cache_path):
+    fetch_token = MagicMock(return_value={"access_token": "abc", "expires_in": 7200})
+    cache = TokenCache(cache_path, clock=lambda: 1000)
+
+    token = cache.fetch("consumer_key", TOKEN_URL, fetch_token)
+
+    assert token == {"access_token": "abc", "expires_in": 7200, "expires_at": 8200}
+    assert fetch_token.call_count == 1
+    stored = json.loads(cache_path.read_text())
+    assert stored[TokenCache.key("consumer_key", TOKEN_URL)] == token
+
+
+def test_reuse_cached_token_without_fetching(cache_path):
+    TokenCache(cache_path, clock=lambda: 1000).put(
+        "consumer_key", TOKEN_URL, {"access_token": "abc", "expires_in": 7200}
+    )
+    fetch_token = MagicMock()
+
+    token = TokenCache(cache_path, clock=lambda: 2000).fetch(
+        "consumer_key", TOKEN_URL, fetch_token
+    )
+
+    assert token["access_token"] == "abc"
+    fetch_token.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "now,refreshed",
+    [
+        (8100, False),
+        (8150, True),
+        (9000, True),
+    ],
+)
+def test_refresh_token_shortly_before_expiry(cache_path, now, refreshed):
+    TokenCache(cache_path, clock=lambda: 1000).put(
+        "consumer_key", TOKEN_URL, {"access_token": "old", "expires_in": 7200}
+    )
+    fetch_token = MagicMock(return_value={"access_token": "new", "expires_in": 7200})
+
+    token = TokenCache(cache_path, refresh_margin=60, clock=lambda: now).fetch(
+        "consumer_key", TOKEN_URL, fetch_token
+    )
+
+    assert token["access_token"] == ("new" if refreshed else "old")
+    assert fetch_token.call_count == int(refreshed)
+
+
+def test_rejected_token_is_fetched_again(cache_path):
+    cache = TokenCache(cache_path, clock=lambda: 1000)
+    old = cache.put(
+        "consumer_key", TOKEN_URL, {"access_token": "old", "expires_in": 7200}
+    )
+    fetch_token = MagicMock(return_value={"access_token": "new", "expires_in": 7200})
+
+    first = cache.fetch("consumer_key", TOKEN_URL, fetch_token, rejected=old)
+    second = cache.fetch("consumer_key", TOKEN_URL, fetch_token, rejected=old)
+
+    assert first["access_token"] == second["access_token"] == "new"
+    assert fetch_token.call_count == 1
+
+
+def test_tokens_are_keyed_by_consumer_and_token_url(cache_path):
+    cache = TokenCache(cache_path, clock=lambda: 1000)
+    cache.put("consumer1", TOKEN_URL, {"access_token": "one", "expires_in": 7200})
+
+    assert cache.get("consumer2", TOKEN_URL) is None
+    assert cache.get("consumer1", "https://other/token") is None
+    assert cache.get("consumer1", TOKEN_URL)["access_token"] == "one"
+
+
+def test_prepare_oauth_client_uses_cached_token(mocker, monkeypatch, cache_path):
+    monkeypatch.setenv("BITBUCKET_TOKEN_CACHE_PATH", str(cache_path))
+    fetch_token = mocker.patch(
+        "requests_oauthlib.oauth2_session.OAuth2Session.fetch_token",
+        return_value={
+            "access_token": "abc",
+            "token_type": "Bearer",
+            "expires_in": 7200,
+        },
+    )
+
+    first = cli.prepare_oauth_client()
+    second = cli.prepare_oauth_client()
+
+    assert fetch_token.call_count == 1
+    assert first.access_token == "abc"
+    assert second.access_token == "abc"
+    assert first.token_manager.token["access_token"] == "abc"
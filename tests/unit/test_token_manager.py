@@ -0,0 +1,153 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from bitbucketcli.bitbucket.bitbucket import BitbucketClient
+from bitbucketcli.bitbucket.ratelimit import RequestScheduler
+from bitbucketcli.bitbucket.token_manager import TokenManager
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TokenServer:
+    def __init__(self, clock, lifetime=7200, delay=0.0, failures=0):
+        self.clock = clock
+        self.lifetime = lifetime
+        self.delay = delay
+        self.failures = failures
+        self.rejected = []
+        self.issued = 0
+
+    def __call__(self, rejected):
+        self.rejected.append(rejected)
+        time.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("token endpoint unavailable")
+        self.issued += 1
+        return {
+            "access_token": f"token{self.issued}",
+            "expires_at": self.clock() + self.lifetime,
+        }
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_token_manager_sets_the_session_token(clock):
+    session = MagicMock()
+
+    manager = TokenManager(session, TokenServer(clock), clock=clock)
+
+    assert session.token["access_token"] == "token1"
+    assert session.token_manager is manager
+    assert manager.refresh_delay() == 7200 - 300
+
+
+def test_concurrent_refreshes_are_single_flight(clock):
+    server = TokenServer(clock, delay=0.05)
+    manager = TokenManager(MagicMock(), server, clock=clock)
+    rejected = manager.token
+
+    threads = [
+        threading.Thread(target=manager.refresh, kwargs={"rejected": rejected})
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert server.issued == 2
+    assert manager.refreshes == 1
+    assert manager.token["access_token"] == "token2"
+    assert server.rejected == [None, rejected]
+
+
+def test_token_is_refreshed_in_background_before_expiry(clock):
+    server = TokenServer(clock, lifetime=200)
+    manager = TokenManager(MagicMock(), server, refresh_ahead=300, clock=clock)
+    server.lifetime = 7200
+
+    manager.start()
+    try:
+        wait_until(lambda: manager.refreshes == 1)
+    finally:
+        manager.close()
+
+    assert manager.token["access_token"] == "token2"
+
+
+def test_failed_background_refresh_is_retried(clock):
+    server = TokenServer(clock, lifetime=0)
+    manager = TokenManager(MagicMock(), server, retry_delay=0.01, clock=clock)
+    server.lifetime = 7200
+    server.failures = 2
+
+    manager.start()
+    try:
+        wait_until(lambda: manager.refreshes == 1)
+    finally:
+        manager.close()
+
+    assert len(server.rejected) == 4
+
+
+def test_client_refreshes_token_and_retries_after_401(clock):
+    session_mock = MagicMock()
+    server = TokenServer(clock)
+    TokenManager(session_mock, server, clock=clock)
+    session_mock.get.side_effect = [
+        MagicMock(status_code=401),
+        MagicMock(status_code=200),
+    ]
+    client = BitbucketClient(session_mock, scheduler=RequestScheduler())
+
+    response = client.get("2.0/user")
+
+    assert response.status_code == 200
+    assert session_mock.get.call_count == 2
+    assert server.rejected[-1]["access_token"] == "token1"
+    assert session_mock.token["access_token"] == "token2"
+
+
+def test_client_retries_401_only_once(clock):
+    session_mock = MagicMock()
+    server = TokenServer(clock)
+    TokenManager(session_mock, server, clock=clock)
+    session_mock.post.return_value.status_code = 401
+    client = BitbucketClient(session_mock, scheduler=RequestScheduler())
+
+    response = client.post("2.0/workspaces/ws/projects", data="{}")
+
+    assert response.status_code == 401
+    assert session_mock.post.call_count == 2
+    assert server.issued == 2
+
+
+def test_client_returns_401_when_refresh_fails(clock):
+    session_mock = MagicMock()
+    server = TokenServer(clock)
+    TokenManager(session_mock, server, clock=clock)
+    server.failures = 1
+    session_mock.get.return_value.status_code = 401
+    client = BitbucketClient(session_mock, scheduler=RequestScheduler())
+
+    assert client.get("2.0/user").status_code == 401
+    assert session_mock.get.call_count == 1
@@ -0,0 +1,152 @@
+import io
+import json
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from bitbucketcli.bitbucket import cli
+from bitbucketcli.bitbucket.bitbucket import (
+    BitbucketClient,
+    current_request_hooks,
+    request_hook,
+)
+from bitbucketcli.bitbucket.tracing import RequestEvent, Tracer, template_path
+
+
+@pytest.mark.parametrize(
+    "path,template",
+    [
+        (
+            "2.0/repositories/workspace1/repository1/branch-restrictions",
+            "2.0/repositories/{workspace}/{repository}/branch-restrictions",
+        ),
+        (
+            "2.0/repositories/workspace1/repository1/branch-restrictions/1234",
+            "2.0/repositories/{workspace}/{repository}/branch-restrictions/{id}",
+        ),
+        (
+            "https://api.bitbucket.org/2.0/repositories/workspace1?page=2",
+            "2.0/repositories/{workspace}",
+        ),
+        ("2.0/users/616030:0784", "2.0/users/{account_id}"),
+        (
+            "1.0/groups/workspace1/developers/members/%7Buuid%7D",
+            "1.0/groups/{workspace}/{group}/members/{uuid}",
+        ),
+        (
+            "!api/internal/privileges/workspace1/repository1/%7Buuid%7D",
+            "!api/internal/privileges/{workspace}/{repository}/{uuid}",
+        ),
+        ("2.0/unknown", "2.0/unknown"),
+    ],
+)
+def test_template_path(path, template):
+    assert template_path(path) == template
+
+
+@pytest.fixture
+def events():
+    recorded = []
+    with request_hook(recorded.append):
+        yield recorded
+
+
+def test_request_hooks_receive_one_event_per_call(events):
+    session_mock = MagicMock()
+    session_mock.post.return_value = MagicMock(status_code=200, content=b'{"a": 1}')
+    client = BitbucketClient(session_mock)
+
+    client.post(
+        "!api/internal/invitations/repositories/workspace1/repository1",
+        data="{}",
+        is_internal_api=True,
+    )
+
+    assert len(events) == 1
+    event = events[0]
+    assert event.method == "POST"
+    assert event.path == (
+        "!api/internal/invitations/repositories/{workspace}/{repository}"
+    )
+    assert event.host == "internal"
+    assert event.status == 200
+    assert event.bytes == 8
+    assert event.elapsed >= 0
+
+
+def test_tracer_writes_ndjson_and_summary():
+    stream = io.StringIO()
+    tracer = Tracer(stream)
+    for elapsed in (0.1, 0.3):
+        tracer(RequestEvent(0, "POST", "2.0/x", "public", 201, 10, elapsed))
+    tracer(RequestEvent(0, "GET", "2.0/y", "public", 200, 5, 0.05))
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["path"] for line in lines] == ["2.0/x", "2.0/x", "2.0/y"]
+    assert tracer.summary() == [
+        "POST 2.0/x (public): 2 calls, 400.0ms total, 200.0ms avg",
+        "GET 2.0/y (public): 1 calls, 50.0ms total, 50.0ms avg",
+    ]
+
+
+def test_trace_option_records_create_repository_calls(runner, mocker, tmp_path):
+    session_mock = MagicMock()
+    created = MagicMock(status_code=200, content=b"{}")
+    created.json.return_value = {"mainbranch": {"name": "master"}}
+    session_mock.post.side_effect = [created] + [
+        MagicMock(status_code=201, content=b"{}") for _ in range(3)
+    ]
+    mocker.patch(
+        "bitbucketcli.bitbucket.cli.prepare_oauth_client", return_value=session_mock
+    )
+    trace_file = tmp_path / "trace.ndjson"
+
+    result = runner.invoke(
+        cli.cli,
+        [
+            "--trace",
+            str(trace_file),
+            "create-repository",
+            "--workspace",
+            "workspace1",
+            "--name",
+            "repository1",
+            "--project-key",
+            "KEY",
+        ],
+    )
+
+    assert result.exit_code == 0
+    events = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    assert [event["path"] for event in events] == [
+        "2.0/repositories/{workspace}/{repository}"
+    ] + ["2.0/repositories/{workspace}/{repository}/branch-restrictions"] * 3
+    assert (
+        "POST 2.0/repositories/{workspace}/{repository}/branch-restrictions (public): 3 calls"
+        in result.output
+    )
+    assert current_request_hooks() == ()
+
+
+def test_request_hooks_are_scoped_to_their_context():
+    session_mock = MagicMock()
+    session_mock.get.return_value = MagicMock(status_code=200, content=b"{}")
+    recorded = {}
+
+    def command(name):
+        with request_hook(recorded.setdefault(name, []).append):
+            client = BitbucketClient(session_mock)
+        # The client keeps the hooks it was created with, on any thread.
+        thread = threading.Thread(target=client.get, args=(f"2.0/{name}",))
+        thread.start()
+        thread.join()
+
+    threads = [threading.Thread(target=command, args=(name,)) for name in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    BitbucketClient(session_mock).get("2.0/untraced")
+
+    assert [event.path for event in recorded["a"]] == ["2.0/a"]
+    assert [event.path for event in recorded["b"]] == ["2.0/b"]
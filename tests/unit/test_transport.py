@@ -0,0 +1,99 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from bitbucketcli.bitbucket.transport import (
+    PooledHTTPAdapter,
+    configure_transport,
+    connection_stats,
+    origins,
+)
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_origins_are_deduplicated():
+    assert origins(
+        [
+            "https://api.bitbucket.org",
+            "https://bitbucket.org",
+            "https://bitbucket.org/site/oauth2/access_token",
+            None,
+        ]
+    ) == ["https://api.bitbucket.org/", "https://bitbucket.org/"]
+
+
+def test_configure_transport_mounts_one_pool_per_host():
+    session = requests.Session()
+    configure_transport(
+        session,
+        ["https://api.bitbucket.org", "https://bitbucket.org"],
+        pool_size=32,
+        connect_timeout=2,
+        read_timeout=10,
+    )
+
+    api_adapter = session.get_adapter("https://api.bitbucket.org/2.0/repositories")
+    internal_adapter = session.get_adapter("https://bitbucket.org/!api/internal")
+
+    assert isinstance(api_adapter, PooledHTTPAdapter)
+    assert isinstance(internal_adapter, PooledHTTPAdapter)
+    assert api_adapter is not internal_adapter
+    assert api_adapter._pool_maxsize == 32
+    assert api_adapter.timeout == (2, 10)
+
+
+def test_configure_transport_from_environment(monkeypatch):
+    monkeypatch.setenv("BITBUCKET_POOL_SIZE", "16")
+    monkeypatch.setenv("BITBUCKET_CONNECT_TIMEOUT", "1.5")
+    monkeypatch.setenv("BITBUCKET_READ_TIMEOUT", "20")
+    session = configure_transport(requests.Session(), ["https://api.bitbucket.org"])
+    adapter = session.get_adapter("https://api.bitbucket.org/")
+    assert adapter._pool_maxsize == 16
+    assert adapter.timeout == (1.5, 20.0)
+
+
+def test_default_timeout_is_applied(mocker):
+    send = mocker.patch("requests.adapters.HTTPAdapter.send")
+    adapter = PooledHTTPAdapter(timeout=(1, 2))
+    adapter.send("request")
+    send.assert_called_once_with(
+        "request", stream=False, timeout=(1, 2), verify=True, cert=None, proxies=None
+    )
+    adapter.send("request", timeout=5)
+    send.assert_called_with(
+        "request", stream=False, timeout=5, verify=True, cert=None, proxies=None
+    )
+
+
+def test_connection_stats_report_reuse(server_url):
+    session = configure_transport(requests.Session(), [server_url], pool_size=2)
+    for _ in range(5):
+        assert session.get(f"{server_url}/2.0/users/1").status_code == 200
+
+    stats = connection_stats(session, [server_url])
+
+    assert stats == {server_url: {"connections": 1, "requests": 5, "reused": 4}}
@@ -0,0 +1,93 @@
+from unittest.mock import MagicMock
+
+import pytest
+from bitbucketcli.bitbucket.bitbucket import BitbucketApiException, BitbucketClient
+from bitbucketcli.bitbucket.user_cache import MISSING, UserUuidCache
+
+ACCOUNT_ID = "616030:07848922-j1ee-57f0-acd3-6c7677078h96"
+UUID = "{3333333-444444444-444444-44444}"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def user_response(status_code, uuid=UUID):
+    response = MagicMock(status_code=status_code)
+    response.json.return_value = {"uuid": uuid}
+    return response
+
+
+def test_repeated_lookups_hit_the_cache():
+    session_mock = MagicMock()
+    session_mock.get.return_value = user_response(200)
+    cache = UserUuidCache()
+    client = BitbucketClient(session_mock, user_cache=cache)
+
+    assert [client.get_user_uuid(ACCOUNT_ID) for _ in range(300)] == [UUID] * 300
+    assert session_mock.get.call_count == 1
+    assert client.user_cache_stats() == {"hits": 299, "misses": 1, "size": 1}
+
+
+def test_not_found_users_are_negatively_cached():
+    clock = FakeClock()
+    session_mock = MagicMock()
+    session_mock.get.return_value = user_response(404)
+    client = BitbucketClient(
+        session_mock, user_cache=UserUuidCache(negative_ttl=60, clock=clock)
+    )
+
+    for _ in range(2):
+        with pytest.raises(BitbucketApiException) as error:
+            client.get_user_uuid(ACCOUNT_ID)
+        assert error.value.status_code == 404
+    assert session_mock.get.call_count == 1
+
+    clock.now += 61
+    session_mock.get.return_value = user_response(200)
+    assert client.get_user_uuid(ACCOUNT_ID) == UUID
+    assert session_mock.get.call_count == 2
+
+
+def test_other_failures_are_not_cached():
+    session_mock = MagicMock()
+    session_mock.get.side_effect = [user_response(403), user_response(200)]
+    client = BitbucketClient(session_mock, user_cache=UserUuidCache())
+
+    with pytest.raises(BitbucketApiException):
+        client.get_user_uuid(ACCOUNT_ID)
+    assert client.get_user_uuid(ACCOUNT_ID) == UUID
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = UserUuidCache(ttl=10, clock=clock)
+    cache.put(ACCOUNT_ID, UUID)
+    assert cache.get(ACCOUNT_ID) == UUID
+    clock.now += 11
+    assert cache.get(ACCOUNT_ID) is MISSING
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = UserUuidCache(max_size=2)
+    cache.put("a", "{a}")
+    cache.put("b", "{b}")
+    cache.get("a")
+    cache.put("c", "{c}")
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == "{a}"
+    assert cache.get("c") == "{c}"
+
+
+def test_cache_is_persisted_on_disk(tmp_path):
+    clock = FakeClock()
+    path = tmp_path / "users.json"
+    UserUuidCache(path=path, ttl=100, clock=clock).put(ACCOUNT_ID, UUID)
+
+    assert UserUuidCache(path=path, clock=clock).get(ACCOUNT_ID) == UUID
+    clock.now += 101
+    assert UserUuidCache(path=path, clock=clock).get(ACCOUNT_ID) is MISSING